@@ -0,0 +1,231 @@
+import os
+import io
+import sys
+import json
+import time
+import runpy
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+# Times the hot paths of the character import pipeline against synthetic zones:
+#
+# python benchmarks/bench_import_chrs.py --sizes 200 1000 5000 --json results.json
+# python benchmarks/bench_import_chrs.py --sizes 200 1000 5000 --compare results.json
+#
+# The database query, spawn filtering and model path resolution run for real through eq_spawn_plan.py.
+# The full eq_import_chrs.py run uses stub_bpy, so its time is the script's own overhead and the
+# counters show how many imports, copies and removals Blender would have been asked to do
+
+benchmarks_folder = os.path.dirname(os.path.abspath(__file__))
+scripts_folder = os.path.dirname(benchmarks_folder)
+sys.path.insert(0, benchmarks_folder)
+sys.path.insert(0, scripts_folder)
+
+import eq_spawn_plan
+import stub_bpy
+import synthetic_zone
+
+Zone_Name = "benchzone"
+
+def parse_arguments():
+
+    parser = argparse.ArgumentParser(description="Benchmark the character import pipeline on synthetic zones")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000], help="Spawn points in the benchmarked zone")
+    parser.add_argument("--other-zones", type=int, default=4, help="Extra zones of the same size in the database")
+    parser.add_argument("--exact-fraction", type=float, default=0.5, help="Fraction of spawns whose exact model file exists")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the fastest is reported")
+    parser.add_argument("--race-data-csv-location", default=os.path.join(scripts_folder, "..", "RaceData.csv"))
+    parser.add_argument("--work-folder", help="Keep the synthetic data here instead of a temporary folder")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare against results from an earlier --json run")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+
+    return parser.parse_args()
+
+def best_time(function, repeat):
+
+    best_seconds = None
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function()
+        elapsed_seconds = time.perf_counter() - start_time
+        best_seconds = elapsed_seconds if best_seconds is None else min(best_seconds, elapsed_seconds)
+
+    return best_seconds, result
+
+def resolve_model_paths(filtered_rows, characters_folder, db_race_translation_dict):
+
+    model_file_index = eq_spawn_plan.index_model_files(characters_folder, "gltf")
+    npc_model_path_dict = {}
+    model_paths = []
+    for row in filtered_rows:
+        if eq_spawn_plan.is_player_character_race(int(row[6])):
+            model_paths.append(eq_spawn_plan.get_player_character_model_path(row, "gltf", characters_folder, model_file_index))
+        else:
+            model_paths.append(eq_spawn_plan.get_npc_model_path(row, "gltf", characters_folder, db_race_translation_dict,
+                model_file_index, npc_model_path_dict))
+
+    return model_paths
+
+def run_import_script(export_folder, race_data_csv_location, db_location, db_copy_location, extra_args=[]):
+
+    plan_cache_path = eq_spawn_plan.get_spawn_plan_cache_path(Zone_Name, export_folder, 1)
+    if os.path.exists(plan_cache_path):
+        os.remove(plan_cache_path)
+
+    stub_bpy.reset()
+    sys.modules["bpy"] = stub_bpy
+    script_path = os.path.join(scripts_folder, "eq_import_chrs.py")
+    saved_argv = sys.argv
+    sys.argv = [script_path, "--", "--zone-name", Zone_Name, "--lantern-export-folder", export_folder,
+        "--race-data-csv-location", race_data_csv_location, "--db-location", db_location,
+        "--db-working-copy-location", db_copy_location, "--import-static", "--import-patrols", "--bake-patrol-paths", "--spawn-seed", "1"] + extra_args
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    finally:
+        sys.argv = saved_argv
+
+    counters = dict(stub_bpy.counters)
+    counters["objects"] = len(stub_bpy.data.objects)
+    counters["images"] = len(stub_bpy.data.images)
+    return counters
+
+def benchmark_zone_size(spawn_count, args, work_folder):
+
+    size_folder = os.path.join(work_folder, str(spawn_count))
+    export_folder = os.path.join(size_folder, "Exports")
+    characters_folder = os.path.join(export_folder, Zone_Name, "Characters")
+    db_location = os.path.join(size_folder, "lantern_server.db")
+    db_copy_location = os.path.join(size_folder, "lantern_server_indexed.db")
+    spawn_cache_folder = os.path.join(size_folder, "SpawnCache")
+    os.makedirs(size_folder, exist_ok=True)
+
+    zone_names = [Zone_Name] + ["otherzone{0}".format(i) for i in range(args.other_zones)]
+    synthetic_zone.create_synthetic_db(db_location, zone_names, spawn_count)
+    db_race_translation_dict = eq_spawn_plan.load_race_translation_dict(args.race_data_csv_location)
+    if os.path.exists(characters_folder):
+        shutil.rmtree(characters_folder)
+    synthetic_zone.create_characters_folder(characters_folder, synthetic_zone.get_zone_model_names(
+        eq_spawn_plan, db_location, Zone_Name, db_race_translation_dict, args.exact_fraction), "gltf")
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["query_legacy_seconds"], legacy_rows = best_time(lambda: eq_spawn_plan.query_spawn_rows(
+            Zone_Name, db_location, True, True, False, db_copy_location), args.repeat)
+
+        if os.path.exists(db_copy_location):
+            os.remove(db_copy_location)
+        results["query_fast_cold_seconds"], _ = best_time(lambda: eq_spawn_plan.query_spawn_rows(
+            Zone_Name, db_location, True, True, True, db_copy_location), 1)
+        results["query_fast_seconds"], rows = best_time(lambda: eq_spawn_plan.query_spawn_rows(
+            Zone_Name, db_location, True, True, True, db_copy_location), args.repeat)
+
+        if os.path.exists(spawn_cache_folder):
+            shutil.rmtree(spawn_cache_folder)
+        results["spawn_cache_build_seconds"], _ = best_time(lambda: eq_spawn_plan.build_spawn_cache(
+            db_location, db_copy_location, spawn_cache_folder), 1)
+        results["query_cache_seconds"], cached_rows = best_time(lambda: eq_spawn_plan.query_spawn_rows(
+            Zone_Name, db_location, True, True, True, db_copy_location, spawn_cache_folder), args.repeat)
+
+        results["filter_seconds"], filtered_rows = best_time(lambda: eq_spawn_plan.filter_spawns(rows, 1), args.repeat)
+        results["resolve_seconds"], model_paths = best_time(lambda: resolve_model_paths(
+            filtered_rows, characters_folder, db_race_translation_dict), args.repeat)
+
+        script_start_time = time.perf_counter()
+        script_counters = run_import_script(export_folder, args.race_data_csv_location, db_location, db_copy_location)
+        results["import_script_seconds"] = time.perf_counter() - script_start_time
+
+        script_start_time = time.perf_counter()
+        instances_counters = run_import_script(export_folder, args.race_data_csv_location, db_location, db_copy_location,
+            ["--static-spawn-mode", "INSTANCES"])
+        results["instances_script_seconds"] = time.perf_counter() - script_start_time
+
+    results["rows"] = len(rows)
+    results["legacy_rows_match"] = legacy_rows == rows
+    results["cache_rows_match"] = [eq_spawn_plan.compact_spawn_row(r) for r in cached_rows] == [eq_spawn_plan.compact_spawn_row(r) for r in rows]
+    results["filtered_spawns"] = len(filtered_rows)
+    results["resolved_models"] = sum(1 for p in model_paths if p)
+    results["unique_models"] = len(set(p for p in model_paths if p))
+    results["gltf_import_calls"] = script_counters.get("import_scene.gltf", 0)
+    results["object_copies"] = script_counters.get("object_copy", 0)
+    results["datablocks_removed"] = script_counters.get("data_removed", 0)
+    results["objects"] = script_counters["objects"]
+    results["objects_instances"] = instances_counters["objects"]
+    results["images"] = script_counters["images"]
+    results["select_all_calls"] = script_counters.get("object.select_all", 0)
+    results["view_layer_updates"] = script_counters.get("view_layer.update", 0)
+    results["keyframe_bulk_writes"] = script_counters.get("keyframe_points.foreach_set", 0)
+
+    return results
+
+def print_results(all_results):
+
+    metrics = list(next(iter(all_results.values())).keys())
+    sizes = list(all_results.keys())
+    print("{0:<26}".format("spawn points") + "".join("{0:>14}".format(s) for s in sizes))
+    for metric in metrics:
+        values = []
+        for size in sizes:
+            value = all_results[size][metric]
+            values.append("{0:>14.4f}".format(value) if isinstance(value, float) else "{0:>14}".format(str(value)))
+        print("{0:<26}".format(metric) + "".join(values))
+
+def compare_results(all_results, baseline_results, threshold):
+
+    regressions = []
+    for size, results in all_results.items():
+        baseline = baseline_results.get(size)
+        if not baseline:
+            continue
+        for metric, value in results.items():
+            baseline_value = baseline.get(metric)
+            if not metric.endswith("_seconds") and not metric.endswith("_calls"):
+                continue
+            if not baseline_value or isinstance(value, bool):
+                continue
+            ratio = value / baseline_value
+            if ratio > threshold:
+                regressions.append((size, metric, baseline_value, value, ratio))
+
+    for size, metric, baseline_value, value, ratio in regressions:
+        print("REGRESSION {0} spawn points, {1}: {2:.4f} -> {3:.4f} ({4:.2f}x)".format(size, metric, baseline_value, value, ratio))
+    if not regressions:
+        print("No regressions over {0:.2f}x".format(threshold))
+
+    return regressions
+
+###### SCRIPT START ######
+
+if __name__ == "__main__":
+
+    args = parse_arguments()
+    work_folder = args.work_folder or tempfile.mkdtemp(prefix="lantern_bench_")
+
+    all_results = {}
+    for spawn_count in args.sizes:
+        print("Benchmarking {0} spawn points...".format(spawn_count))
+        all_results[str(spawn_count)] = benchmark_zone_size(spawn_count, args, work_folder)
+
+    print()
+    print_results(all_results)
+
+    if args.json:
+        with open(args.json, "w") as f_stream:
+            json.dump(all_results, f_stream, indent=4)
+        print("Results written to " + args.json)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f_stream:
+            baseline_results = json.load(f_stream)
+        print()
+        if compare_results(all_results, baseline_results, args.threshold):
+            exit_code = 1
+
+    if not args.work_folder:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    sys.exit(exit_code)
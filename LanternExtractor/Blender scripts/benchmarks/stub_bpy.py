@@ -0,0 +1,443 @@
+import os
+import types
+import collections
+
+# A minimal stand-in for the parts of bpy eq_import_chrs.py uses. It does no real work, it just
+# keeps enough state for the script to run and counts the calls that are expensive in Blender
+
+counters = collections.Counter()
+
+class StubVector(tuple):
+
+    def __sub__(self, other):
+        return StubVector(a - b for a, b in zip(self, other))
+
+    @property
+    def length(self):
+        return sum(a * a for a in self) ** 0.5
+
+class StubDataCollection:
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._items = {}
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, name):
+        return self._items[name]
+
+    def get(self, name, default=None):
+        return self._items.get(name, default)
+
+    def unique_name(self, name):
+        if name not in self._items:
+            return name
+        suffix = 1
+        while "{0}.{1:03d}".format(name, suffix) in self._items:
+            suffix += 1
+        return "{0}.{1:03d}".format(name, suffix)
+
+    def new(self, name, *args):
+        datablock = self._factory(self.unique_name(name), *args)
+        self._items[datablock.name] = datablock
+        return datablock
+
+    def add(self, datablock):
+        datablock.name = self.unique_name(datablock.name)
+        self._items[datablock.name] = datablock
+        return datablock
+
+    def remove(self, datablock, do_unlink=True):
+        counters["data_removed"] += 1
+        # Keyed by identity, the script renames datablocks after they are added
+        self._items = {name: item for name, item in self._items.items() if item is not datablock}
+        for collection in list(getattr(datablock, "users_collection", [])):
+            collection.objects.unlink(datablock)
+
+class StubID:
+
+    def __init__(self, name, *args):
+        self.name = name
+        self.users = 1
+        self.use_fake_user = False
+        self.library = None
+        self._properties = {}
+
+    def __contains__(self, key):
+        return key in self._properties
+
+    def __getitem__(self, key):
+        return self._properties[key]
+
+    def __setitem__(self, key, value):
+        self._properties[key] = value
+
+    def __delitem__(self, key):
+        del self._properties[key]
+
+    def get(self, key, default=None):
+        return self._properties.get(key, default)
+
+    def user_remap(self, new_id):
+        counters["user_remap"] += 1
+        for material in data.materials:
+            if material.node_tree:
+                for node in material.node_tree.nodes:
+                    if node.image is self:
+                        node.image = new_id
+        for obj in data.objects:
+            if obj.data and hasattr(obj.data, "materials"):
+                obj.data.materials[:] = [new_id if m is self else m for m in obj.data.materials]
+
+class StubImage(StubID):
+
+    def __init__(self, name, filepath=""):
+        super().__init__(name)
+        self.filepath = filepath
+        self.source = 'FILE'
+        self.packed_file = None
+        self.alpha_mode = 'STRAIGHT'
+        self.colorspace_settings = types.SimpleNamespace(name="sRGB")
+
+class StubKeyframePoints:
+
+    def __init__(self):
+        self.count = 0
+        self.attributes = {}
+
+    def __len__(self):
+        return self.count
+
+    def add(self, count):
+        self.count += count
+
+    def foreach_set(self, attribute, values):
+        counters["keyframe_points.foreach_set"] += 1
+        self.attributes[attribute] = list(values)
+
+    def foreach_get(self, attribute, values):
+        values[:] = self.attributes[attribute]
+
+class StubFCurve:
+
+    def __init__(self, data_path, index):
+        self.data_path = data_path
+        self.array_index = index
+        self.keyframe_points = StubKeyframePoints()
+        self.modifiers = types.SimpleNamespace(new=lambda modifier_type: types.SimpleNamespace())
+
+    def update(self):
+        pass
+
+class StubFCurves(list):
+
+    def new(self, data_path, index=0):
+        fcurve = StubFCurve(data_path, index)
+        self.append(fcurve)
+        return fcurve
+
+    def find(self, data_path, index=0):
+        return next((fcurve for fcurve in self if fcurve.data_path == data_path and fcurve.array_index == index), None)
+
+class StubAction(StubID):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.fcurves = StubFCurves()
+
+class StubArmature(StubID):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.bones = []
+
+class StubNode:
+
+    def __init__(self, node_type, image=None):
+        self.type = node_type
+        self.image = image
+
+class StubMaterial(StubID):
+
+    def __init__(self, name, image=None):
+        super().__init__(name)
+        self.node_tree = types.SimpleNamespace(nodes=[StubNode('TEX_IMAGE', image)])
+
+class StubMeshVertices:
+
+    def __init__(self):
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, count):
+        self.count += count
+
+    def foreach_set(self, attribute, values):
+        counters["vertices.foreach_set"] += 1
+
+    def foreach_get(self, attribute, values):
+        values[:] = 0.0
+
+class StubMeshAttributes(dict):
+
+    def new(self, name, attribute_type, domain):
+        attribute = types.SimpleNamespace(name=name, data_type=attribute_type, domain=domain, data=StubMeshVertices())
+        self[name] = attribute
+        return attribute
+
+class StubMeshes(StubDataCollection):
+
+    def new_from_object(self, obj, preserve_all_data_layers=False, depsgraph=None):
+        counters["meshes.new_from_object"] += 1
+        mesh = self.new(obj.data.name)
+        mesh.materials = list(obj.data.materials)
+        mesh.vertices.add(len(obj.data.vertices))
+        return mesh
+
+class StubMesh(StubID):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.materials = []
+        self.vertices = StubMeshVertices()
+        self.attributes = StubMeshAttributes()
+
+    def from_pydata(self, vertices, edges, faces):
+        self.vertices.add(len(vertices))
+
+    def update(self):
+        pass
+
+class StubSockets(dict):
+
+    # Sockets are made on first use, by name or index
+    def __missing__(self, key):
+        socket = types.SimpleNamespace(name=key, enabled=True, default_value=None)
+        self[key] = socket
+        return socket
+
+    def __iter__(self):
+        return iter([self["Attribute"]])
+
+    def new(self, socket_type, name):
+        return self[name]
+
+class StubGraphNode:
+
+    def __init__(self, node_type):
+        self.bl_idname = node_type
+        self.name = node_type
+        self.inputs = StubSockets()
+        self.outputs = StubSockets()
+
+class StubGraphNodes(list):
+
+    def new(self, node_type):
+        node = StubGraphNode(node_type)
+        self.append(node)
+        return node
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return next(n for n in self if n.name == key)
+        return super().__getitem__(key)
+
+class StubNodeTree(StubID):
+
+    def __init__(self, name, tree_type):
+        super().__init__(name)
+        self.inputs = StubSockets()
+        self.outputs = StubSockets()
+        self.nodes = StubGraphNodes()
+        self.links = types.SimpleNamespace(new=lambda from_socket, to_socket: None)
+
+class StubModifiers(list):
+
+    def get(self, name, default=None):
+        return next((m for m in self if getattr(m, "name", None) == name), default)
+
+    def new(self, name, modifier_type):
+        modifier = types.SimpleNamespace(name=name, type=modifier_type, object=None, node_group=None)
+        self.append(modifier)
+        return modifier
+
+class StubNlaTracks(list):
+
+    def new(self):
+        track = types.SimpleNamespace(name="", mute=False, lock=False, strips=StubNlaStrips())
+        self.append(track)
+        return track
+
+class StubNlaStrips(list):
+
+    def new(self, name, start, action):
+        strip = types.SimpleNamespace(name=name, frame_start=start, frame_end=start, action=action, blend_type='REPLACE',
+            extrapolation='HOLD', action_frame_start=start, action_frame_end=start, scale=1.0, repeat=1.0)
+        self.append(strip)
+        return strip
+
+class StubObject(StubID):
+
+    def __init__(self, name, object_type, object_data):
+        super().__init__(name)
+        self.type = object_type
+        self.data = object_data
+        self.parent = None
+        self.modifiers = StubModifiers()
+        self.users_collection = []
+        self.location = (0.0, 0.0, 0.0)
+        self.rotation_mode = 'QUATERNION'
+        self.rotation_euler = (0.0, 0.0, 0.0)
+        self.scale = (1.0, 1.0, 1.0)
+        self.matrix_world = types.SimpleNamespace(translation=StubVector((0.0, 0.0, 0.0)))
+        self.animation_data = None
+
+    def copy(self):
+        counters["object_copy"] += 1
+        copy_obj = data.objects.add(StubObject(self.name, self.type, self.data))
+        copy_obj.parent = self.parent
+        copy_obj.modifiers = StubModifiers(types.SimpleNamespace(type=m.type, object=m.object) for m in self.modifiers)
+        copy_obj.animation_data = self.animation_data
+        copy_obj._properties = dict(self._properties)
+        return copy_obj
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    @property
+    def children(self):
+        return [o for o in data.objects if o.parent is self]
+
+    def select_set(self, state):
+        if state and self not in context.selected_objects:
+            context.selected_objects.append(self)
+        elif not state and self in context.selected_objects:
+            context.selected_objects.remove(self)
+
+    def animation_data_create(self):
+        self.animation_data = types.SimpleNamespace(action=None, nla_tracks=StubNlaTracks())
+        return self.animation_data
+
+class StubCollectionObjects(list):
+
+    def __init__(self, owner):
+        super().__init__()
+        self._owner = owner
+
+    def link(self, obj):
+        counters["collection_link"] += 1
+        self.append(obj)
+        obj.users_collection.append(self._owner)
+
+    def unlink(self, obj):
+        counters["collection_unlink"] += 1
+        self.remove(obj)
+        obj.users_collection.remove(self._owner)
+
+class StubCollectionChildren(list):
+
+    def link(self, collection):
+        self.append(collection)
+
+    def unlink(self, collection):
+        self.remove(collection)
+
+class StubCollection(StubID):
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = StubCollectionObjects(self)
+        self.children = StubCollectionChildren()
+
+def _new_object(name, object_data):
+
+    return StubObject(name, "EMPTY" if object_data is None else "MESH", object_data)
+
+def _import_gltf(filepath):
+
+    # Creates the armature + skinned mesh pair the glTF importer produces for a character, with
+    # one material per race texture so material and image deduplication have work to do
+    counters["import_scene.gltf"] += 1
+    model_name = os.path.splitext(os.path.basename(filepath))[0]
+    race_identifier = model_name.split('_')[0]
+    texture_path = os.path.join(os.path.dirname(filepath), "Textures", race_identifier.lower() + "ch0001.png")
+
+    image = data.images.new(race_identifier.lower() + "ch0001.png", texture_path)
+    material = data.materials.new(race_identifier.lower() + "ch0001", image)
+    mesh = data.meshes.new(race_identifier)
+    mesh.materials.append(material)
+    action = data.actions.new(race_identifier + "_P01")
+
+    armature_obj = data.objects.add(StubObject(race_identifier, "ARMATURE", data.armatures.new(race_identifier)))
+    armature_obj.animation_data_create().action = action
+    mesh_obj = data.objects.add(StubObject(race_identifier, "MESH", mesh))
+    mesh_obj.parent = armature_obj
+    mesh_obj.modifiers.append(types.SimpleNamespace(type="ARMATURE", object=armature_obj))
+
+    context.selected_objects.clear()
+    for obj in [armature_obj, mesh_obj]:
+        context.scene.collection.objects.link(obj)
+        context.selected_objects.append(obj)
+
+def _select_all(action):
+
+    counters["object.select_all"] += 1
+    if action == 'DESELECT':
+        context.selected_objects.clear()
+
+def _view_layer_update():
+
+    counters["view_layer.update"] += 1
+
+def _save_as_mainfile(filepath):
+
+    counters["wm.save_as_mainfile"] += 1
+
+data = types.SimpleNamespace()
+context = types.SimpleNamespace()
+ops = types.SimpleNamespace()
+path = types.SimpleNamespace(abspath=lambda p, library=None: p)
+
+def _batch_remove(ids):
+
+    for datablock in ids:
+        for data_collection in vars(data).values():
+            if isinstance(data_collection, StubDataCollection) and datablock in data_collection._items.values():
+                data_collection.remove(datablock)
+
+def reset():
+
+    counters.clear()
+    data.collections = StubDataCollection(StubCollection)
+    data.materials = StubDataCollection(StubMaterial)
+    data.images = StubDataCollection(StubImage)
+    data.textures = StubDataCollection(StubID)
+    data.meshes = StubMeshes(StubMesh)
+    data.armatures = StubDataCollection(StubArmature)
+    data.actions = StubDataCollection(StubAction)
+    data.node_groups = StubDataCollection(StubNodeTree)
+    data.objects = StubDataCollection(_new_object)
+    data.collections.new("Collection")
+    data.batch_remove = _batch_remove
+
+    context.selected_objects = []
+    context.scene = types.SimpleNamespace(collection=StubCollection("Scene Collection"), frame_start=1,
+        render=types.SimpleNamespace(fps=24, fps_base=1.0), camera=None, cursor=types.SimpleNamespace(location=StubVector((0.0, 0.0, 0.0))))
+    context.evaluated_depsgraph_get = lambda: None
+    context.view_layer = types.SimpleNamespace(objects=types.SimpleNamespace(active=None), update=_view_layer_update)
+    context.preferences = types.SimpleNamespace(edit=types.SimpleNamespace(use_global_undo=True))
+    context.window_manager = types.SimpleNamespace(progress_begin=lambda low, high: None, progress_update=lambda value: None,
+        progress_end=lambda: None)
+
+    ops.import_scene = types.SimpleNamespace(gltf=_import_gltf)
+    ops.object = types.SimpleNamespace(select_all=_select_all)
+    ops.wm = types.SimpleNamespace(save_as_mainfile=_save_as_mainfile)
+
+reset()
@@ -0,0 +1,138 @@
+import os
+import json
+import struct
+import random
+import sqlite3
+
+# Builds a lantern_server.db shaped like the tables eq_spawn_plan.py queries, plus a fake
+# Exports/<zone>/Characters folder, so the character import pipeline can be timed without
+# an EverQuest install or the LanternEQ database
+
+Schema = """
+create table alkabor_spawn2 (id integer primary key, spawngroupID integer, zone text, x real, y real, z real,
+    heading real, pathgrid integer, enabled integer);
+create table alkabor_spawngroup (id integer primary key, spawn_limit integer, dist real);
+create table alkabor_spawnentry (spawngroupID integer, npcID integer, chance integer);
+create table alkabor_npc_types (id integer primary key, name text, race integer, gender integer, face integer,
+    texture integer, d_melee_texture1 integer, d_melee_texture2 integer, helmtexture integer, size real,
+    loottable_id integer, class_ integer);
+create table alkabor_loottable (id integer primary key);
+create table alkabor_loottable_entries (loottable_id integer, lootdrop_id integer, probability integer);
+create table alkabor_lootdrop_entries (lootdrop_id integer, item_id integer, chance integer, equip_item integer);
+create table items (id integer primary key, idfile text, itemtype integer, slots integer);
+create table alkabor_zone (short_name text, zoneidnumber integer);
+create table alkabor_grid_entries (gridid integer, zoneid integer, number integer, x real, y real, z real,
+    heading real, pause integer);
+"""
+
+# (race id, genders) pairs that exist in RaceData.csv. Player races first
+Player_Races = [(1, [0, 1]), (2, [0, 1]), (3, [0, 1]), (4, [0, 1]), (128, [0, 1])]
+Npc_Races = [(13, [2]), (14, [2]), (39, [2]), (40, [2]), (54, [2]), (60, [2]), (75, [2]), (209, [2]), (158, [2])]
+
+def create_synthetic_db(db_path, zone_names, spawns_per_zone, seed=0, patrol_fraction=0.25):
+
+    rng = random.Random(seed)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    db_connection = sqlite3.connect(db_path)
+    cursor = db_connection.cursor()
+    cursor.executescript(Schema)
+
+    item_count = 400
+    items = []
+    for item_id in range(1, item_count + 1):
+        items.append((item_id, "IT{0}".format(rng.randint(1, 250)), rng.choice([0, 1, 2, 3, 4, 5, 8, 35]),
+            rng.choice([8192, 16384, 24576, 8192 | 16384, 2])))
+    cursor.executemany("insert into items values (?, ?, ?, ?)", items)
+
+    loottable_count = max(10, spawns_per_zone // 4)
+    lootdrop_count = loottable_count * 2
+    cursor.executemany("insert into alkabor_loottable values (?)", [(i,) for i in range(1, loottable_count + 1)])
+    cursor.executemany("insert into alkabor_loottable_entries values (?, ?, ?)",
+        [(rng.randint(1, loottable_count), rng.randint(1, lootdrop_count), rng.choice([10, 25, 50, 100]))
+            for _ in range(loottable_count * 3)])
+    cursor.executemany("insert into alkabor_lootdrop_entries values (?, ?, ?, ?)",
+        [(rng.randint(1, lootdrop_count), rng.randint(1, item_count), rng.choice([10, 50, 75, 100]), rng.randint(0, 1))
+            for _ in range(lootdrop_count * 4)])
+
+    npc_id = 0
+    spawngroup_id = 0
+    spawn2_id = 0
+    for zone_id, zone_name in enumerate(zone_names, 1):
+        # Path grids 1-20 that the patrols' spawn points use
+        cursor.execute("insert into alkabor_zone values (?, ?)", (zone_name, zone_id))
+        for grid_id in range(1, 21):
+            for number in range(1, rng.randint(3, 12)):
+                cursor.execute("insert into alkabor_grid_entries values (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (grid_id, zone_id, number, rng.uniform(-2000, 2000), rng.uniform(-2000, 2000), rng.uniform(-100, 100),
+                    -1, rng.choice([0, 0, 5, 30])))
+
+        # Roughly one NPC type per three spawn points, like a typical zone
+        zone_npc_ids = []
+        for _ in range(max(5, spawns_per_zone // 3)):
+            npc_id += 1
+            race, genders = rng.choice(Npc_Races * 4 + Player_Races)
+            cursor.execute("insert into alkabor_npc_types values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (npc_id, "{0}_npc_{1}".format(zone_name, npc_id), race, rng.choice(genders), rng.randint(0, 3),
+                rng.choice([0, 0, 1, 2]), rng.choice([0, 0, 5, 1000]), rng.choice([0, 0, 3]), rng.choice([0, 0, 1]),
+                rng.choice([0.0, 6.0, 10.0]), rng.randint(0, loottable_count), rng.randint(1, 30)))
+            zone_npc_ids.append(npc_id)
+
+        zone_spawn_count = 0
+        while zone_spawn_count < spawns_per_zone:
+            spawngroup_id += 1
+            is_patrol = rng.random() < patrol_fraction
+            cursor.execute("insert into alkabor_spawngroup values (?, ?, ?)",
+                (spawngroup_id, rng.choice([0, 0, 1]), rng.choice([50.0, 0.0]) if is_patrol else 0.0))
+            entry_chances = rng.choice([[100], [50, 50], [50, 25, 25], [70, 20, 10]])
+            for chance in entry_chances:
+                cursor.execute("insert into alkabor_spawnentry values (?, ?, ?)", (spawngroup_id, rng.choice(zone_npc_ids), chance))
+            for _ in range(rng.randint(1, 3)):
+                spawn2_id += 1
+                zone_spawn_count += 1
+                cursor.execute("insert into alkabor_spawn2 values (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (spawn2_id, spawngroup_id, zone_name, rng.uniform(-2000, 2000), rng.uniform(-2000, 2000),
+                    rng.uniform(-100, 100), rng.uniform(0, 512), rng.randint(1, 20) if is_patrol else 0,
+                    0 if rng.random() < 0.05 else 1))
+
+    db_connection.commit()
+    db_connection.close()
+
+def create_characters_folder(characters_folder, model_names, model_extension, distinct_texture_count=8):
+
+    # The model files only reference their race texture, for the prefetcher to follow
+    os.makedirs(characters_folder, exist_ok=True)
+    for model_name in model_names:
+        with open(os.path.join(characters_folder, "{0}.{1}".format(model_name, model_extension)), "w") as f_stream:
+            f_stream.write(json.dumps({"images": [{"uri": "Textures/" + model_name.split('_')[0].lower() + "ch0001.png"}]}))
+
+    # One texture per race, named like the stub glTF importer expects. Races share a few distinct contents,
+    # like skins the extractor saves under several names, so content deduplication has work to do
+    textures_folder = os.path.join(characters_folder, "Textures")
+    os.makedirs(textures_folder, exist_ok=True)
+    race_identifiers = sorted(set(n.split('_')[0].lower() for n in model_names))
+    for index, race_identifier in enumerate(race_identifiers):
+        size = 64 << (index % distinct_texture_count % 4)
+        png_header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sIIBBBBB", 13, b"IHDR", size, size, 8, 6, 0, 0, 0)
+        with open(os.path.join(textures_folder, race_identifier + "ch0001.png"), "wb") as f_stream:
+            f_stream.write(png_header + bytes([index % distinct_texture_count]) * 64)
+
+def get_zone_model_names(eq_spawn_plan, db_path, zone_name, db_race_translation_dict, exact_fraction, seed=0):
+
+    # Every race base model exists, plus the exact variant model for a fraction of the NPCs,
+    # so the benchmark exercises exact hits, backup fallbacks and player character misses
+    rng = random.Random(seed)
+    rows = eq_spawn_plan.query_for_characters_single_pass(db_path, zone_name, True, True)
+    model_names = set(db_race_translation_dict.values())
+    for row in rows:
+        race = int(row[6])
+        if eq_spawn_plan.is_player_character_race(race):
+            if rng.random() < exact_fraction:
+                model_names.add("{0}_{1}".format(str(row[5]).strip().strip('#'), row[4]))
+            continue
+        race_identifier, texture = eq_spawn_plan.get_npc_race_identifier_and_texture(row, db_race_translation_dict)
+        if rng.random() < exact_fraction:
+            model_names.add(eq_spawn_plan.get_unique_npc_string(race_identifier, texture, row))
+
+    return model_names
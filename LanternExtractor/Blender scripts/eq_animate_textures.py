@@ -1,63 +1,410 @@
 import bpy
 import os
+import sys
+import math
+import numpy as np
+from fractions import Fraction
 
 animated_texture_csv_location = "C:\\LanternExtractor\\Blender scripts\\animatedTextures.csv"
 
-def verify_multiple_frame_files_exist(image):
+# "DRIVER" uses a scripted driver per material, evaluated every frame change, as the script always did.
+# "BAKED" keys the frame offset over one cycle and shares the action between materials with the same
+# frame count and frame time, so nothing runs Python on frame changes.
+# Both play the frames as an image sequence, which Blender reloads from disk on every frame change.
+# "ATLAS" packs the frames into one <name>_atlas<frame count> image written next to them and keys a UV
+# offset instead, so the texture is loaded once. The UVs are wrapped into one frame of the atlas, which
+# keeps tiling textures working, but filtering can bleed slightly across frame edges
+animation_mode = "DRIVER"
 
-    blender_image_path = image.filepath
-    image_file_path = os.path.normpath(bpy.path.abspath(blender_image_path, library=image.library))
+# Materials whose baked cycle would need more keyframes than this fall back to a driver
+max_baked_keyframes = 20000
 
-    frame_number_index = image_file_path.rfind('1')
-    second_frame_file_name = image_file_path[:frame_number_index] + "2" + image_file_path[frame_number_index+1:]
+# Folder for the JSON run report. Leave empty to write it next to the .blend file
+run_report_folder = ""
 
-    return os.path.exists(second_frame_file_name)
+for scripts_folder in [os.path.dirname(os.path.abspath(__file__)), os.path.dirname(animated_texture_csv_location)]:
+    if os.path.exists(os.path.join(scripts_folder, "eq_instrumentation.py")) and scripts_folder not in sys.path:
+        sys.path.append(scripts_folder)
+        break
+import eq_instrumentation
+import eq_lookup_tables
 
-scene_fps = bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
+Image_Texture_Frame_Offset_Path = 'nodes["Image Texture"].image_user.frame_offset'
+Keyframe_Interpolation_Constant = 0 # Index of 'CONSTANT' in the keyframe interpolation enum
+Atlas_Mapping_Node = "Atlas Mapping"
+Atlas_Offset_Path = 'nodes["Atlas Mapping"].inputs[1].default_value'
 
-material_anim_dict = {}
+def get_frame_file_paths(image, frame_count, folder_index_dict):
 
-with open(animated_texture_csv_location) as f_stream:
+    # Frames sit next to the first one with its last '1' counting up, e.g. fire1.png, fire2.png ... fire10.png.
+    # Each folder is listed once and the frames are looked up in that listing
+    image_file_path = os.path.normpath(bpy.path.abspath(image.filepath, library=image.library))
+    folder, file_name = os.path.split(image_file_path)
+    frame_number_index = file_name.rfind('1')
+    if frame_number_index < 0:
+        return []
 
-    for line in f_stream:
- 
-        mat_anim_info = line.strip().split(',')
-        mat_name = mat_anim_info[0]
-        anim_frame_count = int(mat_anim_info[1])
-        anim_frame_time = int(mat_anim_info[2])
+    if folder not in folder_index_dict:
+        folder_index_dict[folder] = set(os.path.normcase(e.name) for e in os.scandir(folder)) if os.path.isdir(folder) else set()
 
-        material_anim_dict[mat_name] = (anim_frame_count, anim_frame_time)
+    frame_file_paths = []
+    for frame_number in range(1, frame_count + 1):
+        frame_file_name = file_name[:frame_number_index] + str(frame_number) + file_name[frame_number_index + 1:]
+        if os.path.normcase(frame_file_name) not in folder_index_dict[folder]:
+            break
+        frame_file_paths.append(os.path.join(folder, frame_file_name))
 
-for mat in bpy.data.materials:
-    
-    if not mat.name in material_anim_dict:
-        continue
-    
-    if not mat.node_tree:
-        continue
-    
-    nodes = mat.node_tree.nodes
-    links = mat.node_tree.links
+    return frame_file_paths
+
+def get_material_anim_info(mat_name, material_anim_dict):
+
+    if mat_name in material_anim_dict:
+        return material_anim_dict[mat_name]
+
+    # Duplicated materials such as "d_agua1.001"
+    if len(mat_name) > 4 and mat_name[-4] == '.' and mat_name[-3:].isnumeric():
+        return material_anim_dict.get(mat_name[:-4])
+
+    return None
+
+def get_frame_offset(frame, frame_multiplier, frame_count):
+
+    # Same as the driver expression. Blender adds the offset after wrapping the current
+    # frame into the sequence, so the frame term has to be cancelled out exactly
+    return math.floor(frame_multiplier * frame) % frame_count - ((frame - 1) % frame_count)
+
+def get_baked_cycle_length(frame_multiplier, frame_count):
 
-    base_color_node = nodes.get("Image Texture")
-    
-    if not base_color_node:
-        continue
+    # floor(k * frame) % n repeats every numerator(n / k) frames, and (frame - 1) % n every n frames
+    image_cycle_length = (frame_count / frame_multiplier).numerator
+    return image_cycle_length * frame_count // math.gcd(image_cycle_length, frame_count)
 
-    if not verify_multiple_frame_files_exist(base_color_node.image):
-        print("Material " + mat.name + " does not have multiple image frames - skipping")
-        continue
-    
-    frame_count = material_anim_dict[mat.name][0]
-    anim_frame_time = material_anim_dict[mat.name][1]
+def get_baked_offset_action(frame_count, anim_frame_time, frame_multiplier, signature_action_dict):
 
-    base_color_node.image.source = 'SEQUENCE'
-    base_color_node.image_user.frame_duration = frame_count
-    base_color_node.image_user.use_cyclic = True
-    base_color_node.image_user.use_auto_refresh = True
+    signature = (frame_count, anim_frame_time)
+    if signature in signature_action_dict:
+        return signature_action_dict[signature]
+
+    action_name = "EQAnimatedTexture_{0}_{1}".format(frame_count, anim_frame_time)
+    action = bpy.data.actions.get(action_name)
+    if action:
+        bpy.data.actions.remove(action)
+    action = bpy.data.actions.new(action_name)
+    action.use_fake_user = True
+
+    cycle_length = get_baked_cycle_length(frame_multiplier, frame_count)
+    fcurve = action.fcurves.new(Image_Texture_Frame_Offset_Path)
+    fcurve.keyframe_points.add(cycle_length + 1)
+    keyframe_coordinates = []
+    for frame in range(1, cycle_length + 2):
+        keyframe_coordinates.extend((frame, get_frame_offset(frame, frame_multiplier, frame_count)))
+    fcurve.keyframe_points.foreach_set("co", keyframe_coordinates)
+    fcurve.keyframe_points.foreach_set("interpolation", np.full(cycle_length + 1, Keyframe_Interpolation_Constant, dtype=np.int32))
+    cycles_modifier = fcurve.modifiers.new('CYCLES')
+    cycles_modifier.mode_before = 'REPEAT'
+    cycles_modifier.mode_after = 'REPEAT'
+    fcurve.update()
+
+    signature_action_dict[signature] = action
+    return action
+
+def add_offset_driver(base_color_node, frame_multiplier, frame_count):
 
     fcurve = base_color_node.image_user.driver_add("frame_offset")
     fcurve.driver.type = "SCRIPTED"
+    fcurve.driver.expression = "floor({0}*frame) % {1} - ((frame-1) % {1})".format(float(frame_multiplier), frame_count)
+
+def get_atlas_layout(frame_count):
+
+    # Close to square so the atlas stays within texture size limits
+    columns = math.ceil(math.sqrt(frame_count))
+    return columns, math.ceil(frame_count / columns)
+
+def get_atlas_offset(frame_index, columns, rows):
+
+    # Frame 0 is in the bottom left, the same corner Blender's pixels start from
+    return (frame_index % columns) / columns, (frame_index // columns) / rows
+
+def get_atlas_image(frame_file_paths, atlas_dict, run_report):
+
+    # One atlas per animated texture, written next to its frames and reused until a frame changes
+    first_frame_path = frame_file_paths[0]
+    if first_frame_path in atlas_dict:
+        return atlas_dict[first_frame_path]
+
+    frame_count = len(frame_file_paths)
+    folder, file_name = os.path.split(first_frame_path)
+    frame_number_index = file_name.rfind('1')
+    atlas_file_name = "{0}_atlas{1}{2}".format(file_name[:frame_number_index], frame_count, file_name[frame_number_index + 1:])
+    atlas_path = os.path.join(folder, os.path.splitext(atlas_file_name)[0] + ".png")
+    columns, rows = get_atlas_layout(frame_count)
+
+    if os.path.exists(atlas_path) and os.path.getmtime(atlas_path) >= max(os.path.getmtime(p) for p in frame_file_paths):
+        atlas_image = bpy.data.images.load(atlas_path, check_existing=True)
+        run_report.count("atlases_reused")
+    else:
+        frame_images = [bpy.data.images.load(p, check_existing=True) for p in frame_file_paths]
+        width, height = frame_images[0].size
+        if any(tuple(i.size) != (width, height) for i in frame_images):
+            print("Frames of " + first_frame_path + " are not all the same size - not making an atlas")
+            atlas_image = None
+        else:
+            atlas_image = write_atlas_image(frame_images, atlas_path, columns, rows)
+            run_report.count("atlases_written")
+
+        # The frames were only loaded to read their pixels
+        for frame_image in frame_images:
+            if not frame_image.users:
+                bpy.data.images.remove(frame_image)
+        if not atlas_image:
+            atlas_dict[first_frame_path] = None
+            return None
+
+    atlas_dict[first_frame_path] = (atlas_image, columns, rows)
+    return atlas_dict[first_frame_path]
+
+def write_atlas_image(frame_images, atlas_path, columns, rows):
+
+    width, height = frame_images[0].size
+    atlas_image = bpy.data.images.new(os.path.basename(atlas_path), width * columns, height * rows, alpha=True)
+    atlas_pixels = np.zeros((height * rows, width * columns, 4), dtype=np.float32)
+    frame_pixels = np.empty(width * height * 4, dtype=np.float32)
+    for frame_index, frame_image in enumerate(frame_images):
+        frame_image.pixels.foreach_get(frame_pixels)
+        column = frame_index % columns
+        row = frame_index // columns
+        atlas_pixels[row * height:(row + 1) * height, column * width:(column + 1) * width] = frame_pixels.reshape(height, width, 4)
+    atlas_image.pixels.foreach_set(atlas_pixels.ravel())
+    atlas_image.colorspace_settings.name = frame_images[0].colorspace_settings.name
+    atlas_image.filepath_raw = atlas_path
+    atlas_image.file_format = 'PNG'
+    atlas_image.save()
+
+    return atlas_image
+
+def add_atlas_mapping(mat, base_color_node, columns, rows):
+
+    # UV -> wrap into 0-1 -> scale and offset into the current frame of the atlas
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    mapping_node = nodes.get(Atlas_Mapping_Node)
+    if not mapping_node:
+        existing_vector_link = next((l for l in links if l.to_socket == base_color_node.inputs[0]), None)
+        if existing_vector_link:
+            uv_socket = existing_vector_link.from_socket
+        else:
+            uv_socket = nodes.new('ShaderNodeTexCoord').outputs["UV"]
+        fraction_node = nodes.new('ShaderNodeVectorMath')
+        fraction_node.operation = 'FRACTION'
+        mapping_node = nodes.new('ShaderNodeMapping')
+        mapping_node.name = Atlas_Mapping_Node
+        links.new(uv_socket, fraction_node.inputs[0])
+        links.new(fraction_node.outputs[0], mapping_node.inputs[0])
+        links.new(mapping_node.outputs[0], base_color_node.inputs[0])
+
+    mapping_node.inputs["Scale"].default_value = (1.0 / columns, 1.0 / rows, 1.0)
+    return mapping_node
+
+def get_atlas_offset_keys(frame_count, frame_multiplier):
+
+    # floor(k * frame) % n repeats every numerator(n / k) frames. Constant keys are only
+    # needed where the frame changes, plus one closing the cycle
+    columns, rows = get_atlas_layout(frame_count)
+    cycle_length = (frame_count / frame_multiplier).numerator
+    key_frames = []
+    previous_frame_index = None
+    for frame in range(1, cycle_length + 2):
+        frame_index = math.floor(frame_multiplier * frame) % frame_count
+        if frame_index != previous_frame_index or frame == cycle_length + 1:
+            key_frames.append((frame, get_atlas_offset(frame_index, columns, rows)))
+        previous_frame_index = frame_index
+
+    return key_frames
+
+def get_atlas_offset_keyframe_coordinates(key_frames, axis_index):
+
+    keyframe_coordinates = []
+    for frame, offset in key_frames:
+        keyframe_coordinates.extend((frame, offset[axis_index]))
+
+    return keyframe_coordinates
+
+def is_atlas_offset_action_current(action, key_frames):
+
+    # The keys also depend on the scene frame rate, so an action from an earlier run is checked key for key
+    for axis_index in range(2):
+        fcurve = action.fcurves.find(Atlas_Offset_Path, index=axis_index)
+        if not fcurve or len(fcurve.keyframe_points) != len(key_frames):
+            return False
+        keyframe_coordinates = np.empty(len(key_frames) * 2, dtype=np.float32)
+        fcurve.keyframe_points.foreach_get("co", keyframe_coordinates)
+        if not np.allclose(keyframe_coordinates, get_atlas_offset_keyframe_coordinates(key_frames, axis_index)):
+            return False
+
+    return True
+
+def get_atlas_offset_action(frame_count, anim_frame_time, frame_multiplier, signature_action_dict):
+
+    signature = ("ATLAS", frame_count, anim_frame_time)
+    if signature in signature_action_dict:
+        return signature_action_dict[signature]
+
+    key_frames = get_atlas_offset_keys(frame_count, frame_multiplier)
+
+    # Materials atlased by an earlier run are skipped but still play this action, so it's reused, or
+    # rebuilt in place if the keys changed, rather than replaced
+    action_name = "EQAtlasOffset_{0}_{1}".format(frame_count, anim_frame_time)
+    action = bpy.data.actions.get(action_name)
+    if action and is_atlas_offset_action_current(action, key_frames):
+        signature_action_dict[signature] = action
+        return action
+    if action:
+        for fcurve in list(action.fcurves):
+            action.fcurves.remove(fcurve)
+    else:
+        action = bpy.data.actions.new(action_name)
+        action.use_fake_user = True
+
+    for axis_index in range(2):
+        fcurve = action.fcurves.new(Atlas_Offset_Path, index=axis_index)
+        fcurve.keyframe_points.add(len(key_frames))
+        fcurve.keyframe_points.foreach_set("co", get_atlas_offset_keyframe_coordinates(key_frames, axis_index))
+        fcurve.keyframe_points.foreach_set("interpolation", np.full(len(key_frames), Keyframe_Interpolation_Constant, dtype=np.int32))
+        cycles_modifier = fcurve.modifiers.new('CYCLES')
+        cycles_modifier.mode_before = 'REPEAT'
+        cycles_modifier.mode_after = 'REPEAT'
+        fcurve.update()
+
+    signature_action_dict[signature] = action
+    return action
+
+def add_atlas_offset_drivers(mapping_node, frame_multiplier, frame_count, columns, rows):
+
+    frame_index_expression = "(floor({0}*frame) % {1})".format(float(frame_multiplier), frame_count)
+    offset_expressions = [
+        "{0} % {1} / {1}".format(frame_index_expression, columns),
+        "floor({0} / {1}) / {2}".format(frame_index_expression, columns, rows),
+    ]
+    for axis_index, offset_expression in enumerate(offset_expressions):
+        fcurve = mapping_node.inputs[1].driver_add("default_value", axis_index)
+        fcurve.driver.type = "SCRIPTED"
+        fcurve.driver.expression = offset_expression
+
+def load_material_anim_dict(animated_texture_csv_path):
+
+    material_anim_dict = {}
+    with open(animated_texture_csv_path) as f_stream:
+
+        for line in f_stream:
+     
+            mat_anim_info = line.strip().split(',')
+            mat_name = mat_anim_info[0]
+            anim_frame_count = int(mat_anim_info[1])
+            anim_frame_time = int(mat_anim_info[2])
+
+            material_anim_dict[mat_name] = (anim_frame_count, anim_frame_time)
+
+    return material_anim_dict
+
+def animate_textures(animated_texture_csv_location, animation_mode, max_baked_keyframes, run_report_folder):
+
+    run_report = eq_instrumentation.RunReport("eq_animate_textures")
+
+    render_settings = bpy.context.scene.render
+    scene_fps = Fraction(render_settings.fps) / Fraction(render_settings.fps_base).limit_denominator(1000)
+
+    with run_report.phase("load_csv"):
+        material_anim_dict = eq_lookup_tables.load_memoized(animated_texture_csv_location, load_material_anim_dict)
+
+    signature_action_dict = {}
+    folder_index_dict = {}
+    atlas_dict = {}
+    baked_count = 0
+    driver_count = 0
+    atlas_count = 0
+
+    with run_report.phase("animate_materials"):
+        for mat in bpy.data.materials:
+        
+            mat_anim_info = get_material_anim_info(mat.name, material_anim_dict)
+            if not mat_anim_info:
+                continue
+        
+            if not mat.node_tree:
+                continue
+        
+            nodes = mat.node_tree.nodes
+
+            base_color_node = nodes.get("Image Texture")
+        
+            if not base_color_node:
+                continue
+
+            frame_count = mat_anim_info[0]
+            anim_frame_time = mat_anim_info[1]
+
+            # Already pointing at an atlas from an earlier run
+            if mat.node_tree.nodes.get(Atlas_Mapping_Node):
+                run_report.count("materials_atlas_already_done")
+                continue
+
+            frame_file_paths = get_frame_file_paths(base_color_node.image, frame_count, folder_index_dict)
+            if len(frame_file_paths) < 2:
+                print("Material " + mat.name + " does not have multiple image frames - skipping")
+                run_report.count("materials_single_frame_skipped")
+                continue
+
+            frame_multiplier = (1000 / scene_fps) / anim_frame_time
+
+            if animation_mode == "ATLAS":
+                atlas_info = get_atlas_image(frame_file_paths, atlas_dict, run_report) if len(frame_file_paths) == frame_count else None
+                if atlas_info:
+                    atlas_image, columns, rows = atlas_info
+                    base_color_node.image_user.driver_remove("frame_offset")
+                    base_color_node.image = atlas_image
+                    mapping_node = add_atlas_mapping(mat, base_color_node, columns, rows)
+                    if (frame_count / frame_multiplier).numerator < max_baked_keyframes:
+                        mapping_node.inputs[1].driver_remove("default_value")
+                        if not mat.node_tree.animation_data:
+                            mat.node_tree.animation_data_create()
+                        mat.node_tree.animation_data.action = get_atlas_offset_action(frame_count, anim_frame_time, frame_multiplier, signature_action_dict)
+                    else:
+                        add_atlas_offset_drivers(mapping_node, frame_multiplier, frame_count, columns, rows)
+                        driver_count += 1
+                    atlas_count += 1
+                    continue
+                # Missing frames or frames of different sizes play as an image sequence instead
+
+            base_color_node.image.source = 'SEQUENCE'
+            base_color_node.image_user.frame_duration = frame_count
+            base_color_node.image_user.use_cyclic = True
+            base_color_node.image_user.use_auto_refresh = True
+
+            if animation_mode != "DRIVER" and get_baked_cycle_length(frame_multiplier, frame_count) < max_baked_keyframes:
+                base_color_node.image_user.driver_remove("frame_offset")
+                if not mat.node_tree.animation_data:
+                    mat.node_tree.animation_data_create()
+                mat.node_tree.animation_data.action = get_baked_offset_action(frame_count, anim_frame_time, frame_multiplier, signature_action_dict)
+                baked_count += 1
+            else:
+                add_offset_driver(base_color_node, frame_multiplier, frame_count)
+                driver_count += 1
+
+    print("Animated {0} materials with {1} shared baked actions, {2} through atlases and {3} with drivers".format(
+        baked_count, len(signature_action_dict), atlas_count, driver_count))
+
+    run_report.count("materials_baked", baked_count)
+    run_report.count("materials_driver", driver_count)
+    run_report.count("materials_atlas", atlas_count)
+    run_report.count("shared_actions", len(signature_action_dict))
+    run_report.print_summary()
+
+    report_path = eq_instrumentation.get_report_path(run_report_folder, bpy.data.filepath,
+        os.path.splitext(os.path.basename(bpy.data.filepath) or "untitled")[0] + "_animate_textures_report.json")
+    if report_path:
+        run_report.write(report_path)
+
+###### SCRIPT START ######
 
-    frame_multiplier = (1000 / scene_fps) / anim_frame_time
-    fcurve.driver.expression = "floor({0}*frame) % {1} - ((frame-1) % {1})".format(frame_multiplier, frame_count)
\ No newline at end of file
+if __name__ == "__main__":
+    animate_textures(animated_texture_csv_location, animation_mode, max_baked_keyframes, run_report_folder)
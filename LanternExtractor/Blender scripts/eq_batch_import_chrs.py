@@ -0,0 +1,189 @@
+import os
+import sys
+import ast
+import json
+import time
+import argparse
+import subprocess
+import concurrent.futures
+
+# Runs eq_import_chrs.py headless for a list of zones, several Blender processes at a time.
+# Run with a regular Python install, not from inside Blender:
+#
+# python eq_batch_import_chrs.py --blender "C:\Program Files\Blender Foundation\Blender 3.6\blender.exe"
+#     --output-folder "C:\LanternExtractor\Blends" gfaydark crushbone akanon
+#
+# Each zone is written to <output folder>/<zone>_characters.blend along with a <zone>_characters.log
+# of the Blender output. Every eq_import_chrs.py option can be given here and is passed to each worker,
+# options that aren't given fall back to the CONFIG block of eq_import_chrs.py
+#
+# With --spawn-cache-folder and --db-location, the spawn cache for every zone is brought up to date before
+# the workers start, so the workers only read it instead of each querying the database
+
+# eq_import_chrs.py options set per worker rather than passed through from the command line
+worker_options = ["zone_name", "output_blend_location"]
+
+def get_import_script_options(import_script_path):
+
+    # Every option parse_command_line_config in the import script defines is passed straight through to the
+    # workers. The script can only be imported inside Blender, so the options are read from its source.
+    # Returns a dict of option name to "flag", "list" or "value"
+    with open(import_script_path) as f_stream:
+        module_node = ast.parse(f_stream.read())
+    parse_function_node = next(n for n in module_node.body if isinstance(n, ast.FunctionDef) and n.name == "parse_command_line_config")
+
+    import_script_options = {}
+    for node in ast.walk(parse_function_node):
+        if not isinstance(node, ast.Call) or getattr(node.func, "attr", None) != "add_argument":
+            continue
+        option = node.args[0].value[2:].replace('-', '_')
+        keyword_names = set(k.arg for k in node.keywords)
+        if option in worker_options:
+            continue
+        if "action" in keyword_names:
+            import_script_options[option] = "flag"
+        elif "nargs" in keyword_names:
+            import_script_options[option] = "list"
+        else:
+            import_script_options[option] = "value"
+
+    return import_script_options
+
+def parse_arguments():
+
+    default_import_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eq_import_chrs.py")
+    import_script_parser = argparse.ArgumentParser(add_help=False)
+    import_script_parser.add_argument("--import-script", default=default_import_script)
+    import_script_options = get_import_script_options(import_script_parser.parse_known_args()[0].import_script)
+
+    parser = argparse.ArgumentParser(description="Import characters for many zones with parallel headless Blender workers")
+    parser.add_argument("zones", nargs="*", help="Zone shortnames to import")
+    parser.add_argument("--zones-file", help="Text file with one zone shortname per line")
+    parser.add_argument("--blender", default="blender", help="Path to the Blender executable")
+    parser.add_argument("--output-folder", required=True, help="Folder the <zone>_characters.blend files are written to")
+    parser.add_argument("--template-blend", help="Open this .blend as the starting file instead of Blender's factory startup")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of Blender processes to run at once")
+    parser.add_argument("--import-script", default=default_import_script)
+    for option, option_kind in import_script_options.items():
+        if option_kind == "flag":
+            parser.add_argument("--" + option.replace('_', '-'), default=None, action=argparse.BooleanOptionalAction)
+        elif option_kind == "list":
+            parser.add_argument("--" + option.replace('_', '-'), default=None, nargs="*")
+        else:
+            parser.add_argument("--" + option.replace('_', '-'))
+
+    args = parser.parse_args()
+    args.import_script_options = import_script_options
+
+    zones = list(args.zones)
+    if args.zones_file:
+        with open(args.zones_file) as f_stream:
+            for line in f_stream:
+                zone = line.strip()
+                if zone and not zone.startswith('#'):
+                    zones.append(zone)
+    if not zones:
+        parser.error("no zones given")
+    args.zones = list(dict.fromkeys(zones))
+
+    return args
+
+def build_worker_command(args, zone, output_blend_path):
+
+    command = [args.blender, "-b"]
+    if args.template_blend:
+        command.append(args.template_blend)
+    else:
+        command.append("--factory-startup")
+    command.extend(["--python-exit-code", "1", "--python", args.import_script, "--"])
+    command.extend(["--zone-name", zone, "--output-blend-location", output_blend_path])
+
+    for option, option_kind in args.import_script_options.items():
+        value = getattr(args, option)
+        if value is None:
+            continue
+        if option_kind == "flag":
+            command.append("--" + ("" if value else "no-") + option.replace('_', '-'))
+        elif option_kind == "list":
+            command.extend(["--" + option.replace('_', '-')] + value)
+        else:
+            command.extend(["--" + option.replace('_', '-'), value])
+
+    return command
+
+def run_worker(args, zone):
+
+    output_blend_path = os.path.abspath(os.path.join(args.output_folder, zone + "_characters.blend"))
+    log_path = os.path.join(args.output_folder, zone + "_characters.log")
+    command = build_worker_command(args, zone, output_blend_path)
+
+    start_wall_time = time.time()
+    start_time = time.perf_counter()
+    with open(log_path, "w") as log_stream:
+        completed_process = subprocess.run(command, stdout=log_stream, stderr=subprocess.STDOUT)
+    elapsed_seconds = time.perf_counter() - start_time
+
+    # Don't count a .blend left over from an earlier batch as this run's output
+    succeeded = (completed_process.returncode == 0 and os.path.exists(output_blend_path)
+        and os.path.getmtime(output_blend_path) >= start_wall_time)
+    return {
+        "zone": zone,
+        "succeeded": succeeded,
+        "return_code": completed_process.returncode,
+        "seconds": round(elapsed_seconds, 2),
+        "blend": output_blend_path if succeeded else None,
+        "log": log_path,
+    }
+
+def print_summary(results, total_seconds):
+
+    print()
+    print("{0:<16} {1:<8} {2:>10}".format("Zone", "Result", "Seconds"))
+    for result in results:
+        print("{0:<16} {1:<8} {2:>10.2f}".format(result["zone"], "OK" if result["succeeded"] else "FAILED", result["seconds"]))
+
+    failures = [r for r in results if not r["succeeded"]]
+    print()
+    print("{0} zones imported, {1} failed in {2:.2f} seconds".format(len(results) - len(failures), len(failures), total_seconds))
+    for failure in failures:
+        print("  " + failure["zone"] + ": see " + failure["log"])
+
+def update_spawn_cache(args):
+
+    # eq_spawn_plan.py doesn't need Blender, so the cache is built here once rather than by the first workers
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.import_script)))
+    import eq_spawn_plan
+
+    db_working_copy_location = args.db_working_copy_location or os.path.splitext(args.db_location)[0] + "_indexed.db"
+    eq_spawn_plan.get_spawn_cache_index(args.db_location, db_working_copy_location, args.spawn_cache_folder)
+
+###### SCRIPT START ######
+
+if __name__ == "__main__":
+
+    args = parse_arguments()
+    os.makedirs(args.output_folder, exist_ok=True)
+    if args.spawn_cache_folder and args.db_location:
+        update_spawn_cache(args)
+
+    print("Importing {0} zones with {1} workers...".format(len(args.zones), args.workers))
+    batch_start_time = time.perf_counter()
+    results = []
+    # The workers are separate Blender processes; threads only wait on them
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
+        future_to_zone_dict = {executor.submit(run_worker, args, zone): zone for zone in args.zones}
+        for future in concurrent.futures.as_completed(future_to_zone_dict):
+            result = future.result()
+            print("{0}: {1} ({2:.2f} seconds)".format(result["zone"], "OK" if result["succeeded"] else "FAILED", result["seconds"]))
+            results.append(result)
+    total_seconds = time.perf_counter() - batch_start_time
+
+    results.sort(key=lambda r: args.zones.index(r["zone"]))
+    print_summary(results, total_seconds)
+
+    summary_path = os.path.join(args.output_folder, "batch_summary.json")
+    with open(summary_path, "w") as f_stream:
+        json.dump({"seconds": round(total_seconds, 2), "zones": results}, f_stream, indent=4)
+    print("Summary written to " + summary_path)
+
+    sys.exit(1 if any(not r["succeeded"] for r in results) else 0)
@@ -0,0 +1,186 @@
+import bpy
+import os
+import sys
+import argparse
+
+####### CONFIG #######
+# The Exports folder created by LanternExtractor
+lantern_export_folder = "C:\\LanternExtractor\\Exports"
+
+# Folder the character library is written to, one <zone>\<model>.blend per exported character model
+character_library_folder = "C:\\LanternExtractor\\Character Library"
+
+# Zone shortnames to build. Leave empty to build every zone in the Exports folder
+zones = []
+
+# Extension of the exported character model files, either "gltf" or "glb"
+model_extension = "gltf"
+
+# Folder this script and eq_instrumentation.py are in, only needed when running from Blender's Text Editor
+blender_scripts_folder = "C:\\LanternExtractor\\Blender scripts"
+
+# Folder for the JSON run report. Leave empty to write it to the library folder
+run_report_folder = ""
+####### CONFIG #######
+
+# Run headless once after exporting, and again after re-exporting. Models whose library is newer than their
+# export are skipped, so re-runs only convert what changed:
+# blender -b --factory-startup --python eq_character_library.py -- --lantern-export-folder C:\LanternExtractor\Exports
+#
+# eq_import_chrs.py then loads models from the library instead of running the glTF importer when its
+# character_library_folder is set. Models missing from the library, or older than their export, are still
+# imported from the glTF file
+
+for scripts_folder in [os.path.dirname(os.path.abspath(__file__)), blender_scripts_folder]:
+    if os.path.exists(os.path.join(scripts_folder, "eq_instrumentation.py")) and scripts_folder not in sys.path:
+        sys.path.append(scripts_folder)
+        break
+import eq_instrumentation
+
+class Constants:
+    Library_Extension = ".blend"
+    # The kinds of datablock a glTF import creates
+    Imported_Data_Collections = ["objects", "meshes", "materials", "images", "textures", "node_groups", "armatures", "actions", "collections"]
+
+def parse_command_line_config(argv):
+
+    parser = argparse.ArgumentParser(prog="eq_character_library.py")
+    parser.add_argument("--lantern-export-folder", default=lantern_export_folder)
+    parser.add_argument("--character-library-folder", default=character_library_folder)
+    parser.add_argument("--zones", default=zones, nargs="*")
+    parser.add_argument("--model-extension", default=model_extension, choices=["gltf", "glb"])
+    parser.add_argument("--run-report-folder", default=run_report_folder)
+
+    return parser.parse_args(argv[argv.index("--") + 1:] if "--" in argv else [])
+
+def get_library_path(library_folder, model_path):
+
+    # Exports\<zone>\Characters\<model>.gltf -> <library folder>\<zone>\<model>.blend
+    characters_folder, model_file_name = os.path.split(model_path)
+    zone_folder_name = os.path.basename(os.path.dirname(characters_folder))
+
+    return os.path.join(library_folder, zone_folder_name, os.path.splitext(model_file_name)[0] + Constants.Library_Extension)
+
+def is_library_current(library_path, model_path):
+
+    return os.path.exists(library_path) and os.path.getmtime(library_path) >= os.path.getmtime(model_path)
+
+def get_model_collection_name(model_path):
+
+    return os.path.splitext(os.path.basename(model_path))[0]
+
+def get_local_datablock_names():
+
+    return {data_name: set(d.name for d in getattr(bpy.data, data_name) if not d.library) for data_name in Constants.Imported_Data_Collections}
+
+def remove_new_datablocks(local_datablock_names):
+
+    # Only what was created since local_datablock_names was taken, so a build run in an open file leaves the
+    # file's own data alone, unused or not
+    new_datablocks = []
+    for data_name, datablock_names in local_datablock_names.items():
+        new_datablocks.extend(d for d in getattr(bpy.data, data_name) if not d.library and d.name not in datablock_names)
+    bpy.data.batch_remove(new_datablocks)
+
+def write_model_library(model_path, library_path):
+
+    # The imported objects go in one collection named after the model, and only that collection and what it
+    # uses is written. Images keep absolute paths to the exported textures rather than being packed. The
+    # collection is marked as an asset, so the library folder can be added to the Asset Browser as well
+    local_datablock_names = get_local_datablock_names()
+    try:
+        bpy.ops.object.select_all(action='DESELECT')
+        bpy.ops.import_scene.gltf(filepath=model_path)
+        imported_objs = list(bpy.context.selected_objects)
+
+        model_collection = bpy.data.collections.new(get_model_collection_name(model_path))
+        model_collection["eq_model_path"] = model_path
+        model_collection["eq_model_mtime"] = os.path.getmtime(model_path)
+        for obj in imported_objs:
+            for users_collection in list(obj.users_collection):
+                users_collection.objects.unlink(obj)
+            model_collection.objects.link(obj)
+        model_collection.asset_mark()
+
+        # Written beside the old library and swapped in, so an interrupted build never leaves a broken file
+        os.makedirs(os.path.dirname(library_path), exist_ok=True)
+        temporary_library_path = library_path + ".tmp"
+        bpy.data.libraries.write(temporary_library_path, {model_collection}, path_remap='ABSOLUTE', fake_user=True)
+        os.replace(temporary_library_path, library_path)
+    finally:
+        remove_new_datablocks(local_datablock_names)
+
+def load_model_from_library(library_path, link):
+
+    # Appended objects are local copies of everything in the library. Linked ones keep their meshes,
+    # materials, armatures and actions in the library file, shared and read only, and only the objects are
+    # made local so they can be placed. The objects are linked to the scene collection, unselected
+    with bpy.data.libraries.load(library_path, link=link) as (data_from, data_to):
+        data_to.objects = list(data_from.objects)
+    loaded_objs = [o for o in data_to.objects if o]
+
+    if link:
+        local_obj_dict = {linked_obj: linked_obj.make_local() for linked_obj in loaded_objs}
+        for local_obj in local_obj_dict.values():
+            if local_obj.parent in local_obj_dict:
+                local_obj.parent = local_obj_dict[local_obj.parent]
+            for modifier in local_obj.modifiers:
+                if modifier.type == "ARMATURE" and modifier.object in local_obj_dict:
+                    modifier.object = local_obj_dict[modifier.object]
+        loaded_objs = list(local_obj_dict.values())
+
+    for obj in loaded_objs:
+        bpy.context.scene.collection.objects.link(obj)
+
+    return loaded_objs
+
+def find_model_files(lantern_export_folder, zones, model_extension):
+
+    if not zones:
+        zones = sorted(e.name for e in os.scandir(lantern_export_folder) if e.is_dir())
+
+    model_file_suffix = os.path.normcase("." + model_extension)
+    model_paths = []
+    for zone in zones:
+        characters_folder = os.path.join(lantern_export_folder, zone, "Characters")
+        if not os.path.isdir(characters_folder):
+            continue
+        with os.scandir(characters_folder) as dir_entries:
+            for dir_entry in dir_entries:
+                if os.path.normcase(dir_entry.name).endswith(model_file_suffix) and dir_entry.is_file():
+                    model_paths.append(dir_entry.path)
+
+    return sorted(model_paths)
+
+def build_character_library(lantern_export_folder, character_library_folder, zones, model_extension, run_report_folder):
+
+    run_report = eq_instrumentation.RunReport("eq_character_library")
+
+    with run_report.phase("find_models"):
+        model_paths = find_model_files(lantern_export_folder, zones, model_extension)
+    print("Found {0} character models".format(len(model_paths)))
+
+    with run_report.phase("write_libraries"):
+        for model_path in model_paths:
+            library_path = get_library_path(character_library_folder, model_path)
+            if is_library_current(library_path, model_path):
+                run_report.count("libraries_current")
+                continue
+            try:
+                write_model_library(model_path, library_path)
+            except Exception as e:
+                print("Could not convert " + model_path + ": " + str(e))
+                run_report.count("libraries_failed")
+                continue
+            run_report.count("libraries_written")
+
+    run_report.print_summary()
+    run_report.write(os.path.join(run_report_folder or character_library_folder, "character_library_report.json"))
+    print("Done!")
+
+###### SCRIPT START ######
+
+if __name__ == "__main__":
+    config = parse_command_line_config(sys.argv)
+    build_character_library(config.lantern_export_folder, config.character_library_folder, config.zones, config.model_extension,
+        config.run_report_folder)
@@ -1,10 +1,11 @@
 import bpy
 import os
-import math
-import sqlite3
-import itertools
-import operator
-import random
+import sys
+import time
+import struct
+import hashlib
+import argparse
+import numpy as np
 
 ####### CONFIG #######
 # The shortname of the zone 
@@ -25,291 +26,226 @@ import_static = True
 # Import mobs that spawn in zone and either have patrol or roaming patterns
 import_patrols = False
 
+# How static spawns are added. "OBJECTS" imports every spawn as its own mesh and armature objects.
+# "INSTANCES" imports each model once and draws the spawns as Geometry Nodes instances on a single point
+# cloud object, for crowded zones where thousands of objects slow down the viewport. Instances of a
+# model all play the same animation
+static_spawn_mode = "OBJECTS"
+
+# Bake the path grid routes of patrols from the database into looping location and rotation keyframes.
+# Patrols without a grid, like roamers that only have a roam distance, stay at their spawn point
+bake_patrol_paths = False
+
+# Walking speed of patrols on their baked routes, in EQ units per second
+patrol_walk_speed = 15.0
+
+# Folder built by eq_character_library.py. Models are loaded from their library .blend instead of being
+# imported from the glTF export, which skips parsing the glTF files and textures on every import. Models
+# missing from the library, or exported again since it was built, are still imported from the glTF file.
+# Leave empty to always import the glTF files
+character_library_folder = ""
+
+# Link the library models instead of appending them. Linked meshes, materials, armatures and actions stay
+# in the library files, read only, which keeps the saved .blend small
+link_library_models = False
+
 # The extension of the glTF models exported by the Extractor. "gltf" or "glb"
 model_extension = "gltf"
 
 # The scale that converts EQ units to Blender units (meters)
 zone_scalar = 0.2
+
+# Fetch static and patrol spawns in a single query with the weapon picks precomputed per NPC.
+# Set to False to use the original per-category query
+use_fast_db_query = True
+
+# Local copy of the database that the fast query adds its helper indexes to. The copy is
+# refreshed whenever the database at db_location is newer
+db_working_copy_location = "C:\\LanternExtractor\\lantern_server_indexed.db"
+
+# Read the spawns from a cache of every zone, built with one pass over the database the first time it's
+# needed and again whenever the database changes. Worth it when importing many zones. Leave empty to
+# query the database for the zone on every run
+spawn_cache_folder = ""
+
+# Seed for picking which spawns appear. The same seed gives the same spawns every run, and the spawn plan
+# is cached next to the zone export folder until the zone, database or exports change. None picks a new seed
+# on the first import of a zone into a file and reuses it, stored on the Characters collection, on re-runs.
+# Re-imports only keep the spawns already in the file when the seed stays the same, a different seed picks
+# different spawns and most of the zone is imported again
+spawn_seed = None
+
+# Folder containing these scripts, so eq_spawn_plan.py can be imported when running from Blender's text editor
+blender_scripts_folder = "C:\\LanternExtractor\\Blender scripts"
+
+# Only keep these animations on the imported armatures, e.g. ["pos", "P01", "L01"] for the default pose,
+# idle and walk. Matched against the parts of the action name separated by '_'. Leave empty to keep all
+keep_animations = []
+
+# After importing, merge images with identical file content, e.g. the same skin saved under another name or
+# in another zone's Textures folder, into one image. Only images this import created are merged away, onto
+# an identical image already in the file where there is one. Other images in the file are never changed.
+# Hashing reads every image file once per session
+dedupe_images_by_content = True
+
+# Run the import as one bulk session: global undo is off for the run, so the glTF imports don't each push
+# an undo step holding a copy of the file, and a progress bar counts the spawns. The view layer is brought
+# up to date every view_layer_update_interval spawns instead of after each one. The undo setting is put
+# back when the import ends, even if it fails
+bulk_session_mode = True
+view_layer_update_interval = 50
+
+# Read the files of upcoming models on prefetch_workers background threads, up to prefetch_models_ahead
+# models ahead of the import loop, so the importer reads them from the OS file cache. With
+# dedupe_images_by_content the textures are also hashed there. 0 for either turns prefetching off. The run
+# report splits model import times into prefetched and not prefetched, to compare against a run without it
+prefetch_models_ahead = 8
+prefetch_workers = 4
+
+# Draw a lightweight proxy in the viewport in place of each character mesh, which is still used for
+# rendering. "BOUNDS" draws the model's rest pose bounding box, "DECIMATE" a decimated copy of the mesh
+# that's still deformed by the armature. Each model's proxy mesh is made once and shared by all its spawns.
+# "NONE" draws the full meshes and removes proxies made by an earlier run
+viewport_proxy_mode = "NONE"
+proxy_decimate_ratio = 0.1
+
+# Turn off armature deformation in the viewport for characters further than this from the scene camera,
+# or the 3D cursor when there's no camera, in Blender units. Render is unaffected. 0 deforms all of them
+viewport_deform_distance = 0.0
+
+# Write phase timings and counters to <zone>_characters_report.json in the zone's export folder
+write_run_report = True
+
+# Also dump a cProfile of the import loop to <zone>_characters_import.prof next to the report
+profile_import_loop = False
+
+# Save the .blend file here when the import finishes. Leave empty to keep the file open unsaved
+output_blend_location = ""
 ####### CONFIG #######
 
+# Any of the above can be overridden from the command line when running headless, e.g.
+# blender -b --python eq_import_chrs.py -- --zone-name gfaydark --output-blend-location gfaydark_characters.blend
+# See eq_batch_import_chrs.py for running many zones in parallel
+
+for scripts_folder in [os.path.dirname(os.path.abspath(__file__)), blender_scripts_folder]:
+    if os.path.exists(os.path.join(scripts_folder, "eq_spawn_plan.py")) and scripts_folder not in sys.path:
+        sys.path.append(scripts_folder)
+        break
+import eq_spawn_plan
+import eq_patrol_paths
+import eq_instrumentation
+import eq_lookup_tables
+import eq_character_library
+import eq_model_prefetch
+
 class Constants:
     Character_Collection = "Characters"
-    Static_Collection = "Static"
-    Patrols_Collection = "Patrols"
-    
-    Db_Query = """with npc_id_list as
-(
-	select distinct n.id
-	from alkabor_spawn2 s2
-	join alkabor_spawngroup sg on s2.spawngroupID = sg.id
-	join alkabor_spawnentry se on se.spawngroupID = sg.id
-	join alkabor_npc_types n on se.npcID = n.id
-	where s2.zone = '{0}'
-		and s2.enabled = 1
-		and (s2.pathgrid {1} 0 {2} sg.dist {1} 0.0)
-		and n.race <> 127 -- invisible man
-)
-select distinct sg.id as sgID, 
-	sg.spawn_limit as sg_limit, -- 1
-	s2.id as s2ID, -- 2
-	se.chance, -- 3
-	n.id as npcId, -- 4
-	n.name, -- 5
-	n.race, -- 6
-	n.gender, -- 7
-	n.face % 255 as face, -- 8 
-	n.texture, -- 9
-	case when n.d_melee_texture1 > 999 
-		then 0 
-		else n.d_melee_texture1 end as d_melee_texture1, -- 10
-	pri0.idfile, -- 11
-	pri0.itemtype, -- 12
-	case when n.d_melee_texture2 > 999 
-		then 0 
-		else n.d_melee_texture2 end as d_melee_texture2, -- 13
-	sec0.idfile, -- 14
-	sec0.itemtype, -- 15
-	sec1.idfile, -- 16
-	sec1.itemtype, -- 17
-	n.helmtexture, -- 18
-	s2.x, s2.y, s2.z, s2.heading, n.size, -- 19, 20, 21, 22, 23
-	s2.pathgrid, -- 24
-    sg.dist -- 25
-from alkabor_spawn2 s2
-join alkabor_spawngroup sg on s2.spawngroupID = sg.id
-join alkabor_spawnentry se on se.spawngroupID = sg.id
-join alkabor_npc_types n on se.npcID = n.id
-join npc_id_list n0 on n.id = n0.id
-left join 
-( -- PRIMARY
-	select id, idfile, itemtype
-	from (
-	  select distinct n.id, lte.probability, lde.chance, i.id as item_id, i.idfile, i.itemtype,
-		dense_rank() over (partition by n.id order by n.id, lte.probability desc, lde.chance desc, i.id) as rn
-		from npc_id_list n0
-		join alkabor_npc_types n on n0.id = n.id
-		join alkabor_loottable lt on n.loottable_id = lt.id
-		join alkabor_loottable_entries lte on lte.loottable_id = lt.id
-		join alkabor_lootdrop_entries lde on (lte.lootdrop_id = lde.lootdrop_id)
-		join items i on (lde.item_id = i.id and i.slots & 8192 > 0)
-		where lde.equip_item > 0
-		  and length(i.idfile) < 7
-		  and lte.probability > 24
-		  and lde.chance > 49
-		) s0
-	where rn = 1 ) pri0 on n.id = pri0.id
-left join 
-( -- SECONDARY IF DUAL WIELD
-	select id, idfile, itemtype
-	from (
-	  select distinct n.id, lte.probability, lde.chance, i.id as item_id, i.idfile, i.itemtype,
-		dense_rank() over (partition by n.id order by n.id, lte.probability desc, lde.chance desc, i.id) as rn
-		from npc_id_list n0
-		join alkabor_npc_types n on n0.id = n.id
-		join alkabor_loottable lt on n.loottable_id = lt.id
-		join alkabor_loottable_entries lte on lte.loottable_id = lt.id
-		join alkabor_lootdrop_entries lde on (lte.lootdrop_id = lde.lootdrop_id)
-		join items i on (lde.item_id = i.id and i.slots & 24576 > 0)
-		where n.class_ in (1, 4, 7, 8, 9, 20, 23, 26, 27, 28) -- can dual wield
-		  and lde.equip_item > 0
-		  and length(i.idfile) < 7
-		  and lte.probability > 24
-		  and lde.chance > 49
-		) s0
-	where rn = 2 ) sec0 on n.id = sec0.id
-left join 
-( -- SECONDARY IF SECONDARY ONLY SLOT
-	select id, idfile, itemtype
-	from (
-	  select distinct n.id, lte.probability, lde.chance, i.id as item_id, i.idfile, i.itemtype,
-		dense_rank() over (partition by n.id order by n.id, lte.probability desc, lde.chance desc, i.id) as rn
-		from npc_id_list n0
-		join alkabor_npc_types n on n0.id = n.id
-		join alkabor_loottable lt on n.loottable_id = lt.id
-		join alkabor_loottable_entries lte on lte.loottable_id = lt.id
-		join alkabor_lootdrop_entries lde on (lte.lootdrop_id = lde.lootdrop_id)
-		join items i on (lde.item_id = i.id and i.slots & 16834 > 0 and i.slots & 8192 = 0)
-		where lde.equip_item > 0
-		  and length(i.idfile) < 7
-		  and lte.probability > 24
-		  and lde.chance > 49
-		) s0
-	where rn = 1 ) sec1 on n.id = sec1.id
-where s2.zone = '{0}'
-    and s2.enabled = 1
-    and (s2.pathgrid {1} 0 {2} sg.dist {1} 0.0)
-order by sg.id, s2.id, n.id"""
-
-def query_for_characters(db_path, db_query, zone_name, patrols):
-    
-    rows = []
-    with sqlite3.connect(db_path) as db_connection:
-        cursor = db_connection.cursor()
-        pathgrid_comparator = '>' if patrols else '='
-        pathing_where_clause_logic = 'or' if patrols else 'and'
-        query = db_query.format(zone_name, pathgrid_comparator, pathing_where_clause_logic)
-        for row in cursor.execute(query):
-            rows.append(row)
-
-    return rows
-  
-def pick_spawns_for_group(spawn_ids, limit):
-
-    if limit == 0 or len(spawn_ids) == 1:
-        return spawn_ids
-    return random.choices(spawn_ids, k=limit)
-
-def pick_spawn(rows):
-
-    percentile = 0
-    random_num = random.randint(0, 99)
-    for row in rows:
-        percentile = percentile + int(row[3]) # % chance
-        if random_num < percentile:
-            return row
-    # shouldn't get here if chances always add up to 100, but just in case
-    return rows[0]
-    
-def convert_heading_to_radians(heading):
+    Static_Collection = eq_spawn_plan.Constants.Static_Collection
+    Patrols_Collection = eq_spawn_plan.Constants.Patrols_Collection
+    Patrol_Turn_Seconds = 0.5
+    Keyframe_Interpolation_Linear = 1 # Index of 'LINEAR' in the keyframe interpolation enum
+    Static_Instances_Modifier = "EQ Static Instances"
+    Static_Models_Node = "Static Models"
+    Instance_Model_Collection_Prefix = "EQI_"
+    Png_Signature = b"\x89PNG\r\n\x1a\n"
+    Spawn_Seed_Property_Prefix = "eq_spawn_seed_"
+    # Set in this order, since changing the action range, scale or repeat moves the strip's end
+    Nla_Strip_Properties = ["blend_type", "extrapolation", "action_frame_start", "action_frame_end", "scale", "repeat", "frame_end"]
+    Proxy_Suffix = "_Proxy"
+    Bounding_Box_Faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
 
-    ## This is basic conversion but it turns out wrong, even negating
-    # heading_degrees = (heading * 360.0) / 512.0
+def parse_command_line_config(argv):
 
-    ## Working backwards I came up with this ugly formula, which works!
-    heading_degrees = (heading * 720.0 + 91800.0) / 512.0 % 360.0
+    # Blender passes everything after "--" through to the script untouched. Options that
+    # aren't given keep their value from the CONFIG block
+    parser = argparse.ArgumentParser(prog="eq_import_chrs.py")
+    parser.add_argument("--zone-name", default=zone_name)
+    parser.add_argument("--lantern-export-folder", default=lantern_export_folder)
+    parser.add_argument("--race-data-csv-location", default=race_data_csv_location)
+    parser.add_argument("--db-location", default=db_location)
+    parser.add_argument("--import-static", default=import_static, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--import-patrols", default=import_patrols, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--static-spawn-mode", default=static_spawn_mode, choices=["OBJECTS", "INSTANCES"])
+    parser.add_argument("--bake-patrol-paths", default=bake_patrol_paths, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--patrol-walk-speed", default=patrol_walk_speed, type=float)
+    parser.add_argument("--character-library-folder", default=character_library_folder)
+    parser.add_argument("--link-library-models", default=link_library_models, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--model-extension", default=model_extension, choices=["gltf", "glb"])
+    parser.add_argument("--zone-scalar", default=zone_scalar, type=float)
+    parser.add_argument("--use-fast-db-query", default=use_fast_db_query, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--db-working-copy-location", default=db_working_copy_location)
+    parser.add_argument("--spawn-seed", default=spawn_seed, type=int)
+    parser.add_argument("--spawn-cache-folder", default=spawn_cache_folder)
+    parser.add_argument("--keep-animations", default=keep_animations, nargs="*")
+    parser.add_argument("--dedupe-images-by-content", default=dedupe_images_by_content, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--viewport-proxy-mode", default=viewport_proxy_mode, choices=["NONE", "BOUNDS", "DECIMATE"])
+    parser.add_argument("--proxy-decimate-ratio", default=proxy_decimate_ratio, type=float)
+    parser.add_argument("--viewport-deform-distance", default=viewport_deform_distance, type=float)
+    parser.add_argument("--bulk-session-mode", default=bulk_session_mode, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--view-layer-update-interval", default=view_layer_update_interval, type=int)
+    parser.add_argument("--prefetch-models-ahead", default=prefetch_models_ahead, type=int)
+    parser.add_argument("--prefetch-workers", default=prefetch_workers, type=int)
+    parser.add_argument("--write-run-report", default=write_run_report, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--profile-import-loop", default=profile_import_loop, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--output-blend-location", default=output_blend_location)
 
-    return math.radians(heading_degrees)
+    return parser.parse_args(argv[argv.index("--") + 1:] if "--" in argv else [])
 
-def get_scale_multiplier(race_id, db_scale, zone_scalar):
+def get_current_library_path(model_path, character_library_folder):
 
-    scalar = 0.2 # default
-    if race_id == 49:
-        scalar = 0.1
-    elif race_id == 158: # wurms
-        scalar = 1.0
-        db_scale = 1.0 # Size in DB for these is all over the place
-    elif race_id == 196:
-        scalar = 1.0
-    elif race_id == 108:
-        scalar = 0.05
-    
-    return scalar * db_scale * zone_scalar
+    if not character_library_folder:
+        return None
 
-def import_player_character(row, model_extension, models_path):
+    library_path = eq_character_library.get_library_path(character_library_folder, model_path)
+    return library_path if eq_character_library.is_library_current(library_path, model_path) else None
 
-    name = str(row[5]).strip().strip('#')
-    id = str(row[4])
-    pc_model_name = "{0}_{1}.{2}".format(name, id, model_extension)
-    model_path = os.path.join(models_path, pc_model_name)
-    if not os.path.exists(model_path):
-        print("Player character model file does not exist: " + model_path)
-        return False
-    
-    bpy.ops.import_scene.gltf(filepath=model_path)
-    return True
-
-def import_npc(row, model_extension, models_path, db_race_translation_dict):
-
-    race_id = int(row[6])
-    gender = int(row[7])
-    texture = int(row[9])
-
-    # Fix elementals
-    if race_id in [209, 210, 211, 212]:
-        if race_id == 209:
-            texture = 0
-        elif race_id == 210:
-            texture = 3
-        elif race_id == 211:
-            texture = 2
-        elif race_id == 212:
-            texture = 1
-        race_id = 75
-
-    race_identifier = db_race_translation_dict[(race_id, gender)]
-    unique_npc_string = get_unique_npc_string(race_identifier, texture, row)
-    npc_model_name = "{0}.{1}".format(unique_npc_string, model_extension)
-    model_path = os.path.join(models_path, npc_model_name)
-    
-    if not os.path.exists(model_path):
-
-        print("NPC model file does not exist: " + model_path)
-        if '_' in unique_npc_string:
-            print("Checking backup model files...")
-            backup_npc_strings = get_backup_npc_strings(unique_npc_string)
-            backup_found = False
-            for backup_str in backup_npc_strings:
-                npc_model_name = "{0}.{1}".format(backup_str, model_extension)
-                model_path = os.path.join(models_path, npc_model_name)
-                if os.path.exists(model_path):
-                    backup_found = True
-                    print("Using backup model at: " + model_path)
-                    break
-            if not backup_found:
-                print("No backup model file found, skipping")
-                return False
-        else:
-            return False
-    
-    bpy.ops.import_scene.gltf(filepath=model_path)
-    return True
+def deselect_all_objects():
 
-def get_unique_npc_string(name, texture, row):
+    # Only the objects that are actually selected are touched, rather than every object in the view layer
+    for obj in bpy.context.selected_objects:
+        obj.select_set(False)
 
-    face = int(row[8])
-    helm_texture = int(row[18])
-    primary, secondary = get_primary_secondary_values(row)
+def import_model(model_path, model_cache, collection, library_path=None, link_library_models=False):
 
-    if (texture + face + helm_texture + primary + secondary) == 0:
-        return name
-    
-    return "{0}_{1:02d}-{2:02d}-{3:02d}-{4:03d}-{5:03d}".format(name, texture, face, helm_texture, primary, secondary)
+    # The first spawn of a model imports the file, or loads it from the character library. Later spawns get
+    # a linked duplicate of those objects, sharing the mesh, armature data, materials and animation, linked
+    # straight into the spawn's collection. Returns the spawn's objects, none of them left selected
+    if model_path not in model_cache:
+        if library_path:
+            model_cache[model_path] = eq_character_library.load_model_from_library(library_path, link_library_models)
+        else:
+            bpy.ops.import_scene.gltf(filepath=model_path)
+            model_cache[model_path] = list(bpy.context.selected_objects)
+            deselect_all_objects()
+        return list(model_cache[model_path])
 
-def get_backup_npc_strings(unique_npc_string):
-    backup_strings = []
-    backup_strings.append(unique_npc_string[:-3] + '000')
-    backup_strings.append(unique_npc_string[:-7] + '000-000')
-    backup_strings.append(unique_npc_string.split('_')[0])
+    source_to_copy_dict = {}
+    for source_obj in model_cache[model_path]:
+        copy_obj = source_obj.copy()
+        # Copies of a kept spawn carry its tags, the new spawn is tagged once it's placed
+        for tag_name in eq_spawn_plan.Constants.Spawn_Tag_Names:
+            if tag_name in copy_obj:
+                del copy_obj[tag_name]
+        collection.objects.link(copy_obj)
+        source_to_copy_dict[source_obj] = copy_obj
 
-    return backup_strings
+    for copy_obj in source_to_copy_dict.values():
+        if copy_obj.parent in source_to_copy_dict:
+            copy_obj.parent = source_to_copy_dict[copy_obj.parent]
+        elif copy_obj.parent:
+            # The source spawn's patrol path
+            copy_obj.parent = None
+        for modifier in copy_obj.modifiers:
+            if modifier.type == "ARMATURE" and modifier.object in source_to_copy_dict:
+                modifier.object = source_to_copy_dict[modifier.object]
 
-def get_primary_secondary_values(row):
-    
-    primary = int(row[10])
-    secondary = 0
-    primary_item_type = -1
-    if primary == 0 and row[11]:
-        primary_str = str(row[11])
-        if len(primary_str) > 2:
-            primary = int(primary_str[2:])
-    if row[12]:
-        primary_item_type = int(row[12])
-    if not primary_item_type in [1, 4, 5, 35]:
-        secondary = int(row[13])
-        if secondary == 0:
-            if row[14]:
-                secondary_str = str(row[14])
-                if (len(secondary_str) > 2):
-                    secondary = int(secondary_str[2:])
-            if secondary == 0 and row[16]:
-                secondary_str = str(row[16])
-                if (len(secondary_str) > 2):
-                    secondary = int(secondary_str[2:])
-
-    return primary, secondary
-
-def rename_imported_model_and_fix_duplication(chr_name, name_armature_dict, name_armature_object_list_dict, primary, secondary):
-
-    mesh_obj = next(m for m in bpy.context.selected_objects if m.type == "MESH")
-    armature_obj = next((a for a in bpy.context.selected_objects if a.type == "ARMATURE"), None)
-    
-    chr_skeleton_name = mesh_obj.name
-    if ".0" in chr_skeleton_name:
-        chr_skeleton_name = chr_skeleton_name[0:(chr_skeleton_name.rindex('.'))]
-    
-    if primary > 0 or secondary > 0:
-        chr_skeleton_name = "{0}-{1:03d}-{2:03d}".format(chr_skeleton_name, primary, secondary)
+    return list(source_to_copy_dict.values())
 
+def rename_imported_model_and_fix_duplication(spawn_objs, chr_name, chr_skeleton_name, name_armature_dict, name_armature_object_list_dict):
+
+    mesh_obj = next(m for m in spawn_objs if m.type == "MESH")
+    armature_obj = next((a for a in spawn_objs if a.type == "ARMATURE"), None)
+    
     mesh_obj.name = chr_name
 
     if armature_obj:
@@ -321,171 +257,888 @@ def rename_imported_model_and_fix_duplication(chr_name, name_armature_dict, name
             name_armature_dict[chr_skeleton_name] = armature_obj.data
             name_armature_object_list_dict[chr_skeleton_name] = [armature_obj]
 
-    for material_slot in mesh_obj.material_slots:
-        material_name = material_slot.material.name
-        if len(material_name) > 3 and "." in material_name and material_name[-3:].isnumeric():
-            original_material = bpy.data.materials.get(material_slot.material.name[:-4])
-            if not original_material:
+def get_base_datablock_name(name):
+
+    if len(name) > 4 and name[-4] == '.' and name[-3:].isnumeric():
+        return name[:-4]
+
+    return name
+
+def get_image_key(image):
+
+    if image.packed_file:
+        # Packed into a .glb. Textures of different models often share a name, so only identical data matches
+        return "packed:" + hashlib.sha256(image.packed_file.data).hexdigest()
+    if not image.filepath:
+        return get_base_datablock_name(image.name)
+
+    return os.path.normcase(os.path.normpath(bpy.path.abspath(image.filepath, library=image.library)))
+
+def get_material_texture_key(material):
+
+    if material.node_tree:
+        for node in material.node_tree.nodes:
+            if node.type == 'TEX_IMAGE' and node.image:
+                return get_image_key(node.image)
+
+    return ""
+
+def dedupe_imported_materials(imported_objs, material_registry_dict, image_registry_dict):
+
+    # Every material and image the glTF importer just created is checked against the ones already in the
+    # scene and remapped in place, rather than left behind for delete_orphaned_data
+    removed_count = 0
+    for imported_obj in imported_objs:
+        if imported_obj.type != "MESH":
+            continue
+        for material in list(imported_obj.data.materials):
+            if not material:
                 continue
-            material_slot.material = original_material
 
-def set_transforms_on_imported_model(x, y, z, heading, scale_multiplier):
+            texture_key = ""
+            if material.node_tree:
+                for node in material.node_tree.nodes:
+                    if node.type != 'TEX_IMAGE' or not node.image:
+                        continue
+                    image = node.image
+                    image_key = get_image_key(image)
+                    registered_image = image_registry_dict.setdefault(image_key, image)
+                    if registered_image != image:
+                        image.user_remap(registered_image)
+                        bpy.data.images.remove(image)
+                        removed_count += 1
+                    texture_key = texture_key or image_key
+
+            base_material_name = get_base_datablock_name(material.name)
+            material_key = (base_material_name, texture_key)
+            if material_key not in material_registry_dict:
+                # A material of the same name that was already in the file, e.g. from the zone import
+                existing_material = bpy.data.materials.get(base_material_name)
+                if existing_material and get_material_texture_key(existing_material) == texture_key:
+                    material_registry_dict[material_key] = existing_material
+            registered_material = material_registry_dict.setdefault(material_key, material)
+            if registered_material != material:
+                material.user_remap(registered_material)
+                bpy.data.materials.remove(material)
+                removed_count += 1
+
+    return removed_count
+
+def get_image_content_info(image_bytes):
+
+    # Content hash and the pixel memory the image takes once loaded. Blender keeps 8 bit images at 4 bytes
+    # per pixel, so a PNG's size comes from its header without decoding it. Other formats count as 0
+    decoded_byte_count = 0
+    if image_bytes[:8] == Constants.Png_Signature:
+        width, height = struct.unpack(">II", image_bytes[16:24])
+        decoded_byte_count = width * height * 4
+
+    return hashlib.sha256(image_bytes).hexdigest(), decoded_byte_count
+
+def get_image_file_info(image_path):
+
+    with open(image_path, "rb") as f_stream:
+        return get_image_content_info(f_stream.read())
 
-    obj = next((o for o in bpy.context.selected_objects if o.type == "ARMATURE"), bpy.context.selected_objects[0])
-    obj.location = (y * -zone_scalar, x * -zone_scalar, z * zone_scalar)
-    rotation = convert_heading_to_radians(heading)
+def prefetch_image_file_info(image_path):
+
+    # Runs on a prefetch worker, so dedupe_images_by_content_hash finds the hash already memoized
+    eq_lookup_tables.load_memoized(image_path, get_image_file_info)
+
+def get_image_byte_size(image):
+
+    # Size of the image's file or packed data, None if it can't be read
+    if image.library or image.source != 'FILE':
+        return None
+    if image.packed_file:
+        # Packed into a .glb
+        return image.packed_file.size
+    image_path = bpy.path.abspath(image.filepath)
+
+    return os.path.getsize(image_path) if os.path.isfile(image_path) else None
+
+def get_image_content_key(image):
+
+    if image.packed_file:
+        content_hash, decoded_byte_count = get_image_content_info(image.packed_file.data)
+    else:
+        content_hash, decoded_byte_count = eq_lookup_tables.load_memoized(bpy.path.abspath(image.filepath), get_image_file_info)
+
+    return (content_hash, image.colorspace_settings.name, image.alpha_mode), decoded_byte_count
+
+def dedupe_images_by_content_hash(new_images):
+
+    # Each of new_images is remapped to an image with the same content and color settings, which
+    # dedupe_imported_materials can't catch since it only matches images by file path. Images that were
+    # already in the file are preferred, then the first of the new images. Images in the file are only
+    # hashed when their size matches a new image, and are never remapped or removed
+    new_image_size_dict = {image: get_image_byte_size(image) for image in new_images}
+    new_image_size_dict = {image: size for image, size in new_image_size_dict.items() if size is not None}
+    new_image_sizes = set(new_image_size_dict.values())
+
+    content_image_dict = {}
+    new_image_names = set(image.name for image in new_image_size_dict)
+    for image in bpy.data.images:
+        if image.name not in new_image_names and get_image_byte_size(image) in new_image_sizes:
+            content_image_dict.setdefault(get_image_content_key(image)[0], image)
+
+    removed_count = 0
+    reclaimed_byte_count = 0
+    for image in new_image_size_dict:
+        content_key, decoded_byte_count = get_image_content_key(image)
+        canonical_image = content_image_dict.setdefault(content_key, image)
+        if canonical_image != image:
+            image.user_remap(canonical_image)
+            bpy.data.images.remove(image)
+            removed_count += 1
+            reclaimed_byte_count += decoded_byte_count
+
+    return removed_count, reclaimed_byte_count
+
+def set_transforms_on_imported_model(spawn_objs, location, rotation, scale_multiplier):
+
+    obj = next((o for o in spawn_objs if o.type == "ARMATURE"), spawn_objs[0])
+    obj.location = location
     existing_rotation_mode = obj.rotation_mode
     obj.rotation_mode = "XYZ"
     obj.rotation_euler = (0, 0, rotation)
     obj.rotation_mode = existing_rotation_mode
     obj.scale = (scale_multiplier, scale_multiplier, scale_multiplier)
+
+def move_objects_to_collection(objs, collection):
+
+    for obj in objs:
+        for user_collection in list(obj.users_collection):
+            if user_collection != collection:
+                user_collection.objects.unlink(obj)
+        if collection not in obj.users_collection:
+            collection.objects.link(obj)
+
+def set_fcurve_keyframes(fcurve, frames, values):
+
+    # All keys in one go instead of a keyframe_insert per key
+    keyframe_count = len(frames)
+    keyframe_coordinates = np.empty(keyframe_count * 2, dtype=np.float32)
+    keyframe_coordinates[0::2] = frames
+    keyframe_coordinates[1::2] = values
+    fcurve.keyframe_points.add(keyframe_count)
+    fcurve.keyframe_points.foreach_set("co", keyframe_coordinates)
+    fcurve.keyframe_points.foreach_set("interpolation", np.full(keyframe_count, Constants.Keyframe_Interpolation_Linear, dtype=np.int32))
+    cycles_modifier = fcurve.modifiers.new('CYCLES')
+    cycles_modifier.mode_before = 'REPEAT'
+    cycles_modifier.mode_after = 'REPEAT'
+    fcurve.update()
+
+def create_patrol_path_actions(zone_name, grid_waypoints_dict, grid_ids, walk_speed, zone_scalar):
+
+    # One looping action per path grid in grid_ids, shared by every patrol that walks it
+    scene = bpy.context.scene
+    fps = scene.render.fps / scene.render.fps_base
+    patrol_path_action_dict = {}
+    for grid_id in sorted(grid_ids):
+        waypoints = grid_waypoints_dict.get(grid_id, [])
+        if len(waypoints) < 2:
+            continue
+
+        action_name = "EQPatrolPath_{0}_{1}".format(zone_name, grid_id)
+        action = bpy.data.actions.get(action_name)
+        if action:
+            bpy.data.actions.remove(action)
+        action = bpy.data.actions.new(action_name)
+
+        frames, locations, rotations = eq_patrol_paths.get_patrol_keyframes(waypoints, walk_speed, Constants.Patrol_Turn_Seconds,
+            fps, scene.frame_start, zone_scalar)
+        for axis_index in range(3):
+            set_fcurve_keyframes(action.fcurves.new("location", index=axis_index), frames, locations[:, axis_index])
+        set_fcurve_keyframes(action.fcurves.new("rotation_euler", index=2), frames, rotations)
+
+        patrol_path_action_dict[grid_id] = action
+
+    return patrol_path_action_dict
+
+def attach_patrol_path(spawn_objs, spawn_name, path_action, collection):
+
+    # The route drives an empty the spawn is parented to, since the armature's own action plays its animation
+    path_obj = bpy.data.objects.new(spawn_name + "_Path", None)
+    collection.objects.link(path_obj)
+    path_obj.rotation_mode = "XYZ"
+    path_obj.animation_data_create().action = path_action
+    root_obj = next((o for o in spawn_objs if o.type == "ARMATURE"), spawn_objs[0])
+    root_obj.parent = path_obj
+
+    return path_obj
+
+def get_named_attribute_output(named_attribute_node):
+
+    # The node has an output for every data type, only the one matching data_type is enabled
+    return next(o for o in named_attribute_node.outputs if o.enabled)
+
+def get_static_instances_node_group(zone_name, models_collection):
+
+    group_name = "EQ Static Instances " + zone_name
+    group = bpy.data.node_groups.get(group_name)
+    if not group:
+        group = bpy.data.node_groups.new(group_name, 'GeometryNodeTree')
+        group.inputs.new('NodeSocketGeometry', "Geometry")
+        group.outputs.new('NodeSocketGeometry', "Geometry")
+
+        group_input_node = group.nodes.new('NodeGroupInput')
+        group_output_node = group.nodes.new('NodeGroupOutput')
+
+        # One instance per model collection, picked by each point's model index
+        collection_info_node = group.nodes.new('GeometryNodeCollectionInfo')
+        collection_info_node.name = Constants.Static_Models_Node
+        collection_info_node.inputs["Separate Children"].default_value = True
+        collection_info_node.inputs["Reset Children"].default_value = True
+
+        attribute_node_dict = {}
+        for attribute_name, data_type in [("model_index", 'INT'), ("heading", 'FLOAT'), ("scale", 'FLOAT')]:
+            attribute_node = group.nodes.new('GeometryNodeInputNamedAttribute')
+            attribute_node.data_type = data_type
+            attribute_node.inputs["Name"].default_value = attribute_name
+            attribute_node_dict[attribute_name] = attribute_node
+        rotation_node = group.nodes.new('ShaderNodeCombineXYZ')
+
+        instance_node = group.nodes.new('GeometryNodeInstanceOnPoints')
+        instance_node.inputs["Pick Instance"].default_value = True
+
+        group.links.new(group_input_node.outputs[0], instance_node.inputs["Points"])
+        group.links.new(collection_info_node.outputs[0], instance_node.inputs["Instance"])
+        group.links.new(get_named_attribute_output(attribute_node_dict["model_index"]), instance_node.inputs["Instance Index"])
+        group.links.new(get_named_attribute_output(attribute_node_dict["heading"]), rotation_node.inputs["Z"])
+        group.links.new(rotation_node.outputs[0], instance_node.inputs["Rotation"])
+        group.links.new(get_named_attribute_output(attribute_node_dict["scale"]), instance_node.inputs["Scale"])
+        group.links.new(instance_node.outputs[0], group_output_node.inputs[0])
+
+    group.nodes[Constants.Static_Models_Node].inputs["Collection"].default_value = models_collection
+    return group
+
+def get_instance_model_collections(models_collection, model_paths, released_data):
+
+    # Model collections from an earlier run are kept while their model file is unchanged
+    model_collection_dict = {}
+    for model_collection in list(models_collection.children):
+        model_path = model_collection.get("eq_model_path")
+        if model_path in model_paths and model_collection.get("eq_model_mtime") == os.path.getmtime(model_path):
+            model_collection_dict[model_path] = model_collection
+            continue
+        for obj in list(model_collection.objects):
+            release_object(obj, released_data)
+        bpy.data.collections.remove(model_collection)
+
+    return model_collection_dict
+
+def sort_instance_model_collections(models_collection):
+
+    # Collection Info hands out the child collections in order, which the points' model index relies on
+    model_collections = sorted(models_collection.children, key=lambda c: c.name)
+    for model_collection in model_collections:
+        models_collection.children.unlink(model_collection)
+    for model_collection in model_collections:
+        models_collection.children.link(model_collection)
+
+    return {c["eq_model_path"]: model_index for model_index, c in enumerate(model_collections)}
+
+def create_static_instance_points(points_name, instanced_spawns, model_index_dict, static_collection, node_group, released_data):
+
+    # One vertex per static spawn, with the model index, heading and scale from the plan as point attributes
+    mesh = bpy.data.meshes.new(points_name)
+    mesh.vertices.add(len(instanced_spawns))
+    mesh.vertices.foreach_set("co", np.array([s["location"] for s in instanced_spawns], dtype=np.float32).ravel())
+    point_attributes = [
+        ("model_index", 'INT', np.array([model_index_dict[s["model_path"]] for s in instanced_spawns], dtype=np.int32)),
+        ("heading", 'FLOAT', np.array([s["rotation"] for s in instanced_spawns], dtype=np.float32)),
+        ("scale", 'FLOAT', np.array([s["scale"] for s in instanced_spawns], dtype=np.float32)),
+    ]
+    for attribute_name, attribute_type, values in point_attributes:
+        mesh.attributes.new(attribute_name, attribute_type, 'POINT').data.foreach_set("value", values)
+    mesh.update()
+
+    # Re-runs swap the mesh of the existing object, the old one is released
+    points_obj = bpy.data.objects.get(points_name)
+    if points_obj:
+        released_data.add(points_obj.data)
+        points_obj.data = mesh
+    else:
+        points_obj = bpy.data.objects.new(points_name, mesh)
+        static_collection.objects.link(points_obj)
+    modifier = points_obj.modifiers.get(Constants.Static_Instances_Modifier)
+    if not modifier:
+        modifier = points_obj.modifiers.new(Constants.Static_Instances_Modifier, 'NODES')
+    modifier.node_group = node_group
+
+    return points_obj
+
+def remove_static_instances(points_name, models_collection_name, released_data):
+
+    points_obj = bpy.data.objects.get(points_name)
+    if points_obj:
+        release_object(points_obj, released_data)
+    models_collection = bpy.data.collections.get(models_collection_name)
+    if models_collection:
+        get_instance_model_collections(models_collection, set(), released_data)
+        bpy.data.collections.remove(models_collection)
+
+def get_spawn_collection(collection_name, chr_collection):
+
+    # Re-runs add to the collections the last run created
+    collection = bpy.data.collections.get(collection_name)
+    if not collection:
+        collection = bpy.data.collections.new(collection_name)
+        chr_collection.children.link(collection)
+
+    return collection
+
+def get_existing_spawn_objects(zone_name):
+
+    # Objects a previous run imported for this zone, grouped by the spawn they were tagged with
+    existing_spawn_objects_dict = {}
+    for obj in bpy.data.objects:
+        if obj.get("eq_zone") != zone_name or "eq_spawn2_id" not in obj:
+            continue
+        existing_spawn_objects_dict.setdefault((obj["eq_spawn2_id"], obj.get("eq_spawn_instance", 0)), []).append(obj)
+
+    return existing_spawn_objects_dict
+
+def get_object_spawn_tags(obj):
+
+    return {tag_name: obj.get(tag_name) for tag_name in eq_spawn_plan.Constants.Spawn_Tag_Names}
+
+def tag_spawn_objects(spawn_objs, spawn_tags):
+
+    for obj in spawn_objs:
+        for tag_name, value in spawn_tags.items():
+            obj[tag_name] = value
+
+def release_object(obj, released_data):
+
+    # Removes obj and adds its data and actions to released_data, for delete_released_data to remove once
+    # nothing else uses them
+    if obj.data:
+        released_data.add(obj.data)
+    if obj.animation_data:
+        if obj.animation_data.action:
+            released_data.add(obj.animation_data.action)
+        for nla_track in obj.animation_data.nla_tracks:
+            released_data.update(strip.action for strip in nla_track.strips if strip.action)
+    bpy.data.objects.remove(obj, do_unlink=True)
+
+def remove_spawn_objects(spawn_objs, released_data):
+
+    for obj in spawn_objs:
+        for proxy_obj in [c for c in obj.children if "eq_proxy" in c]:
+            release_object(proxy_obj, released_data)
+        release_object(obj, released_data)
+
+def create_bounding_box_proxy_mesh(mesh):
+
+    vertex_coordinates = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vertex_coordinates)
+    vertex_coordinates = vertex_coordinates.reshape(-1, 3)
+    if len(vertex_coordinates):
+        corner_min, corner_max = vertex_coordinates.min(axis=0), vertex_coordinates.max(axis=0)
+    else:
+        corner_min, corner_max = np.zeros(3), np.zeros(3)
+
+    # Corner i takes max x, y, z where bits 2, 1, 0 of i are set
+    corners = [(corner_max[0] if i & 4 else corner_min[0], corner_max[1] if i & 2 else corner_min[1], corner_max[2] if i & 1 else corner_min[2])
+        for i in range(8)]
+    proxy_mesh = bpy.data.meshes.new(mesh.name + Constants.Proxy_Suffix)
+    proxy_mesh.from_pydata(corners, [], Constants.Bounding_Box_Faces)
+    if mesh.materials:
+        proxy_mesh.materials.append(mesh.materials[0])
+
+    return proxy_mesh
+
+def create_decimated_proxy_mesh(mesh, decimate_ratio):
+
+    # The decimate modifier is evaluated once on a temporary object. Vertex groups are kept, so the
+    # proxy deforms with the same armature
+    temporary_obj = bpy.data.objects.new(mesh.name + Constants.Proxy_Suffix, mesh)
+    bpy.context.scene.collection.objects.link(temporary_obj)
+    decimate_modifier = temporary_obj.modifiers.new("Decimate", 'DECIMATE')
+    decimate_modifier.ratio = decimate_ratio
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    proxy_mesh = bpy.data.meshes.new_from_object(temporary_obj.evaluated_get(depsgraph), preserve_all_data_layers=True, depsgraph=depsgraph)
+    proxy_mesh.name = mesh.name + Constants.Proxy_Suffix
+    bpy.data.objects.remove(temporary_obj, do_unlink=True)
+
+    return proxy_mesh
+
+def add_viewport_proxies(zone_name, proxy_mode, decimate_ratio, released_data):
+
+    # Each spawn's mesh object is hidden in the viewport and gets a proxy child that's hidden in renders.
+    # Spawns sharing a mesh share one proxy mesh. Proxies of another mode are replaced
+    spawn_mesh_objs = [o for o in bpy.data.objects if o.get("eq_zone") == zone_name and "eq_spawn2_id" in o and o.type == "MESH"]
+    proxy_mesh_dict = {}
+    spawn_mesh_objs_without_proxy = []
+    for mesh_obj in spawn_mesh_objs:
+        proxy_obj = next((c for c in mesh_obj.children if "eq_proxy" in c), None)
+        if proxy_obj and proxy_obj["eq_proxy"] == proxy_mode:
+            proxy_mesh_dict.setdefault(mesh_obj.data, proxy_obj.data)
+            continue
+        if proxy_obj:
+            release_object(proxy_obj, released_data)
+        spawn_mesh_objs_without_proxy.append(mesh_obj)
+
+    for mesh_obj in spawn_mesh_objs_without_proxy:
+        if mesh_obj.data not in proxy_mesh_dict:
+            if proxy_mode == "DECIMATE":
+                proxy_mesh_dict[mesh_obj.data] = create_decimated_proxy_mesh(mesh_obj.data, decimate_ratio)
+            else:
+                proxy_mesh_dict[mesh_obj.data] = create_bounding_box_proxy_mesh(mesh_obj.data)
+
+        proxy_obj = bpy.data.objects.new(mesh_obj.name + Constants.Proxy_Suffix, proxy_mesh_dict[mesh_obj.data])
+        proxy_obj["eq_zone"] = zone_name
+        proxy_obj["eq_proxy"] = proxy_mode
+        for users_collection in mesh_obj.users_collection:
+            users_collection.objects.link(proxy_obj)
+        proxy_obj.parent = mesh_obj
+        proxy_obj.hide_render = True
+        armature_modifier = next((m for m in mesh_obj.modifiers if m.type == "ARMATURE"), None)
+        if proxy_mode == "DECIMATE" and armature_modifier:
+            proxy_obj.modifiers.new("Armature", 'ARMATURE').object = armature_modifier.object
+        mesh_obj.hide_viewport = True
+
+    return len(spawn_mesh_objs_without_proxy), len(proxy_mesh_dict)
+
+def remove_viewport_proxies(zone_name, released_data):
+
+    # Spawns copied from a proxied spawn this run are hidden too, so once a zone has had proxies every spawn
+    # mesh is shown again
+    zone_objs = [o for o in bpy.data.objects if o.get("eq_zone") == zone_name]
+    proxy_objs = [o for o in zone_objs if "eq_proxy" in o]
+    if not proxy_objs:
+        return 0
+    for obj in zone_objs:
+        if "eq_proxy" not in obj and obj.type == "MESH":
+            obj.hide_viewport = False
+    for proxy_obj in proxy_objs:
+        release_object(proxy_obj, released_data)
+
+    return len(proxy_objs)
+
+def set_viewport_deform_distance(zone_name, reference_location, max_distance):
+
+    # Armature modifiers of characters further than max_distance from the reference location are turned off
+    # in the viewport only. A max_distance of 0 turns them all back on. Every zone when zone_name is None
+    deformed_count = 0
+    for obj in bpy.data.objects:
+        if "eq_zone" not in obj or (zone_name and obj["eq_zone"] != zone_name) or obj.type != "MESH":
+            continue
+        armature_modifiers = [m for m in obj.modifiers if m.type == "ARMATURE"]
+        if not armature_modifiers:
+            continue
+        is_deformed = max_distance <= 0.0 or (obj.matrix_world.translation - reference_location).length <= max_distance
+        for armature_modifier in armature_modifiers:
+            armature_modifier.show_viewport = is_deformed
+        deformed_count += 1 if is_deformed else 0
+
+    return deformed_count
+
+def get_viewport_reference_location():
+
+    scene = bpy.context.scene
+    return scene.camera.matrix_world.translation if scene.camera else scene.cursor.location
+
+def is_kept_animation(action, keep_animations):
+
+    if not keep_animations:
+        return True
+
+    action_name_parts = get_base_datablock_name(action.name).split('_')
+    return any(part in keep_animations for part in action_name_parts)
+
+def filter_anim_data(anim_data, keep_animations):
+
+    if not keep_animations:
+        return
+
+    for nla_track in list(anim_data.nla_tracks):
+        if not all(is_kept_animation(s.action, keep_animations) for s in nla_track.strips if s.action):
+            anim_data.nla_tracks.remove(nla_track)
+
+    if anim_data.action and not is_kept_animation(anim_data.action, keep_animations):
+        anim_data.action = next((s.action for t in anim_data.nla_tracks for s in t.strips if s.action), None)
+
+def share_anim_data(source_anim_data, armature_obj):
+
+    # Same result as make_links_data(type='ANIMATION'), without going through the operator
+    anim_data = armature_obj.animation_data or armature_obj.animation_data_create()
+    anim_data.action = source_anim_data.action
+
+    while anim_data.nla_tracks:
+        anim_data.nla_tracks.remove(anim_data.nla_tracks[0])
+    for source_nla_track in source_anim_data.nla_tracks:
+        nla_track = anim_data.nla_tracks.new()
+        nla_track.name = source_nla_track.name
+        for source_strip in source_nla_track.strips:
+            strip = nla_track.strips.new(source_strip.name, int(source_strip.frame_start), source_strip.action)
+            for property_name in Constants.Nla_Strip_Properties:
+                setattr(strip, property_name, getattr(source_strip, property_name))
+        nla_track.mute = source_nla_track.mute
+        nla_track.lock = source_nla_track.lock
+
+def get_canonical_action(action, bone_names, action_registry_dict):
+
+    # Actions with the same name on armatures with the same bones are the same animation, imported again
+    # with another model
+    return action_registry_dict.setdefault((get_base_datablock_name(action.name), bone_names), action)
+
+def dedupe_actions(anim_data, bone_names, action_registry_dict):
+
+    if anim_data.action:
+        anim_data.action = get_canonical_action(anim_data.action, bone_names, action_registry_dict)
+    for nla_track in anim_data.nla_tracks:
+        for strip in nla_track.strips:
+            if strip.action:
+                strip.action = get_canonical_action(strip.action, bone_names, action_registry_dict)
+
+def link_anim_data(name_armature_object_list_dict, keep_animations):
     
-def link_anim_data(name_armature_object_list_dict):
-    
+    # Every armature in a skeleton group uses the first one's animation data, and actions are shared by
+    # name across the groups, so the duplicates imported with the others are left without users for
+    # delete_orphaned_data
+    action_registry_dict = {}
     for key, armature_obj_list in name_armature_object_list_dict.items():
-        if len(armature_obj_list) == 1:
+        source_anim_data = armature_obj_list[0].animation_data
+        if not source_anim_data:
             continue
-        
-        bpy.context.view_layer.objects.active = armature_obj_list[0]
+
+        filter_anim_data(source_anim_data, keep_animations)
+        dedupe_actions(source_anim_data, frozenset(bone.name for bone in armature_obj_list[0].data.bones), action_registry_dict)
         
         for armature_obj in armature_obj_list[1:]:
-            armature_obj.select_set(True)
-        
-        bpy.ops.object.make_links_data(type='ANIMATION')
-        
-        bpy.ops.object.select_all(action='DESELECT')    
+            share_anim_data(source_anim_data, armature_obj)
+
+def delete_released_data(released_data):
+
+    # Meshes aren't purged file wide, since the open file may have unused meshes of its own, so only the ones
+    # this run released are removed
+    unused_datablocks = [d for d in released_data if not d.users]
+    bpy.data.batch_remove(unused_datablocks)
+
+    return len(unused_datablocks)
 
 def delete_orphaned_data():
 
-    for material in bpy.data.materials:
-        if not material.users:
-            bpy.data.materials.remove(material)
+    removed_count = 0
+    for data_collection in [bpy.data.materials, bpy.data.textures, bpy.data.images, bpy.data.armatures, bpy.data.actions]:
+        for datablock in list(data_collection):
+            if not datablock.users:
+                data_collection.remove(datablock)
+                removed_count += 1
 
-    for texture in bpy.data.textures:
-        if not texture.users:
-            bpy.data.textures.remove(texture)
+    return removed_count
 
-    for image in bpy.data.images:
-        if not image.users:
-            bpy.data.images.remove(image)
+class BulkImportSession:
 
-    for armature in bpy.data.armatures:
-        if not armature.users:
-            bpy.data.armatures.remove(armature)
-            
-    for action in bpy.data.actions:
-        if not action.users:
-            bpy.data.actions.remove(action)
+    def __init__(self, enabled, view_layer_update_interval):
+        self.enabled = enabled
+        self.view_layer_update_interval = max(view_layer_update_interval, 1)
+        self.step_index = 0
+        self.step_count = 0
+        self.saved_use_global_undo = None
 
-###### SCRIPT START ######
+    def __enter__(self):
+        if self.enabled:
+            edit_preferences = bpy.context.preferences.edit
+            self.saved_use_global_undo = edit_preferences.use_global_undo
+            edit_preferences.use_global_undo = False
+        return self
 
-if not import_static and not import_patrols:
-    raise Exception("import_static and import_patrols both false - nothing to export")
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.enabled:
+            return
+        if self.step_count:
+            bpy.context.window_manager.progress_end()
+        bpy.context.view_layer.update()
+        bpy.context.preferences.edit.use_global_undo = self.saved_use_global_undo
 
-zone_chr_export_folder = os.path.join(lantern_export_folder, zone_name, "Characters")
-if not os.path.exists(zone_chr_export_folder):
-    raise Exception("Zone characters export folder does not exist at " + zone_chr_export_folder + "!")
-if not os.path.exists(race_data_csv_location):
-    raise Exception("RaceData.csv file does not exist at " + race_data_csv_location + "!")
-if not os.path.exists(db_location):
-    raise Exception("Database does not exist at " + db_location + "!")
-    
-# Load the RaceData csv into a dictionary
-db_race_translation_dict = {}
-
-print("Loading RaceData.csv...")
-with open(race_data_csv_location) as f_stream:
-    header_passed = False
-    for line in f_stream:
-        if not header_passed:
-            header_passed = True
-            continue
-        
-        race_info = line.strip().split(',')
-        id_str = race_info[0]
-        if not id_str:
-            continue
+    def begin_progress(self, step_count):
+        if self.enabled and step_count:
+            self.step_count = step_count
+            bpy.context.window_manager.progress_begin(0, step_count)
 
-        id = int(id_str)
-        for i in range(2, 6):
-            if race_info[i]:
-                db_race_translation_dict[(id, i - 2)] = race_info[i].strip()
-
-base_collection = bpy.data.collections["Collection"]
-chr_collection = bpy.data.collections.get(Constants.Character_Collection)
-if not chr_collection:
-    chr_collection = bpy.data.collections.new(Constants.Character_Collection)
-    base_collection.children.link(chr_collection)
-if import_static:
-    static_collection = bpy.data.collections.new(Constants.Static_Collection)
-    chr_collection.children.link(static_collection)
-if import_patrols:
-    patrols_collection = bpy.data.collections.new(Constants.Patrols_Collection)
-    chr_collection.children.link(patrols_collection)
-
-bpy.ops.object.select_all(action='DESELECT')
-
-chr_db_rows = []
-print("Executing database query...")
-if import_static:
-    chr_db_rows.extend(query_for_characters(db_location, Constants.Db_Query, zone_name, False))
-if import_patrols:
-    chr_db_rows.extend(query_for_characters(db_location, Constants.Db_Query, zone_name, True))
-
-if import_static and import_patrols: # order by in the query, but if both true, we have two sets of query results
-    chr_db_rows = sorted(chr_db_rows, key=operator.itemgetter(0,2))
-
-filtered_chr_db_rows = []
-print("Filtering spawns...")
-rows_grouped_by_spawngroup = itertools.groupby(chr_db_rows, operator.itemgetter(0))
-for spawngroup, sg_rows in rows_grouped_by_spawngroup:
-    sg_rows_grouped_by_spawn = itertools.groupby(sg_rows, operator.itemgetter(2))
-    spawn_ids = []
-    spawn_id_to_rows_dict = {}
-    for spawn_id, s_rows in sg_rows_grouped_by_spawn:
-        spawn_ids.append(spawn_id)
-        spawn_id_to_rows_dict[spawn_id] = list(s_rows)
-    limit = int(spawn_id_to_rows_dict[spawn_ids[0]][0][1])
-    limited_spawn_ids = pick_spawns_for_group(spawn_ids, limit)
-    for limited_spawn_id in limited_spawn_ids:
-        spawn_rows = spawn_id_to_rows_dict[limited_spawn_id]
-        filtered_chr_db_rows.append(pick_spawn(spawn_rows))
-
-name_armature_dict = {}
-name_armature_object_list_dict = {}
-print("Importing character gltf models...")
-for row in filtered_chr_db_rows:
-    race = int(row[6])
-    if race < 13 or race == 128:
-        import_success = import_player_character(row, model_extension, zone_chr_export_folder)
-    else:
-        import_success = import_npc(row, model_extension, zone_chr_export_folder, db_race_translation_dict)
+    def step(self):
+        self.step_index += 1
+        if not self.enabled:
+            return
+        if self.step_count:
+            bpy.context.window_manager.progress_update(min(self.step_index, self.step_count))
+        if self.step_index % self.view_layer_update_interval == 0:
+            bpy.context.view_layer.update()
 
-    if not import_success:
-        continue
+def get_new_model_library_paths(model_paths, model_cache, character_library_folder):
 
-    scale_multiplier = get_scale_multiplier(race, float(row[23]), zone_scalar)
-    set_transforms_on_imported_model(float(row[19]), float(row[20]), float(row[21]), float(row[22]), scale_multiplier)
-    
-    pathgrid = int(row[24])
-    dist = float(row[25])
-    for selected_obj in bpy.context.selected_objects:
-        for collection in selected_obj.users_collection:
-            collection.objects.unlink(selected_obj)
-        if pathgrid == 0 and dist == 0.0:
-            static_collection.objects.link(selected_obj)
+    # The models a loop will load in the order it loads them, each with its current library file or None
+    return {p: get_current_library_path(p, character_library_folder) for p in dict.fromkeys(model_paths) if p not in model_cache}
+
+def count_prefetch_stats(run_report, model_prefetcher):
+
+    run_report.count("prefetched_files", model_prefetcher.stats["files"])
+    run_report.count("prefetched_bytes", model_prefetcher.stats["bytes"])
+    run_report.count("prefetch_failures", model_prefetcher.stats["failed"])
+    run_report.count("prefetch_blocks", model_prefetcher.stats["blocks"])
+    run_report.count("prefetch_blocked_seconds", model_prefetcher.stats["blocked_seconds"])
+
+def record_new_model_import(run_report, model_path, library_path, import_seconds, is_prefetched):
+
+    # Import times are totalled separately for models whose files were read ahead, so the time per model with
+    # and without a warm file cache can be compared
+    prefetch_status = "prefetched" if is_prefetched else "not_prefetched"
+    run_report.record_model_import(model_path, import_seconds)
+    run_report.count("models_imported")
+    run_report.count("models_from_library" if library_path else "models_from_gltf")
+    run_report.count("models_imported_" + prefetch_status)
+    run_report.count("model_import_seconds_" + prefetch_status, import_seconds)
+
+def import_characters(config):
+
+    with BulkImportSession(config.bulk_session_mode, config.view_layer_update_interval) as bulk_session:
+        import_zone_characters(config, bulk_session)
+
+def import_zone_characters(config, bulk_session):
+
+    run_report = eq_instrumentation.RunReport("eq_import_chrs")
+    report_path = os.path.join(config.lantern_export_folder, config.zone_name, config.zone_name + "_characters_report.json")
+
+    base_collection = bpy.data.collections["Collection"]
+    chr_collection = bpy.data.collections.get(Constants.Character_Collection)
+    if not chr_collection:
+        chr_collection = bpy.data.collections.new(Constants.Character_Collection)
+        base_collection.children.link(chr_collection)
+
+    # Without a configured seed, the seed the last import of this zone used is reused so its spawns can be kept
+    existing_spawn_objects_dict = get_existing_spawn_objects(config.zone_name)
+    spawn_seed = config.spawn_seed
+    spawn_seed_property = Constants.Spawn_Seed_Property_Prefix + config.zone_name
+    if spawn_seed is None and spawn_seed_property in chr_collection:
+        spawn_seed = chr_collection[spawn_seed_property]
+        print("Reusing spawn seed {0} from the last import of {1}".format(spawn_seed, config.zone_name))
+    elif spawn_seed is None and existing_spawn_objects_dict:
+        print("WARNING: {0} has spawns from an earlier import but no spawn seed, most of them will be picked again and re-imported. "
+            "Set spawn_seed to keep them".format(config.zone_name))
+
+    with run_report.phase("spawn_plan"):
+        spawn_plan = eq_spawn_plan.get_spawn_plan(config.zone_name, config.lantern_export_folder, config.race_data_csv_location, config.db_location,
+            config.import_static, config.import_patrols, config.model_extension, config.zone_scalar, config.use_fast_db_query,
+            config.db_working_copy_location, spawn_seed, config.spawn_cache_folder, run_report)
+    print("Spawn plan has {0} spawns with seed {1}".format(len(spawn_plan["spawns"]), spawn_plan["seed"]))
+    for stat_name, value in spawn_plan["stats"].items():
+        run_report.count(stat_name, value)
+    chr_collection[spawn_seed_property] = spawn_plan["seed"]
+
+    spawn_collection_dict = {}
+    if config.import_static:
+        spawn_collection_dict[Constants.Static_Collection] = get_spawn_collection(Constants.Static_Collection, chr_collection)
+    if config.import_patrols:
+        spawn_collection_dict[Constants.Patrols_Collection] = get_spawn_collection(Constants.Patrols_Collection, chr_collection)
+
+    deselect_all_objects()
+
+    # Spawns tagged by an earlier run on this file are matched against the plan. Unchanged ones stay and
+    # only have their transforms updated, so re-running after a small DB or export change is incremental
+    existing_tags_dict = {spawn_key: get_object_spawn_tags(spawn_objs[0]) for spawn_key, spawn_objs in existing_spawn_objects_dict.items()}
+    patrol_path_action_dict = {}
+    if config.bake_patrol_paths and config.import_patrols:
+        print("Baking patrol paths...")
+        with run_report.phase("bake_patrol_paths"):
+            patrol_grid_ids = set(s["pathgrid"] for s in spawn_plan["spawns"] if s["collection"] == Constants.Patrols_Collection and s["pathgrid"])
+            patrol_path_action_dict = create_patrol_path_actions(config.zone_name, eq_spawn_plan.query_grid_entries(config.db_location, config.zone_name),
+                patrol_grid_ids, config.patrol_walk_speed, config.zone_scalar)
+        run_report.count("patrol_paths_baked", len(patrol_path_action_dict))
+
+    # Static spawns drawn as instances aren't imported as objects, so objects a previous run made for them are removed
+    instance_static_spawns = config.import_static and config.static_spawn_mode == "INSTANCES"
+    instanced_spawns = []
+    object_spawns = []
+    for spawn in spawn_plan["spawns"]:
+        if instance_static_spawns and spawn["collection"] == Constants.Static_Collection:
+            instanced_spawns.append(spawn)
         else:
-            patrols_collection.objects.link(selected_obj)
-    
-    primary, secondary = get_primary_secondary_values(row)
-    rename_imported_model_and_fix_duplication(str(row[5]).strip().strip('#'), name_armature_dict, name_armature_object_list_dict, primary, secondary)
+            object_spawns.append(spawn)
+    object_spawn_plan = dict(spawn_plan, spawns=object_spawns)
+    spawns_to_import, spawns_to_update, spawn_keys_to_remove = eq_spawn_plan.diff_spawn_plan_against_tags(object_spawn_plan, existing_tags_dict,
+        patrol_path_action_dict)
+    if existing_spawn_objects_dict:
+        print("Found {0} spawns from an earlier import: {1} to update, {2} to remove, {3} to import".format(
+            len(existing_spawn_objects_dict), len(spawns_to_update), len(spawn_keys_to_remove), len(spawns_to_import)))
+
+    name_armature_dict = {}
+    name_armature_object_list_dict = {}
+    model_cache = {}
+    material_registry_dict = {}
+    image_registry_dict = {}
+    deduplicated_datablock_count = 0
+    released_data = set()
+
+    with run_report.phase("remove_stale_spawns"):
+        for spawn_key in spawn_keys_to_remove:
+            remove_spawn_objects(existing_spawn_objects_dict[spawn_key], released_data)
+    run_report.count("spawns_removed", len(spawn_keys_to_remove))
+
+    with run_report.phase("update_spawns"):
+        for spawn, spawn_tags in spawns_to_update:
+            spawn_objs = existing_spawn_objects_dict[(spawn_tags["eq_spawn2_id"], spawn_tags["eq_spawn_instance"])]
+            path_obj = next((o for o in spawn_objs if o.type == "EMPTY"), None)
+            spawn_model_objs = [o for o in spawn_objs if o != path_obj]
+            if path_obj:
+                path_obj.animation_data.action = patrol_path_action_dict[spawn["pathgrid"]]
+                set_transforms_on_imported_model(spawn_model_objs, (0.0, 0.0, 0.0), 0.0, spawn["scale"])
+            else:
+                set_transforms_on_imported_model(spawn_model_objs, spawn["location"], spawn["rotation"], spawn["scale"])
+            move_objects_to_collection(spawn_objs, spawn_collection_dict[spawn["collection"]])
 
-    bpy.ops.object.select_all(action='DESELECT')
+            # Kept spawns are the source for linked duplicates and shared animation of new spawns using the same model
+            model_cache.setdefault(spawn["model_path"], spawn_model_objs)
+            armature_obj = next((o for o in spawn_model_objs if o.type == "ARMATURE"), None)
+            if armature_obj and spawn["skeleton_key"] not in name_armature_dict:
+                name_armature_dict[spawn["skeleton_key"]] = armature_obj.data
+                name_armature_object_list_dict[spawn["skeleton_key"]] = [armature_obj]
+    run_report.count("spawns_updated", len(spawns_to_update))
 
-print("Condensing duplicate animation data...")
-link_anim_data(name_armature_object_list_dict)
-print("Cleaning up duplicated orphan data...")
-delete_orphaned_data()
-print("Done!")
+    existing_image_names = set()
+    for image in bpy.data.images:
+        image_registry_dict.setdefault(get_image_key(image), image)
+        existing_image_names.add(image.name)
+
+    bulk_session.begin_progress(len(spawns_to_import) + len(set(s["model_path"] for s in instanced_spawns)))
+
+    library_path_dict = get_new_model_library_paths([s["model_path"] for s, _ in spawns_to_import], model_cache, config.character_library_folder)
+    model_prefetcher = eq_model_prefetch.ModelPrefetcher(list(library_path_dict.items()), config.prefetch_models_ahead, config.prefetch_workers,
+        prefetch_image_file_info if config.dedupe_images_by_content else None)
+
+    print("Importing character gltf models...")
+    profile_path = None
+    if config.profile_import_loop:
+        profile_path = os.path.join(config.lantern_export_folder, config.zone_name, config.zone_name + "_characters_import.prof")
+    with run_report.phase("import_loop"), run_report.profile(profile_path), model_prefetcher:
+        for spawn, spawn_tags in spawns_to_import:
+            model_path = spawn["model_path"]
+            is_new_model = model_path not in model_cache
+            library_path = library_path_dict.get(model_path) if is_new_model else None
+            spawn_collection = spawn_collection_dict[spawn["collection"]]
+            is_prefetched = model_prefetcher.wait_for_model(model_path) if is_new_model else False
+            import_start_time = time.perf_counter()
+            spawn_objs = import_model(model_path, model_cache, spawn_collection, library_path, config.link_library_models)
+            if is_new_model:
+                record_new_model_import(run_report, model_path, library_path, time.perf_counter() - import_start_time, is_prefetched)
+                # Linked library data is read only and already shared through the library files
+                if not (library_path and config.link_library_models):
+                    deduplicated_datablock_count += dedupe_imported_materials(spawn_objs, material_registry_dict, image_registry_dict)
+            else:
+                run_report.count("models_duplicated")
+
+            path_action = patrol_path_action_dict.get(spawn["pathgrid"])
+            if path_action:
+                set_transforms_on_imported_model(spawn_objs, (0.0, 0.0, 0.0), 0.0, spawn["scale"])
+                spawn_objs.append(attach_patrol_path(spawn_objs, spawn["name"], path_action, spawn_collection))
+            else:
+                set_transforms_on_imported_model(spawn_objs, spawn["location"], spawn["rotation"], spawn["scale"])
+            move_objects_to_collection(spawn_objs, spawn_collection)
+            rename_imported_model_and_fix_duplication(spawn_objs, spawn["name"], spawn["skeleton_key"], name_armature_dict, name_armature_object_list_dict)
+            tag_spawn_objects(spawn_objs, spawn_tags)
+            bulk_session.step()
+    count_prefetch_stats(run_report, model_prefetcher)
+
+    static_points_name = config.zone_name + "_StaticInstances"
+    static_models_collection_name = config.zone_name + " Static Models"
+    if instance_static_spawns:
+        print("Importing static spawn models for instancing...")
+        with run_report.phase("static_instances"):
+            # The model collections aren't linked to the scene, they're only drawn through the instances
+            static_models_collection = bpy.data.collections.get(static_models_collection_name)
+            if not static_models_collection:
+                static_models_collection = bpy.data.collections.new(static_models_collection_name)
+                static_models_collection.use_fake_user = True
+            model_spawn_dict = {}
+            for spawn in instanced_spawns:
+                model_spawn_dict.setdefault(spawn["model_path"], spawn)
+            model_collection_dict = get_instance_model_collections(static_models_collection, model_spawn_dict, released_data)
+            library_path_dict = get_new_model_library_paths([p for p in model_spawn_dict if p not in model_collection_dict], model_cache,
+                config.character_library_folder)
+            model_prefetcher = eq_model_prefetch.ModelPrefetcher(list(library_path_dict.items()), config.prefetch_models_ahead, config.prefetch_workers,
+                prefetch_image_file_info if config.dedupe_images_by_content else None)
+
+            with model_prefetcher:
+                for model_path, spawn in model_spawn_dict.items():
+                    if model_path in model_collection_dict:
+                        continue
+                    model_name = os.path.splitext(os.path.basename(model_path))[0]
+                    model_collection = bpy.data.collections.new(Constants.Instance_Model_Collection_Prefix + model_name)
+                    model_collection["eq_model_path"] = model_path
+                    model_collection["eq_model_mtime"] = os.path.getmtime(model_path)
+                    static_models_collection.children.link(model_collection)
 
+                    is_new_model = model_path not in model_cache
+                    library_path = library_path_dict.get(model_path) if is_new_model else None
+                    is_prefetched = model_prefetcher.wait_for_model(model_path) if is_new_model else False
+                    import_start_time = time.perf_counter()
+                    model_objs = import_model(model_path, model_cache, model_collection, library_path, config.link_library_models)
+                    if is_new_model:
+                        record_new_model_import(run_report, model_path, library_path, time.perf_counter() - import_start_time, is_prefetched)
+                        if not (library_path and config.link_library_models):
+                            deduplicated_datablock_count += dedupe_imported_materials(model_objs, material_registry_dict, image_registry_dict)
+
+                    set_transforms_on_imported_model(model_objs, (0.0, 0.0, 0.0), 0.0, 1.0)
+                    rename_imported_model_and_fix_duplication(model_objs, model_name, spawn["skeleton_key"], name_armature_dict, name_armature_object_list_dict)
+                    move_objects_to_collection(model_objs, model_collection)
+                    bulk_session.step()
+            count_prefetch_stats(run_report, model_prefetcher)
+
+            model_index_dict = sort_instance_model_collections(static_models_collection)
+            create_static_instance_points(static_points_name, instanced_spawns, model_index_dict, spawn_collection_dict[Constants.Static_Collection],
+                get_static_instances_node_group(config.zone_name, static_models_collection), released_data)
+        run_report.count("static_instance_points", len(instanced_spawns))
+        run_report.count("static_instance_models", len(model_index_dict))
+        print("Drew {0} static spawns as instances of {1} models".format(len(instanced_spawns), len(model_index_dict)))
+    elif bpy.data.objects.get(static_points_name) or bpy.data.collections.get(static_models_collection_name):
+        remove_static_instances(static_points_name, static_models_collection_name, released_data)
+
+    print("Imported {0} unique model files for {1} new spawns".format(run_report.counters.get("models_imported", 0), len(spawns_to_import)))
+    print("Removed {0} duplicate materials and images during import".format(deduplicated_datablock_count))
+    run_report.count("datablocks_deduplicated", deduplicated_datablock_count)
+    if config.dedupe_images_by_content:
+        print("Merging images with identical content...")
+        with run_report.phase("dedupe_images_by_content"):
+            new_images = [image for image in bpy.data.images if image.name not in existing_image_names]
+            removed_image_count, reclaimed_byte_count = dedupe_images_by_content_hash(new_images)
+        print("Merged {0} duplicate images, reclaiming {1:.1f} MB of pixel memory".format(removed_image_count, reclaimed_byte_count / (1024 * 1024)))
+        run_report.count("images_merged_by_content", removed_image_count)
+        run_report.count("image_bytes_reclaimed", reclaimed_byte_count)
+    if config.viewport_proxy_mode != "NONE":
+        print("Adding viewport proxies...")
+        with run_report.phase("viewport_proxies"):
+            proxy_count, proxy_mesh_count = add_viewport_proxies(config.zone_name, config.viewport_proxy_mode, config.proxy_decimate_ratio,
+                released_data)
+        print("Added {0} viewport proxies sharing {1} proxy meshes".format(proxy_count, proxy_mesh_count))
+        run_report.count("viewport_proxies_added", proxy_count)
+        run_report.count("viewport_proxy_meshes", proxy_mesh_count)
+    else:
+        run_report.count("viewport_proxies_removed", remove_viewport_proxies(config.zone_name, released_data))
+    if config.viewport_deform_distance > 0.0:
+        bpy.context.view_layer.update()
+        deformed_count = set_viewport_deform_distance(config.zone_name, get_viewport_reference_location(), config.viewport_deform_distance)
+        print("{0} characters within {1} of the viewport reference keep armature deformation in the viewport".format(deformed_count,
+            config.viewport_deform_distance))
+        run_report.count("viewport_deformed_characters", deformed_count)
+    print("Condensing duplicate animation data...")
+    with run_report.phase("link_anim_data"):
+        link_anim_data(name_armature_object_list_dict, config.keep_animations)
+    print("Cleaning up duplicated orphan data...")
+    with run_report.phase("delete_orphaned_data"):
+        run_report.count("datablocks_removed", delete_released_data(released_data) + delete_orphaned_data())
+    if config.output_blend_location:
+        print("Saving " + config.output_blend_location + "...")
+        with run_report.phase("save"):
+            bpy.ops.wm.save_as_mainfile(filepath=config.output_blend_location)
+    run_report.print_summary()
+    if config.write_run_report:
+        run_report.write(report_path)
+    print("Done!")
+
+###### SCRIPT START ######
 
+if __name__ == "__main__":
+    import_characters(parse_command_line_config(sys.argv))
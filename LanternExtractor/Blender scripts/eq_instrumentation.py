@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import cProfile
+import datetime
+import contextlib
+
+# Lightweight timing and counters shared by the Blender scripts. Each run collects wall time per
+# phase, counters and per-model import times, and writes them to a JSON report at the end
+
+class RunReport:
+
+    def __init__(self, script_name):
+        self.script_name = script_name
+        self.started = datetime.datetime.now().isoformat(timespec="seconds")
+        self.start_time = time.perf_counter()
+        self.phases = {}
+        self.counters = {}
+        self.model_imports = []
+        self.profile_path = None
+
+    @contextlib.contextmanager
+    def phase(self, phase_name):
+        phase_start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase_name] = self.phases.get(phase_name, 0.0) + time.perf_counter() - phase_start_time
+
+    @contextlib.contextmanager
+    def profile(self, profile_path):
+        # cProfile only when a dump path is given, since it slows down everything it wraps
+        if not profile_path:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            self.profile_path = profile_path
+
+    def count(self, counter_name, amount=1):
+        self.counters[counter_name] = self.counters.get(counter_name, 0) + amount
+
+    def record_model_import(self, model_path, seconds):
+        self.model_imports.append({"model_path": model_path, "seconds": round(seconds, 4)})
+
+    def to_dict(self):
+        return {
+            "script": self.script_name,
+            "started": self.started,
+            "total_seconds": round(time.perf_counter() - self.start_time, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "counters": {name: round(value, 4) if isinstance(value, float) else value for name, value in self.counters.items()},
+            "model_imports": sorted(self.model_imports, key=lambda m: m["seconds"], reverse=True),
+            "profile": self.profile_path,
+        }
+
+    def print_summary(self):
+        report_dict = self.to_dict()
+        print("{0} finished in {1:.2f} seconds".format(self.script_name, report_dict["total_seconds"]))
+        for phase_name, seconds in sorted(report_dict["phases"].items(), key=lambda p: p[1], reverse=True):
+            print("  {0:<28} {1:>10.2f} s".format(phase_name, seconds))
+        for counter_name, value in sorted(report_dict["counters"].items()):
+            print("  {0:<28} {1:>10}".format(counter_name, value))
+
+    def write(self, report_path):
+        report_folder = os.path.dirname(report_path)
+        if report_folder:
+            os.makedirs(report_folder, exist_ok=True)
+        with open(report_path, "w") as f_stream:
+            json.dump(self.to_dict(), f_stream, indent=4)
+        print("Run report written to " + report_path)
+
+def get_report_path(report_folder, blend_file_path, report_file_name):
+
+    # Scripts that work on the open .blend write their report next to it unless a folder is configured.
+    # An unsaved file with no folder configured gets no report file, only the printed summary
+    if not report_folder:
+        if not blend_file_path:
+            return None
+        report_folder = os.path.dirname(blend_file_path)
+
+    return os.path.join(report_folder, report_file_name)
@@ -0,0 +1,198 @@
+import bpy
+import os
+import sys
+import importlib
+
+# Runs the scripts in this folder as a Blender add-on: the paths live in the add-on preferences and each
+# script is an operator, found in the 3D View sidebar under LanternEQ or with F3 search. Install this file
+# from Edit > Preferences > Add-ons > Install and point "Scripts folder" at this folder.
+#
+# The scripts are imported once and stay loaded, so lookup files, the indexed database copy and seeded
+# spawn plans are reused by later runs in the same session. The scripts still run on their own from the
+# Text Editor or with blender --python as before
+
+bl_info = {
+    "name": "LanternEQ Tools",
+    "author": "LanternEQ",
+    "version": (1, 0, 0),
+    "blender": (3, 4, 0),
+    "location": "View3D > Sidebar > LanternEQ",
+    "description": "Import zone characters from LanternExtractor exports, animate textures and fix vertex color shading",
+    "category": "Import-Export",
+}
+
+def get_preferences():
+
+    return bpy.context.preferences.addons[__name__].preferences
+
+def import_script_module(module_name):
+
+    scripts_folder = bpy.path.abspath(get_preferences().blender_scripts_folder) or os.path.dirname(os.path.abspath(__file__))
+    if not os.path.exists(os.path.join(scripts_folder, module_name + ".py")):
+        raise Exception(module_name + ".py not found in " + scripts_folder + ", set the scripts folder in the add-on preferences")
+    if scripts_folder not in sys.path:
+        sys.path.append(scripts_folder)
+
+    return importlib.import_module(module_name)
+
+class LanternAddonPreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    # Empty paths keep the defaults from the CONFIG block of each script
+    blender_scripts_folder: bpy.props.StringProperty(name="Scripts folder", subtype='DIR_PATH')
+    lantern_export_folder: bpy.props.StringProperty(name="Exports folder", subtype='DIR_PATH')
+    race_data_csv_location: bpy.props.StringProperty(name="RaceData.csv", subtype='FILE_PATH')
+    db_location: bpy.props.StringProperty(name="Database", subtype='FILE_PATH')
+    db_working_copy_location: bpy.props.StringProperty(name="Indexed database copy", subtype='FILE_PATH')
+    animated_texture_csv_location: bpy.props.StringProperty(name="animatedTextures.csv", subtype='FILE_PATH')
+    character_library_folder: bpy.props.StringProperty(name="Character library", subtype='DIR_PATH')
+    spawn_cache_folder: bpy.props.StringProperty(name="Spawn cache", subtype='DIR_PATH')
+    link_library_models: bpy.props.BoolProperty(name="Link library models", default=False)
+    model_extension: bpy.props.EnumProperty(name="Model extension", items=[("gltf", "glTF", ""), ("glb", "glb", "")])
+    zone_scalar: bpy.props.FloatProperty(name="Zone scalar", default=0.2)
+    write_run_report: bpy.props.BoolProperty(name="Write run reports", default=True)
+
+    def draw(self, context):
+        for property_name in self.__annotations__:
+            self.layout.prop(self, property_name)
+
+class EQ_OT_import_characters(bpy.types.Operator):
+    """Import the characters that spawn in a zone"""
+    bl_idname = "eq.import_characters"
+    bl_label = "Import Zone Characters"
+    bl_options = {'REGISTER'}
+
+    zone_name: bpy.props.StringProperty(name="Zone")
+    import_static: bpy.props.BoolProperty(name="Static spawns", default=True)
+    import_patrols: bpy.props.BoolProperty(name="Patrols", default=False)
+    static_spawn_mode: bpy.props.EnumProperty(name="Static spawns as", items=[("OBJECTS", "Objects", ""), ("INSTANCES", "Instances", "")])
+    bake_patrol_paths: bpy.props.BoolProperty(name="Bake patrol paths", default=False)
+    spawn_seed: bpy.props.IntProperty(name="Spawn seed", default=-1, min=-1, description="-1 reuses the zone's last seed, or picks a new one on the zone's first import")
+    keep_animations: bpy.props.StringProperty(name="Keep animations", description="Comma separated, e.g. pos,P01,L01. Empty keeps all")
+    viewport_proxy_mode: bpy.props.EnumProperty(name="Viewport proxies", items=[("NONE", "None", "Full meshes in the viewport"),
+        ("BOUNDS", "Bounds", "A box per character"), ("DECIMATE", "Decimated", "A decimated mesh deformed by the armature")])
+    viewport_deform_distance: bpy.props.FloatProperty(name="Deform distance", default=0.0, min=0.0, description="0 deforms every character")
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        preferences = get_preferences()
+        try:
+            eq_import_chrs = import_script_module("eq_import_chrs")
+            config = eq_import_chrs.parse_command_line_config([])
+            for path_name in ["lantern_export_folder", "race_data_csv_location", "db_location", "db_working_copy_location",
+                "character_library_folder", "spawn_cache_folder"]:
+                path = bpy.path.abspath(getattr(preferences, path_name))
+                if path:
+                    setattr(config, path_name, path)
+            config.model_extension = preferences.model_extension
+            config.zone_scalar = preferences.zone_scalar
+            config.link_library_models = preferences.link_library_models
+            config.write_run_report = preferences.write_run_report
+            config.zone_name = self.zone_name
+            config.import_static = self.import_static
+            config.import_patrols = self.import_patrols
+            config.static_spawn_mode = self.static_spawn_mode
+            config.bake_patrol_paths = self.bake_patrol_paths
+            config.spawn_seed = self.spawn_seed if self.spawn_seed >= 0 else None
+            config.keep_animations = [a.strip() for a in self.keep_animations.split(',') if a.strip()]
+            config.viewport_proxy_mode = self.viewport_proxy_mode
+            config.viewport_deform_distance = self.viewport_deform_distance
+            config.output_blend_location = ""
+            eq_import_chrs.import_characters(config)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        return {'FINISHED'}
+
+class EQ_OT_viewport_deform_distance(bpy.types.Operator):
+    """Deform only the characters near the scene camera in the viewport"""
+    bl_idname = "eq.viewport_deform_distance"
+    bl_label = "Viewport Deform Distance"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    max_distance: bpy.props.FloatProperty(name="Distance", default=50.0, min=0.0, description="0 deforms every character")
+
+    def execute(self, context):
+        try:
+            eq_import_chrs = import_script_module("eq_import_chrs")
+            deformed_count = eq_import_chrs.set_viewport_deform_distance(None, eq_import_chrs.get_viewport_reference_location(), self.max_distance)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "{0} characters deformed in the viewport".format(deformed_count))
+        return {'FINISHED'}
+
+class EQ_OT_animate_textures(bpy.types.Operator):
+    """Animate the materials listed in animatedTextures.csv"""
+    bl_idname = "eq.animate_textures"
+    bl_label = "Animate Textures"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    animation_mode: bpy.props.EnumProperty(name="Mode", items=[("BAKED", "Baked", "Shared baked actions"), ("DRIVER", "Driver", "A driver per material"),
+        ("ATLAS", "Atlas", "Frames packed into one image, UV offset keyed")], default="DRIVER")
+
+    def execute(self, context):
+        preferences = get_preferences()
+        try:
+            eq_animate_textures = import_script_module("eq_animate_textures")
+            animated_texture_csv_location = bpy.path.abspath(preferences.animated_texture_csv_location) or eq_animate_textures.animated_texture_csv_location
+            eq_animate_textures.animate_textures(animated_texture_csv_location, self.animation_mode, eq_animate_textures.max_baked_keyframes,
+                eq_animate_textures.run_report_folder)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        return {'FINISHED'}
+
+class EQ_OT_vertex_color_emission(bpy.types.Operator):
+    """Route vertex colors through the shared emission node group"""
+    bl_idname = "eq.vertex_color_emission"
+    bl_label = "Vertex Color Emission"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    emission_strength: bpy.props.FloatProperty(name="Emission strength", default=0.1, min=0.0)
+
+    def execute(self, context):
+        try:
+            eq_vertex_color_shader_edit = import_script_module("eq_vertex_color_shader_edit")
+            eq_vertex_color_shader_edit.edit_vertex_color_materials(self.emission_strength, eq_vertex_color_shader_edit.run_report_folder)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        return {'FINISHED'}
+
+class VIEW3D_PT_lantern_tools(bpy.types.Panel):
+    bl_label = "LanternEQ"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "LanternEQ"
+
+    def draw(self, context):
+        self.layout.operator(EQ_OT_import_characters.bl_idname)
+        self.layout.operator(EQ_OT_viewport_deform_distance.bl_idname)
+        self.layout.operator(EQ_OT_animate_textures.bl_idname)
+        self.layout.operator(EQ_OT_vertex_color_emission.bl_idname)
+
+classes = [
+    LanternAddonPreferences,
+    EQ_OT_import_characters,
+    EQ_OT_viewport_deform_distance,
+    EQ_OT_animate_textures,
+    EQ_OT_vertex_color_emission,
+    VIEW3D_PT_lantern_tools,
+]
+
+def register():
+
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+def unregister():
+
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
@@ -0,0 +1,24 @@
+import os
+
+# Lookup files like RaceData.csv and animatedTextures.csv are parsed once per Blender session. The parsed
+# result is kept here, in a module that stays loaded between runs, and parsed again only when the file's
+# mtime changes. Callers share the returned value, so it must not be modified
+
+loaded_tables = {}
+
+def load_memoized(file_path, loader):
+
+    table_key = (loader.__module__, loader.__name__, os.path.normcase(os.path.abspath(file_path)))
+    file_mtime = os.path.getmtime(file_path)
+    loaded_table = loaded_tables.get(table_key)
+    if loaded_table and loaded_table[0] == file_mtime:
+        return loaded_table[1]
+
+    table = loader(file_path)
+    loaded_tables[table_key] = (file_mtime, table)
+
+    return table
+
+def clear():
+
+    loaded_tables.clear()
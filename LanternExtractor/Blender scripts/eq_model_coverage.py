@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import argparse
+import concurrent.futures
+
+import eq_spawn_plan
+
+# Checks which character models every zone's spawns need and whether the extractor exported them, without
+# Blender. Uses the same resolution rules as eq_import_chrs.py and the spawn cache from eq_spawn_plan.py, so
+# the whole database is read in one pass. Run with a regular Python install:
+#
+# python eq_model_coverage.py --lantern-export-folder C:\LanternExtractor\Exports
+#     --race-data-csv-location C:\LanternExtractor\RaceData.csv --db-location lantern_server.db
+#     --output model_coverage.json
+#
+# Each model a zone needs counts once, as an exact hit, a fallback hit on one of the backup models, a
+# miss, or an unknown race when RaceData.csv has no model for the NPC's race and gender
+
+def parse_arguments():
+
+    parser = argparse.ArgumentParser(description="Report exported character model coverage for every zone's spawns")
+    parser.add_argument("zones", nargs="*", help="Zone shortnames to check. Every zone with spawns if none are given")
+    parser.add_argument("--lantern-export-folder", required=True)
+    parser.add_argument("--race-data-csv-location", required=True)
+    parser.add_argument("--db-location", required=True)
+    parser.add_argument("--db-working-copy-location", default=None)
+    parser.add_argument("--spawn-cache-folder", default=None, help="Defaults to <database name>_spawn_cache next to the database")
+    parser.add_argument("--model-extension", default="gltf", choices=["gltf", "glb"])
+    parser.add_argument("--workers", type=int, default=min(32, (os.cpu_count() or 1) * 4), help="Zone folders scanned at once")
+    parser.add_argument("--output", help="Write the report to this file")
+
+    args = parser.parse_args()
+    if args.db_working_copy_location is None:
+        args.db_working_copy_location = os.path.splitext(args.db_location)[0] + "_indexed.db"
+    if args.spawn_cache_folder is None:
+        args.spawn_cache_folder = os.path.splitext(args.db_location)[0] + "_spawn_cache"
+
+    return args
+
+def get_required_model(row, db_race_translation_dict):
+
+    # The model name a spawn row asks for and whether it's a player character, whose models have no backups
+    race = int(row[6])
+    if eq_spawn_plan.is_player_character_race(race):
+        return "{0}_{1}".format(str(row[5]).strip().strip('#'), row[4]), True
+
+    race_identifier, texture = eq_spawn_plan.get_npc_race_identifier_and_texture(row, db_race_translation_dict)
+    return eq_spawn_plan.get_unique_npc_string(race_identifier, texture, row), False
+
+def check_zone_coverage(zone_name, spawn_rows, characters_folder, model_extension, db_race_translation_dict):
+
+    zone_coverage = {
+        "zone": zone_name,
+        "spawn_rows": len(spawn_rows),
+        "exported": os.path.isdir(characters_folder),
+        "exact": 0,
+        "fallback": 0,
+        "missing": 0,
+        "unknown_race": 0,
+        "fallbacks": {},
+        "missing_models": [],
+        "unknown_races": [],
+    }
+    model_file_index = eq_spawn_plan.index_model_files(characters_folder, model_extension) if zone_coverage["exported"] else set()
+
+    checked_models = set()
+    for row in spawn_rows:
+        try:
+            model_name, is_player_character = get_required_model(row, db_race_translation_dict)
+        except KeyError:
+            unknown_race = "{0}-{1}".format(int(row[6]), int(row[7]))
+            if unknown_race not in zone_coverage["unknown_races"]:
+                zone_coverage["unknown_races"].append(unknown_race)
+                zone_coverage["unknown_race"] += 1
+            continue
+        if model_name in checked_models:
+            continue
+        checked_models.add(model_name)
+
+        if is_player_character:
+            found_model_name = model_name if eq_spawn_plan.model_file_exists(model_name, model_file_index) else None
+        else:
+            found_model_name = eq_spawn_plan.find_npc_model_name(model_name, model_file_index)
+
+        if found_model_name == model_name:
+            zone_coverage["exact"] += 1
+        elif found_model_name:
+            zone_coverage["fallback"] += 1
+            zone_coverage["fallbacks"][model_name] = found_model_name
+        else:
+            zone_coverage["missing"] += 1
+            zone_coverage["missing_models"].append(model_name)
+
+    zone_coverage["missing_models"].sort()
+    return zone_coverage
+
+def print_summary(zone_coverages, total_seconds):
+
+    print("{0:<16} {1:>8} {2:>8} {3:>8} {4:>8} {5:>8}".format("Zone", "Rows", "Exact", "Fallback", "Missing", "Race?"))
+    for zone_coverage in zone_coverages:
+        print("{0:<16} {1:>8} {2:>8} {3:>8} {4:>8} {5:>8}{6}".format(zone_coverage["zone"], zone_coverage["spawn_rows"], zone_coverage["exact"],
+            zone_coverage["fallback"], zone_coverage["missing"], zone_coverage["unknown_race"], "" if zone_coverage["exported"] else "  not exported"))
+
+    totals = {key: sum(z[key] for z in zone_coverages) for key in ["exact", "fallback", "missing", "unknown_race"]}
+    print()
+    print("{0} zones checked in {1:.2f} seconds: {2} exact, {3} fallback, {4} missing, {5} unknown race".format(len(zone_coverages), total_seconds,
+        totals["exact"], totals["fallback"], totals["missing"], totals["unknown_race"]))
+
+    return totals
+
+###### SCRIPT START ######
+
+if __name__ == "__main__":
+
+    args = parse_arguments()
+    start_time = time.perf_counter()
+
+    db_race_translation_dict = eq_spawn_plan.load_race_translation_dict(args.race_data_csv_location)
+    spawn_cache_index = eq_spawn_plan.get_spawn_cache_index(args.db_location, args.db_working_copy_location, args.spawn_cache_folder)
+    zones = list(dict.fromkeys(args.zones)) or sorted(spawn_cache_index["zones"])
+
+    # Scanning the Characters folders is what takes the time on a network or cold disk, so zones are checked
+    # on a thread pool. The results are reported in zone order whatever order they finish in
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = []
+        for zone in zones:
+            spawn_rows = eq_spawn_plan.load_cached_spawn_rows(zone, args.spawn_cache_folder, spawn_cache_index, True, True)
+            characters_folder = os.path.join(args.lantern_export_folder, zone, "Characters")
+            futures.append(executor.submit(check_zone_coverage, zone, spawn_rows, characters_folder, args.model_extension, db_race_translation_dict))
+        zone_coverages = [f.result() for f in futures]
+    total_seconds = time.perf_counter() - start_time
+
+    totals = print_summary(zone_coverages, total_seconds)
+
+    if args.output:
+        with open(args.output, "w") as f_stream:
+            json.dump({"seconds": round(total_seconds, 2), "totals": totals, "zones": zone_coverages}, f_stream, indent=4)
+        print("Report written to " + args.output)
+
+    sys.exit(1 if totals["missing"] or totals["unknown_race"] else 0)
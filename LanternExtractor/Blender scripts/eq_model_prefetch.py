@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import threading
+import urllib.parse
+import concurrent.futures
+
+# Reads the files of the models eq_import_chrs.py is about to load on a thread pool, a bounded number of
+# models ahead of the import loop, so Blender's importer finds them in the OS file cache instead of waiting
+# on a cold disk or network share. Blender's data can only be touched from the main thread, so the workers
+# only read files, and like eq_spawn_plan.py this stays free of bpy
+
+class Constants:
+    Read_Chunk_Size = 1024 * 1024
+    Gltf_Extension = ".gltf"
+    Image_Extensions = (".png", ".jpg", ".jpeg")
+
+def get_gltf_dependency_paths(model_path, gltf_bytes):
+
+    # The .bin buffers and textures a .gltf references by relative uri. A .glb carries its buffers and
+    # textures inside the one file, as do data: uris
+    if os.path.splitext(model_path)[1].lower() != Constants.Gltf_Extension:
+        return []
+
+    gltf = json.loads(gltf_bytes)
+    model_folder = os.path.dirname(model_path)
+    dependency_paths = []
+    for entry in gltf.get("buffers", []) + gltf.get("images", []):
+        uri = entry.get("uri")
+        if uri and not uri.startswith("data:"):
+            dependency_paths.append(os.path.normpath(os.path.join(model_folder, urllib.parse.unquote(uri))))
+
+    return dependency_paths
+
+def read_file(file_path):
+
+    # The contents are thrown away, reading them is only to pull them into the OS file cache
+    byte_count = 0
+    chunk = bytearray(Constants.Read_Chunk_Size)
+    with open(file_path, "rb", buffering=0) as f_stream:
+        while True:
+            read_byte_count = f_stream.readinto(chunk)
+            if not read_byte_count:
+                break
+            byte_count += read_byte_count
+
+    return byte_count
+
+class ModelPrefetcher:
+
+    # model_files is a list of (model_path, library_path) in the order the import loop loads them, with
+    # library_path None for models imported from their glTF file. image_loader, if given, is called with
+    # the path of every texture instead of read_file, for work on the image the main thread would otherwise
+    # do later. Textures shared by several models are read once
+    def __init__(self, model_files, max_models_ahead, worker_count, image_loader=None):
+        self.model_files = model_files
+        self.max_models_ahead = max_models_ahead
+        self.image_loader = image_loader
+        self.executor = None
+        if model_files and max_models_ahead > 0 and worker_count > 0:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="eq_prefetch")
+        self.future_dict = {}
+        self.next_index = 0
+        self.loaded_count = 0
+        self.read_paths = set()
+        self.read_paths_lock = threading.Lock()
+        self.stats = {"files": 0, "bytes": 0, "failed": 0, "blocks": 0, "blocked_seconds": 0.0}
+
+    def __enter__(self):
+        self.submit_ahead()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def submit_ahead(self):
+        if not self.executor:
+            return
+        while self.next_index < len(self.model_files) and self.next_index < self.loaded_count + self.max_models_ahead:
+            model_path, library_path = self.model_files[self.next_index]
+            self.future_dict[model_path] = (self.next_index, self.executor.submit(self.prefetch_model, model_path, library_path))
+            self.next_index += 1
+
+    def claim_path(self, file_path):
+        with self.read_paths_lock:
+            if file_path in self.read_paths:
+                return False
+            self.read_paths.add(file_path)
+            return True
+
+    def prefetch_model(self, model_path, library_path):
+        # Runs on a worker. Returns the files and bytes read
+        if library_path:
+            return 1, read_file(library_path)
+
+        with open(model_path, "rb") as f_stream:
+            model_bytes = f_stream.read()
+        file_count, byte_count = 1, len(model_bytes)
+        for dependency_path in get_gltf_dependency_paths(model_path, model_bytes):
+            # Missing files are left for the importer to report
+            if not os.path.isfile(dependency_path) or not self.claim_path(dependency_path):
+                continue
+            if self.image_loader and dependency_path.lower().endswith(Constants.Image_Extensions):
+                self.image_loader(dependency_path)
+                byte_count += os.path.getsize(dependency_path)
+            else:
+                byte_count += read_file(dependency_path)
+            file_count += 1
+
+        return file_count, byte_count
+
+    def wait_for_model(self, model_path):
+        # Called on the main thread right before it loads model_path. Blocks until the model's files are
+        # read and queues the models after it. Returns whether the files were read ahead, so the import
+        # should find them in the OS file cache. The time blocked here is only the part of the workers'
+        # reads the main thread caught up with, not the I/O the importer itself waits on
+        future_entry = self.future_dict.pop(model_path, None)
+        if not future_entry:
+            return False
+
+        model_index, future = future_entry
+        if not future.done():
+            block_start_time = time.perf_counter()
+            concurrent.futures.wait([future])
+            self.stats["blocks"] += 1
+            self.stats["blocked_seconds"] += time.perf_counter() - block_start_time
+
+        # Models skipped by the import loop are passed over, so the lookahead stays bounded
+        self.loaded_count = max(self.loaded_count, model_index + 1)
+        self.submit_ahead()
+
+        # A failed read is only a missed prefetch, the importer reads the file itself
+        if future.exception():
+            self.stats["failed"] += 1
+            return False
+        file_count, byte_count = future.result()
+        self.stats["files"] += file_count
+        self.stats["bytes"] += byte_count
+
+        return True
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Turns path grid waypoints from the database into keyframes for eq_import_chrs.py. The conversions to
+# Blender space run on whole arrays of waypoints at once, and like eq_spawn_plan.py this stays free of bpy
+
+def convert_headings_to_radians(headings):
+
+    # eq_spawn_plan.convert_heading_to_radians over an array
+    return np.radians((headings * 720.0 + 91800.0) / 512.0 % 360.0)
+
+def convert_locations_to_blender(locations, zone_scalar):
+
+    # Same axis swap as eq_spawn_plan.create_spawn_plan_entry
+    return np.column_stack((locations[:, 1] * -zone_scalar, locations[:, 0] * -zone_scalar, locations[:, 2] * zone_scalar))
+
+def get_segment_headings(locations):
+
+    # Database heading (256 to a full turn) facing from each waypoint to the next, wrapping back to the first.
+    # Same angle the server works out for an NPC moving to a point. Repeated waypoints keep the previous heading
+    deltas = np.roll(locations, -1, axis=0) - locations
+    heading_degrees = (90.0 - np.degrees(np.arctan2(deltas[:, 1], deltas[:, 0]))) % 360.0
+    is_moving = np.any(deltas[:, 0:2] != 0.0, axis=1)
+    last_moving_index = np.maximum.accumulate(np.where(is_moving, np.arange(len(locations)), 0))
+
+    return heading_degrees[last_moving_index] * 256.0 / 360.0
+
+def get_patrol_keyframes(waypoints, walk_speed, turn_seconds, fps, start_frame, zone_scalar):
+
+    # Two keys per waypoint: arriving facing along the incoming segment, and leaving facing along the outgoing
+    # one after the waypoint's pause. A closing key back at the first waypoint lets the route loop with a
+    # cycles modifier. Returns the frames, Blender locations and Z rotations as arrays
+    waypoints = np.asarray(waypoints, dtype=np.float64)
+    locations = waypoints[:, 0:3]
+    pause_seconds = np.maximum(waypoints[:, 3], turn_seconds)
+    segment_seconds = np.linalg.norm(np.roll(locations, -1, axis=0) - locations, axis=1) / walk_speed
+    arrive_seconds = np.concatenate(([0.0], np.cumsum(pause_seconds + segment_seconds)))
+
+    key_count = len(waypoints) * 2 + 1
+    key_seconds = np.empty(key_count)
+    key_seconds[0:-1:2] = arrive_seconds[:-1]
+    key_seconds[1:-1:2] = arrive_seconds[:-1] + pause_seconds
+    key_seconds[-1] = arrive_seconds[-1]
+
+    key_locations = np.empty((key_count, 3))
+    key_locations[0:-1:2] = locations
+    key_locations[1:-1:2] = locations
+    key_locations[-1] = locations[0]
+
+    segment_headings = get_segment_headings(locations)
+    key_headings = np.empty(key_count)
+    key_headings[0:-1:2] = np.roll(segment_headings, 1)
+    key_headings[1:-1:2] = segment_headings
+    key_headings[-1] = segment_headings[-1]
+
+    # Unwrapped so every turn goes the short way round
+    key_rotations = np.unwrap(convert_headings_to_radians(key_headings))
+
+    return key_seconds * fps + start_frame, convert_locations_to_blender(key_locations, zone_scalar), key_rotations
@@ -0,0 +1,1039 @@
+import os
+import sys
+import json
+import math
+import sqlite3
+import itertools
+import operator
+import random
+import shutil
+import time
+import hashlib
+import argparse
+import eq_instrumentation
+import eq_lookup_tables
+
+# Spawn selection for eq_import_chrs.py, kept free of bpy so it can run and be checked outside Blender.
+# Produces a spawn plan: every spawn picked for the zone with its resolved model file, transform,
+# collection and skeleton key. The Blender side only replays the plan.
+#
+# Plans are seeded. With a seed, the plan is cached next to the zone's export folder and reused until the
+# zone, database, seed or export folder changes.
+#
+# The database rows can also come from a spawn cache: one query over every zone, written as a compact
+# <zone>_spawns.json per zone with the weapon picks already resolved. It's rebuilt when the database
+# changes, so importing many zones costs one pass over the database instead of one per zone. Plans can also be generated and compared from the command line:
+#
+# python eq_spawn_plan.py --zone-name gfaydark --lantern-export-folder C:\LanternExtractor\Exports
+#     --race-data-csv-location C:\LanternExtractor\RaceData.csv --db-location lantern_server.db --seed 1
+#     --output gfaydark_plan.json --diff gfaydark_plan_old.json
+
+class Constants:
+    Static_Collection = "Static"
+    Patrols_Collection = "Patrols"
+    Spawn_Plan_Version = 4
+    Spawn_Tag_Names = ["eq_zone", "eq_spawn2_id", "eq_spawn_instance", "eq_npc_id", "eq_model_path", "eq_model_mtime", "eq_path_grid"]
+    
+    Db_Query = """with npc_id_list as
+(
+	select distinct n.id
+	from alkabor_spawn2 s2
+	join alkabor_spawngroup sg on s2.spawngroupID = sg.id
+	join alkabor_spawnentry se on se.spawngroupID = sg.id
+	join alkabor_npc_types n on se.npcID = n.id
+	where s2.zone = '{0}'
+		and s2.enabled = 1
+		and (s2.pathgrid {1} 0 {2} sg.dist {1} 0.0)
+		and n.race <> 127 -- invisible man
+)
+select distinct sg.id as sgID, 
+	sg.spawn_limit as sg_limit, -- 1
+	s2.id as s2ID, -- 2
+	se.chance, -- 3
+	n.id as npcId, -- 4
+	n.name, -- 5
+	n.race, -- 6
+	n.gender, -- 7
+	n.face % 255 as face, -- 8 
+	n.texture, -- 9
+	case when n.d_melee_texture1 > 999 
+		then 0 
+		else n.d_melee_texture1 end as d_melee_texture1, -- 10
+	pri0.idfile, -- 11
+	pri0.itemtype, -- 12
+	case when n.d_melee_texture2 > 999 
+		then 0 
+		else n.d_melee_texture2 end as d_melee_texture2, -- 13
+	sec0.idfile, -- 14
+	sec0.itemtype, -- 15
+	sec1.idfile, -- 16
+	sec1.itemtype, -- 17
+	n.helmtexture, -- 18
+	s2.x, s2.y, s2.z, s2.heading, n.size, -- 19, 20, 21, 22, 23
+	s2.pathgrid, -- 24
+    sg.dist -- 25
+from alkabor_spawn2 s2
+join alkabor_spawngroup sg on s2.spawngroupID = sg.id
+join alkabor_spawnentry se on se.spawngroupID = sg.id
+join alkabor_npc_types n on se.npcID = n.id
+join npc_id_list n0 on n.id = n0.id
+left join 
+( -- PRIMARY
+	select id, idfile, itemtype
+	from (
+	  select distinct n.id, lte.probability, lde.chance, i.id as item_id, i.idfile, i.itemtype,
+		dense_rank() over (partition by n.id order by n.id, lte.probability desc, lde.chance desc, i.id) as rn
+		from npc_id_list n0
+		join alkabor_npc_types n on n0.id = n.id
+		join alkabor_loottable lt on n.loottable_id = lt.id
+		join alkabor_loottable_entries lte on lte.loottable_id = lt.id
+		join alkabor_lootdrop_entries lde on (lte.lootdrop_id = lde.lootdrop_id)
+		join items i on (lde.item_id = i.id and i.slots & 8192 > 0)
+		where lde.equip_item > 0
+		  and length(i.idfile) < 7
+		  and lte.probability > 24
+		  and lde.chance > 49
+		) s0
+	where rn = 1 ) pri0 on n.id = pri0.id
+left join 
+( -- SECONDARY IF DUAL WIELD
+	select id, idfile, itemtype
+	from (
+	  select distinct n.id, lte.probability, lde.chance, i.id as item_id, i.idfile, i.itemtype,
+		dense_rank() over (partition by n.id order by n.id, lte.probability desc, lde.chance desc, i.id) as rn
+		from npc_id_list n0
+		join alkabor_npc_types n on n0.id = n.id
+		join alkabor_loottable lt on n.loottable_id = lt.id
+		join alkabor_loottable_entries lte on lte.loottable_id = lt.id
+		join alkabor_lootdrop_entries lde on (lte.lootdrop_id = lde.lootdrop_id)
+		join items i on (lde.item_id = i.id and i.slots & 24576 > 0)
+		where n.class_ in (1, 4, 7, 8, 9, 20, 23, 26, 27, 28) -- can dual wield
+		  and lde.equip_item > 0
+		  and length(i.idfile) < 7
+		  and lte.probability > 24
+		  and lde.chance > 49
+		) s0
+	where rn = 2 ) sec0 on n.id = sec0.id
+left join 
+( -- SECONDARY IF SECONDARY ONLY SLOT
+	select id, idfile, itemtype
+	from (
+	  select distinct n.id, lte.probability, lde.chance, i.id as item_id, i.idfile, i.itemtype,
+		dense_rank() over (partition by n.id order by n.id, lte.probability desc, lde.chance desc, i.id) as rn
+		from npc_id_list n0
+		join alkabor_npc_types n on n0.id = n.id
+		join alkabor_loottable lt on n.loottable_id = lt.id
+		join alkabor_loottable_entries lte on lte.loottable_id = lt.id
+		join alkabor_lootdrop_entries lde on (lte.lootdrop_id = lde.lootdrop_id)
+		join items i on (lde.item_id = i.id and i.slots & 16834 > 0 and i.slots & 8192 = 0)
+		where lde.equip_item > 0
+		  and length(i.idfile) < 7
+		  and lte.probability > 24
+		  and lde.chance > 49
+		) s0
+	where rn = 1 ) sec1 on n.id = sec1.id
+where s2.zone = '{0}'
+    and s2.enabled = 1
+    and (s2.pathgrid {1} 0 {2} sg.dist {1} 0.0)
+order by sg.id, s2.id, n.id"""
+
+    Db_Helper_Indexes = [
+        "create index if not exists lantern_spawn2_zone on alkabor_spawn2 (zone, enabled)",
+        "create index if not exists lantern_spawnentry_spawngroup on alkabor_spawnentry (spawngroupID)",
+        "create index if not exists lantern_loottable_entries_loottable on alkabor_loottable_entries (loottable_id)",
+        "create index if not exists lantern_lootdrop_entries_lootdrop on alkabor_lootdrop_entries (lootdrop_id)"
+    ]
+
+    # Size, mtime and content hash of the database the working copy was made from, stored in the copy itself
+    # so it's swapped in with the data it describes
+    Db_Source_Table = "create table lantern_source_db (size integer, mtime real, hash text)"
+    Db_Source_Insert = "insert into lantern_source_db (size, mtime, hash) values (?, ?, ?)"
+    Db_Source_Update_Mtime = "update lantern_source_db set mtime = ?"
+    Db_Source_Query = "select size, mtime, hash from lantern_source_db"
+
+    # Parameters: zone, import static (0/1), import patrols (0/1)
+    Db_Fast_Npc_Id_List = """create temp table npc_id_list as
+select distinct n.id, n.loottable_id, n.class_
+from alkabor_spawn2 s2
+join alkabor_spawngroup sg on s2.spawngroupID = sg.id
+join alkabor_spawnentry se on se.spawngroupID = sg.id
+join alkabor_npc_types n on se.npcID = n.id
+where s2.zone = ?
+	and s2.enabled = 1
+	and ((? and s2.pathgrid = 0 and sg.dist = 0.0) or (? and (s2.pathgrid > 0 or sg.dist > 0.0)))
+	and n.race <> 127 -- invisible man"""
+
+    Db_Fast_Npc_Loot_Items = """create temp table npc_loot_items as
+select distinct n0.id as npc_id, n0.class_, lte.probability, lde.chance, i.id as item_id, i.idfile, i.itemtype, i.slots
+from npc_id_list n0
+join alkabor_loottable lt on n0.loottable_id = lt.id
+join alkabor_loottable_entries lte on lte.loottable_id = lt.id
+join alkabor_lootdrop_entries lde on (lte.lootdrop_id = lde.lootdrop_id)
+join items i on lde.item_id = i.id
+where lde.equip_item > 0
+	and length(i.idfile) < 7
+	and lte.probability > 24
+	and lde.chance > 49"""
+
+    # Same picks as the PRIMARY, SECONDARY IF DUAL WIELD and SECONDARY IF SECONDARY ONLY SLOT
+    # subqueries of Db_Query, ranked once per NPC over the much smaller npc_loot_items table
+    Db_Fast_Npc_Weapon_Picks = """create temp table npc_weapon_picks as
+with ranked as
+(
+	select npc_id, idfile, itemtype,
+		case when slots & 8192 > 0 then dense_rank() over (partition by npc_id, slots & 8192 > 0
+			order by probability desc, chance desc, item_id) end as pri_rn,
+		case when slots & 24576 > 0 and class_ in (1, 4, 7, 8, 9, 20, 23, 26, 27, 28) then dense_rank() over (
+			partition by npc_id, slots & 24576 > 0 and class_ in (1, 4, 7, 8, 9, 20, 23, 26, 27, 28)
+			order by probability desc, chance desc, item_id) end as sec0_rn,
+		case when slots & 16834 > 0 and slots & 8192 = 0 then dense_rank() over (
+			partition by npc_id, slots & 16834 > 0 and slots & 8192 = 0
+			order by probability desc, chance desc, item_id) end as sec1_rn
+	from npc_loot_items
+)
+select n0.id as npc_id,
+	max(case when pri_rn = 1 then idfile end) as pri_idfile,
+	max(case when pri_rn = 1 then itemtype end) as pri_itemtype,
+	max(case when sec0_rn = 2 then idfile end) as sec0_idfile,
+	max(case when sec0_rn = 2 then itemtype end) as sec0_itemtype,
+	max(case when sec1_rn = 1 then idfile end) as sec1_idfile,
+	max(case when sec1_rn = 1 then itemtype end) as sec1_itemtype
+from npc_id_list n0
+left join ranked r on r.npc_id = n0.id
+group by n0.id"""
+
+    Db_Fast_Npc_Weapon_Picks_Index = "create unique index npc_weapon_picks_npc on npc_weapon_picks (npc_id)"
+
+    # Parameters: zone, import static (0/1), import patrols (0/1)
+    Db_Fast_Query = """select distinct sg.id as sgID,
+	sg.spawn_limit as sg_limit, -- 1
+	s2.id as s2ID, -- 2
+	se.chance, -- 3
+	n.id as npcId, -- 4
+	n.name, -- 5
+	n.race, -- 6
+	n.gender, -- 7
+	n.face % 255 as face, -- 8
+	n.texture, -- 9
+	case when n.d_melee_texture1 > 999
+		then 0
+		else n.d_melee_texture1 end as d_melee_texture1, -- 10
+	wp.pri_idfile, -- 11
+	wp.pri_itemtype, -- 12
+	case when n.d_melee_texture2 > 999
+		then 0
+		else n.d_melee_texture2 end as d_melee_texture2, -- 13
+	wp.sec0_idfile, -- 14
+	wp.sec0_itemtype, -- 15
+	wp.sec1_idfile, -- 16
+	wp.sec1_itemtype, -- 17
+	n.helmtexture, -- 18
+	s2.x, s2.y, s2.z, s2.heading, n.size, -- 19, 20, 21, 22, 23
+	s2.pathgrid, -- 24
+	sg.dist, -- 25
+	case when s2.pathgrid = 0 and sg.dist = 0.0 then 0 else 1 end as is_patrol -- 26
+from alkabor_spawn2 s2
+join alkabor_spawngroup sg on s2.spawngroupID = sg.id
+join alkabor_spawnentry se on se.spawngroupID = sg.id
+join alkabor_npc_types n on se.npcID = n.id
+join npc_weapon_picks wp on n.id = wp.npc_id
+where s2.zone = ?
+	and s2.enabled = 1
+	and ((? and s2.pathgrid = 0 and sg.dist = 0.0) or (? and (s2.pathgrid > 0 or sg.dist > 0.0)))
+order by sg.id, s2.id, n.id"""
+
+    Spawn_Cache_Version = 1
+    Spawn_Cache_Index_File = "spawn_cache_index.json"
+
+    # The fast query's temp tables without the zone and static/patrol filters, for building the spawn cache
+    Db_All_Zones_Npc_Id_List = """create temp table npc_id_list as
+select distinct n.id, n.loottable_id, n.class_
+from alkabor_spawn2 s2
+join alkabor_spawngroup sg on s2.spawngroupID = sg.id
+join alkabor_spawnentry se on se.spawngroupID = sg.id
+join alkabor_npc_types n on se.npcID = n.id
+where s2.enabled = 1
+	and n.race <> 127 -- invisible man"""
+
+    Db_All_Zones_Query = """select distinct sg.id as sgID,
+	sg.spawn_limit as sg_limit, -- 1
+	s2.id as s2ID, -- 2
+	se.chance, -- 3
+	n.id as npcId, -- 4
+	n.name, -- 5
+	n.race, -- 6
+	n.gender, -- 7
+	n.face % 255 as face, -- 8
+	n.texture, -- 9
+	case when n.d_melee_texture1 > 999
+		then 0
+		else n.d_melee_texture1 end as d_melee_texture1, -- 10
+	wp.pri_idfile, -- 11
+	wp.pri_itemtype, -- 12
+	case when n.d_melee_texture2 > 999
+		then 0
+		else n.d_melee_texture2 end as d_melee_texture2, -- 13
+	wp.sec0_idfile, -- 14
+	wp.sec0_itemtype, -- 15
+	wp.sec1_idfile, -- 16
+	wp.sec1_itemtype, -- 17
+	n.helmtexture, -- 18
+	s2.x, s2.y, s2.z, s2.heading, n.size, -- 19, 20, 21, 22, 23
+	s2.pathgrid, -- 24
+	sg.dist, -- 25
+	case when s2.pathgrid = 0 and sg.dist = 0.0 then 0 else 1 end as is_patrol, -- 26
+	s2.zone -- 27
+from alkabor_spawn2 s2
+join alkabor_spawngroup sg on s2.spawngroupID = sg.id
+join alkabor_spawnentry se on se.spawngroupID = sg.id
+join alkabor_npc_types n on se.npcID = n.id
+join npc_weapon_picks wp on n.id = wp.npc_id
+where s2.enabled = 1
+order by s2.zone, sg.id, s2.id, n.id"""
+
+    # Columns of a spawn cache row. Primary and secondary replace the weapon and loot columns 10 to 17
+    Spawn_Cache_Columns = ["sgID", "sg_limit", "s2ID", "chance", "npcId", "name", "race", "gender", "face", "texture",
+        "primary", "secondary", "helmtexture", "x", "y", "z", "heading", "size", "pathgrid", "dist", "is_patrol"]
+
+    Db_Grid_Query = """select ge.gridid, ge.x, ge.y, ge.z, ge.pause
+from alkabor_grid_entries ge
+join alkabor_zone z on ge.zoneid = z.zoneidnumber
+where z.short_name = ?
+order by ge.gridid, ge.number"""
+
+def query_for_characters(db_path, db_query, zone_name, patrols):
+    
+    rows = []
+    with sqlite3.connect(db_path) as db_connection:
+        cursor = db_connection.cursor()
+        pathgrid_comparator = '>' if patrols else '='
+        pathing_where_clause_logic = 'or' if patrols else 'and'
+        query = db_query.format(zone_name, pathgrid_comparator, pathing_where_clause_logic)
+        is_patrol = 1 if patrols else 0
+        for row in cursor.execute(query):
+            rows.append(row + (is_patrol,))
+
+    return rows
+
+def query_db_copy_source(db_copy_path):
+
+    # The (size, mtime, hash) recorded in the working copy, None for a missing copy or one made before
+    # they were recorded
+    if not os.path.exists(db_copy_path):
+        return None
+    db_connection = sqlite3.connect(db_copy_path)
+    try:
+        return db_connection.execute(Constants.Db_Source_Query).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        db_connection.close()
+
+def get_indexed_db_copy(db_path, db_copy_path):
+
+    # The copy matches the database if the recorded size and mtime are unchanged. If only the mtime moved, the
+    # content hash decides, and a match is recorded so it's checked once. Anything else, e.g. an older release
+    # unzipped with its original timestamps or a different database, rebuilds the copy
+    db_stat = os.stat(db_path)
+    db_copy_source = query_db_copy_source(db_copy_path)
+    if db_copy_source and db_copy_source[0] == db_stat.st_size:
+        if db_copy_source[1] == db_stat.st_mtime:
+            return db_copy_path
+        if get_file_hash(db_path) == db_copy_source[2]:
+            db_connection = sqlite3.connect(db_copy_path)
+            try:
+                db_connection.execute(Constants.Db_Source_Update_Mtime, (db_stat.st_mtime,))
+                db_connection.commit()
+            finally:
+                db_connection.close()
+            return db_copy_path
+
+    print("Creating indexed working copy of database at " + db_copy_path + "...")
+    # Build under a per-process name and swap it in, since batch workers may race on this. The hash is of
+    # the copy, so a database changed while it's copied won't match it next time
+    db_temp_copy_path = "{0}.{1}.tmp".format(db_copy_path, os.getpid())
+    shutil.copy2(db_path, db_temp_copy_path)
+    db_hash = get_file_hash(db_temp_copy_path)
+    db_connection = sqlite3.connect(db_temp_copy_path)
+    try:
+        cursor = db_connection.cursor()
+        for index_statement in Constants.Db_Helper_Indexes:
+            cursor.execute(index_statement)
+        cursor.execute(Constants.Db_Source_Table)
+        cursor.execute(Constants.Db_Source_Insert, (db_stat.st_size, db_stat.st_mtime, db_hash))
+        cursor.execute("analyze")
+        db_connection.commit()
+    finally:
+        db_connection.close()
+    try:
+        os.replace(db_temp_copy_path, db_copy_path)
+    except PermissionError:
+        # Another worker already swapped in a fresh copy and has it open
+        os.remove(db_temp_copy_path)
+
+    return db_copy_path
+
+def query_for_characters_single_pass(db_path, zone_name, static, patrols):
+
+    rows = []
+    with sqlite3.connect(db_path) as db_connection:
+        cursor = db_connection.cursor()
+        query_params = (zone_name, 1 if static else 0, 1 if patrols else 0)
+        cursor.execute(Constants.Db_Fast_Npc_Id_List, query_params)
+        cursor.execute(Constants.Db_Fast_Npc_Loot_Items)
+        cursor.execute(Constants.Db_Fast_Npc_Weapon_Picks)
+        cursor.execute(Constants.Db_Fast_Npc_Weapon_Picks_Index)
+        for row in cursor.execute(Constants.Db_Fast_Query, query_params):
+            rows.append(row)
+
+    return rows
+
+def get_file_hash(file_path):
+
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f_stream:
+        for chunk in iter(lambda: f_stream.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+def compact_spawn_row(row):
+
+    primary, secondary = get_primary_secondary_values(row)
+    return list(row[0:10]) + [primary, secondary] + list(row[18:27])
+
+def expand_spawn_row(compact_row):
+
+    # Back to the query's column layout. With the loot columns empty, get_primary_secondary_values
+    # gives back the resolved values unchanged
+    return tuple(compact_row[0:10]) + (compact_row[10], None, None, compact_row[11], None, None, None, None) + tuple(compact_row[12:21])
+
+def write_json_file(data, file_path):
+
+    # Written under a per-process name and swapped in, since batch workers may race on this
+    temporary_file_path = "{0}.{1}.tmp".format(file_path, os.getpid())
+    with open(temporary_file_path, "w") as f_stream:
+        json.dump(data, f_stream, separators=(",", ":"))
+    os.replace(temporary_file_path, file_path)
+
+def get_spawn_cache_zone_path(spawn_cache_folder, zone_name):
+
+    return os.path.join(spawn_cache_folder, "{0}_spawns.json".format(zone_name))
+
+def build_spawn_cache(db_location, db_working_copy_location, spawn_cache_folder):
+
+    # Every enabled spawn of every zone in one pass, static and patrols, split into a file per zone
+    print("Building spawn cache for all zones at " + spawn_cache_folder + "...")
+    build_start_time = time.perf_counter()
+    indexed_db_location = get_indexed_db_copy(db_location, db_working_copy_location)
+
+    # The size, mtime and hash recorded in the copy are read on the same connection as the rows, so the
+    # index describes the database the rows came from even if it changes during the build
+    zone_rows_dict = {}
+    with sqlite3.connect(indexed_db_location) as db_connection:
+        cursor = db_connection.cursor()
+        db_size, db_mtime, db_hash = cursor.execute(Constants.Db_Source_Query).fetchone()
+        cursor.execute(Constants.Db_All_Zones_Npc_Id_List)
+        cursor.execute(Constants.Db_Fast_Npc_Loot_Items)
+        cursor.execute(Constants.Db_Fast_Npc_Weapon_Picks)
+        cursor.execute(Constants.Db_Fast_Npc_Weapon_Picks_Index)
+        for zone_name, zone_rows in itertools.groupby(cursor.execute(Constants.Db_All_Zones_Query), operator.itemgetter(27)):
+            zone_rows_dict[zone_name] = [compact_spawn_row(row) for row in zone_rows]
+
+    os.makedirs(spawn_cache_folder, exist_ok=True)
+    for zone_name, compact_rows in zone_rows_dict.items():
+        write_json_file({"zone": zone_name, "db_hash": db_hash, "columns": Constants.Spawn_Cache_Columns, "rows": compact_rows},
+            get_spawn_cache_zone_path(spawn_cache_folder, zone_name))
+
+    # Written last, since it's what marks the zone files as current
+    spawn_cache_index = {
+        "version": Constants.Spawn_Cache_Version,
+        "db_mtime": db_mtime,
+        "db_size": db_size,
+        "db_hash": db_hash,
+        "zones": {zone_name: len(compact_rows) for zone_name, compact_rows in zone_rows_dict.items()},
+    }
+    write_json_file(spawn_cache_index, os.path.join(spawn_cache_folder, Constants.Spawn_Cache_Index_File))
+    print("Spawn cache has {0} zones, {1} rows, built in {2:.2f} seconds".format(len(zone_rows_dict),
+        sum(spawn_cache_index["zones"].values()), time.perf_counter() - build_start_time))
+
+    return spawn_cache_index
+
+def get_fresh_spawn_cache_index(db_location, spawn_cache_folder):
+
+    # The cache matches the database if its mtime and size are unchanged. If only the mtime moved, e.g. the
+    # database was copied or restored, the content hash decides, and a match is recorded so it's checked once
+    spawn_cache_index_path = os.path.join(spawn_cache_folder, Constants.Spawn_Cache_Index_File)
+    if not os.path.exists(spawn_cache_index_path):
+        return None
+    with open(spawn_cache_index_path) as f_stream:
+        spawn_cache_index = json.load(f_stream)
+    if spawn_cache_index.get("version") != Constants.Spawn_Cache_Version:
+        return None
+
+    db_stat = os.stat(db_location)
+    if db_stat.st_size != spawn_cache_index["db_size"]:
+        return None
+    if db_stat.st_mtime != spawn_cache_index["db_mtime"]:
+        if get_file_hash(db_location) != spawn_cache_index["db_hash"]:
+            return None
+        spawn_cache_index["db_mtime"] = db_stat.st_mtime
+        write_json_file(spawn_cache_index, spawn_cache_index_path)
+
+    return spawn_cache_index
+
+def get_spawn_cache_index(db_location, db_working_copy_location, spawn_cache_folder):
+
+    spawn_cache_index = get_fresh_spawn_cache_index(db_location, spawn_cache_folder)
+    if spawn_cache_index:
+        return spawn_cache_index
+
+    return build_spawn_cache(db_location, db_working_copy_location, spawn_cache_folder)
+
+def load_cached_spawn_rows(zone_name, spawn_cache_folder, spawn_cache_index, import_static, import_patrols):
+
+    # Same rows and order as the fast query for the zone
+    if zone_name not in spawn_cache_index["zones"]:
+        return []
+    with open(get_spawn_cache_zone_path(spawn_cache_folder, zone_name)) as f_stream:
+        zone_spawn_cache = json.load(f_stream)
+    if zone_spawn_cache["db_hash"] != spawn_cache_index["db_hash"]:
+        raise Exception("Spawn cache for " + zone_name + " does not match its index, delete " + spawn_cache_folder + " to rebuild it")
+
+    return [expand_spawn_row(r) for r in zone_spawn_cache["rows"] if (import_patrols if r[20] else import_static)]
+
+def query_grid_entries(db_path, zone_name):
+
+    # Waypoints (x, y, z, pause) of every path grid in the zone by grid ID. A database without
+    # the grid tables gives no grids, leaving patrols at their spawn points
+    rows = []
+    with sqlite3.connect(db_path) as db_connection:
+        cursor = db_connection.cursor()
+        try:
+            rows = cursor.execute(Constants.Db_Grid_Query, (zone_name,)).fetchall()
+        except sqlite3.OperationalError as e:
+            print("Could not query path grids: " + str(e))
+
+    grid_waypoints_dict = {}
+    for grid_id, grid_rows in itertools.groupby(rows, operator.itemgetter(0)):
+        grid_waypoints_dict[grid_id] = [row[1:] for row in grid_rows]
+
+    return grid_waypoints_dict
+  
+def pick_spawns_for_group(spawn_ids, limit, rng):
+
+    if limit == 0 or len(spawn_ids) == 1:
+        return spawn_ids
+    return rng.choices(spawn_ids, k=limit)
+
+def pick_spawn(rows, rng):
+
+    percentile = 0
+    random_num = rng.randint(0, 99)
+    for row in rows:
+        percentile = percentile + int(row[3]) # % chance
+        if random_num < percentile:
+            return row
+    # shouldn't get here if chances always add up to 100, but just in case
+    return rows[0]
+    
+def convert_heading_to_radians(heading):
+
+    ## This is basic conversion but it turns out wrong, even negating
+    # heading_degrees = (heading * 360.0) / 512.0
+
+    ## Working backwards I came up with this ugly formula, which works!
+    heading_degrees = (heading * 720.0 + 91800.0) / 512.0 % 360.0
+
+    return math.radians(heading_degrees)
+
+def get_scale_multiplier(race_id, db_scale, zone_scalar):
+
+    scalar = 0.2 # default
+    if race_id == 49:
+        scalar = 0.1
+    elif race_id == 158: # wurms
+        scalar = 1.0
+        db_scale = 1.0 # Size in DB for these is all over the place
+    elif race_id == 196:
+        scalar = 1.0
+    elif race_id == 108:
+        scalar = 0.05
+    
+    return scalar * db_scale * zone_scalar
+
+def index_model_files(models_path, model_extension):
+
+    # One directory scan instead of an os.path.exists call per spawn. Names are normcased
+    # so lookups match the file system's case sensitivity like os.path.exists would
+    model_file_suffix = os.path.normcase("." + model_extension)
+    model_file_index = set()
+    with os.scandir(models_path) as dir_entries:
+        for dir_entry in dir_entries:
+            file_name = os.path.normcase(dir_entry.name)
+            if file_name.endswith(model_file_suffix) and dir_entry.is_file():
+                model_file_index.add(file_name[:-len(model_file_suffix)])
+
+    return model_file_index
+
+def model_file_exists(model_name, model_file_index):
+
+    return os.path.normcase(model_name) in model_file_index
+
+def get_player_character_model_path(row, model_extension, models_path, model_file_index):
+
+    name = str(row[5]).strip().strip('#')
+    id = str(row[4])
+    pc_model_name = "{0}_{1}".format(name, id)
+    model_path = os.path.join(models_path, "{0}.{1}".format(pc_model_name, model_extension))
+    if not model_file_exists(pc_model_name, model_file_index):
+        print("Player character model file does not exist: " + model_path)
+        return None
+    
+    return model_path
+
+def get_npc_race_identifier_and_texture(row, db_race_translation_dict):
+
+    race_id = int(row[6])
+    gender = int(row[7])
+    texture = int(row[9])
+
+    # Fix elementals
+    if race_id in [209, 210, 211, 212]:
+        if race_id == 209:
+            texture = 0
+        elif race_id == 210:
+            texture = 3
+        elif race_id == 211:
+            texture = 2
+        elif race_id == 212:
+            texture = 1
+        race_id = 75
+
+    return db_race_translation_dict[(race_id, gender)], texture
+
+def get_npc_model_path(row, model_extension, models_path, db_race_translation_dict, model_file_index, npc_model_path_dict):
+
+    race_identifier, texture = get_npc_race_identifier_and_texture(row, db_race_translation_dict)
+    unique_npc_string = get_unique_npc_string(race_identifier, texture, row)
+
+    # Resolution only depends on the unique NPC string, so each one is resolved once per run
+    if unique_npc_string not in npc_model_path_dict:
+        npc_model_path_dict[unique_npc_string] = resolve_npc_model_path(unique_npc_string, model_extension, models_path, model_file_index)
+
+    return npc_model_path_dict[unique_npc_string]
+
+def find_npc_model_name(unique_npc_string, model_file_index):
+
+    # The exact model, else the first backup that exists. None if there's neither
+    if model_file_exists(unique_npc_string, model_file_index):
+        return unique_npc_string
+    if '_' in unique_npc_string:
+        for backup_str in get_backup_npc_strings(unique_npc_string):
+            if model_file_exists(backup_str, model_file_index):
+                return backup_str
+
+    return None
+
+def resolve_npc_model_path(unique_npc_string, model_extension, models_path, model_file_index):
+
+    npc_model_name = find_npc_model_name(unique_npc_string, model_file_index)
+    if npc_model_name == unique_npc_string:
+        return os.path.join(models_path, "{0}.{1}".format(unique_npc_string, model_extension))
+
+    print("NPC model file does not exist: " + os.path.join(models_path, "{0}.{1}".format(unique_npc_string, model_extension)))
+    if '_' in unique_npc_string:
+        print("Checking backup model files...")
+        if npc_model_name:
+            model_path = os.path.join(models_path, "{0}.{1}".format(npc_model_name, model_extension))
+            print("Using backup model at: " + model_path)
+            return model_path
+        print("No backup model file found, skipping")
+
+    return None
+
+def get_unique_npc_string(name, texture, row):
+
+    face = int(row[8])
+    helm_texture = int(row[18])
+    primary, secondary = get_primary_secondary_values(row)
+
+    if (texture + face + helm_texture + primary + secondary) == 0:
+        return name
+    
+    return "{0}_{1:02d}-{2:02d}-{3:02d}-{4:03d}-{5:03d}".format(name, texture, face, helm_texture, primary, secondary)
+
+def get_backup_npc_strings(unique_npc_string):
+    backup_strings = []
+    backup_strings.append(unique_npc_string[:-3] + '000')
+    backup_strings.append(unique_npc_string[:-7] + '000-000')
+    backup_strings.append(unique_npc_string.split('_')[0])
+
+    return backup_strings
+
+def get_primary_secondary_values(row):
+    
+    primary = int(row[10])
+    secondary = 0
+    primary_item_type = -1
+    if primary == 0 and row[11]:
+        primary_str = str(row[11])
+        if len(primary_str) > 2:
+            primary = int(primary_str[2:])
+    if row[12]:
+        primary_item_type = int(row[12])
+    if not primary_item_type in [1, 4, 5, 35]:
+        secondary = int(row[13])
+        if secondary == 0:
+            if row[14]:
+                secondary_str = str(row[14])
+                if (len(secondary_str) > 2):
+                    secondary = int(secondary_str[2:])
+            if secondary == 0 and row[16]:
+                secondary_str = str(row[16])
+                if (len(secondary_str) > 2):
+                    secondary = int(secondary_str[2:])
+
+    return primary, secondary
+
+def load_race_translation_dict(race_data_csv_path):
+
+    db_race_translation_dict = {}
+    with open(race_data_csv_path) as f_stream:
+        header_passed = False
+        for line in f_stream:
+            if not header_passed:
+                header_passed = True
+                continue
+            
+            race_info = line.strip().split(',')
+            id_str = race_info[0]
+            if not id_str:
+                continue
+
+            id = int(id_str)
+            for i in range(2, 6):
+                if race_info[i]:
+                    db_race_translation_dict[(id, i - 2)] = race_info[i].strip()
+
+    return db_race_translation_dict
+
+def query_spawn_rows(zone_name, db_location, import_static, import_patrols, use_fast_db_query, db_working_copy_location, spawn_cache_folder=""):
+
+    chr_db_rows = []
+    if spawn_cache_folder:
+        spawn_cache_index = get_spawn_cache_index(db_location, db_working_copy_location, spawn_cache_folder)
+        chr_db_rows = load_cached_spawn_rows(zone_name, spawn_cache_folder, spawn_cache_index, import_static, import_patrols)
+        print("Spawn cache returned {0} rows".format(len(chr_db_rows)))
+        return chr_db_rows
+
+    print("Executing database query...")
+    query_start_time = time.perf_counter()
+    if use_fast_db_query:
+        indexed_db_location = get_indexed_db_copy(db_location, db_working_copy_location)
+        chr_db_rows = query_for_characters_single_pass(indexed_db_location, zone_name, import_static, import_patrols)
+    else:
+        if import_static:
+            chr_db_rows.extend(query_for_characters(db_location, Constants.Db_Query, zone_name, False))
+        if import_patrols:
+            chr_db_rows.extend(query_for_characters(db_location, Constants.Db_Query, zone_name, True))
+
+        if import_static and import_patrols: # order by in the query, but if both true, we have two sets of query results
+            chr_db_rows = sorted(chr_db_rows, key=operator.itemgetter(0,2))
+    print("Database query returned {0} rows in {1:.2f} seconds".format(len(chr_db_rows), time.perf_counter() - query_start_time))
+
+    return chr_db_rows
+
+def filter_spawns(chr_db_rows, seed):
+
+    # Each spawn group gets its own generator, so a DB change to one group doesn't shift the picks
+    # of every group after it and an incremental re-import only touches the spawns that changed
+    filtered_chr_db_rows = []
+    rows_grouped_by_spawngroup = itertools.groupby(chr_db_rows, operator.itemgetter(0))
+    for spawngroup, sg_rows in rows_grouped_by_spawngroup:
+        rng = random.Random("{0}:{1}".format(seed, spawngroup))
+        sg_rows_grouped_by_spawn = itertools.groupby(sg_rows, operator.itemgetter(2))
+        spawn_ids = []
+        spawn_id_to_rows_dict = {}
+        for spawn_id, s_rows in sg_rows_grouped_by_spawn:
+            spawn_ids.append(spawn_id)
+            spawn_id_to_rows_dict[spawn_id] = list(s_rows)
+        limit = int(spawn_id_to_rows_dict[spawn_ids[0]][0][1])
+        limited_spawn_ids = pick_spawns_for_group(spawn_ids, limit, rng)
+        for limited_spawn_id in limited_spawn_ids:
+            spawn_rows = spawn_id_to_rows_dict[limited_spawn_id]
+            filtered_chr_db_rows.append(pick_spawn(spawn_rows, rng))
+
+    return filtered_chr_db_rows
+
+def is_player_character_race(race):
+
+    return race < 13 or race == 128
+
+def get_skeleton_key(model_path):
+
+    # Only spawns loading the same model file can share one armature and its animations. The file name
+    # already carries the held weapons, and a backup model has its own file and skeleton
+    return os.path.splitext(os.path.basename(model_path))[0]
+
+def create_spawn_plan_entry(row, model_path, skeleton_key, zone_scalar):
+
+    race = int(row[6])
+    x = float(row[19])
+    y = float(row[20])
+    z = float(row[21])
+    heading = float(row[22])
+
+    return {
+        "spawn2_id": int(row[2]),
+        "spawngroup_id": int(row[0]),
+        "npc_id": int(row[4]),
+        "name": str(row[5]).strip().strip('#'),
+        "race": race,
+        "model_path": model_path,
+        "location": [y * -zone_scalar, x * -zone_scalar, z * zone_scalar],
+        "heading": heading,
+        "rotation": convert_heading_to_radians(heading),
+        "scale": get_scale_multiplier(race, float(row[23]), zone_scalar),
+        "collection": Constants.Patrols_Collection if int(row[26]) else Constants.Static_Collection,
+        "skeleton_key": skeleton_key,
+        "pathgrid": int(row[24]),
+    }
+
+def build_spawn_plan(zone_name, lantern_export_folder, race_data_csv_location, db_location, import_static, import_patrols,
+    model_extension, zone_scalar, use_fast_db_query, db_working_copy_location, seed, spawn_cache_folder="", run_report=None):
+
+    run_report = run_report or eq_instrumentation.RunReport("eq_spawn_plan")
+
+    if not import_static and not import_patrols:
+        raise Exception("import_static and import_patrols both false - nothing to export")
+
+    zone_chr_export_folder = os.path.join(lantern_export_folder, zone_name, "Characters")
+    if not os.path.exists(zone_chr_export_folder):
+        raise Exception("Zone characters export folder does not exist at " + zone_chr_export_folder + "!")
+    if not os.path.exists(race_data_csv_location):
+        raise Exception("RaceData.csv file does not exist at " + race_data_csv_location + "!")
+    if not os.path.exists(db_location):
+        raise Exception("Database does not exist at " + db_location + "!")
+
+    print("Loading RaceData.csv...")
+    db_race_translation_dict = eq_lookup_tables.load_memoized(race_data_csv_location, load_race_translation_dict)
+
+    with run_report.phase("db_query"):
+        chr_db_rows = query_spawn_rows(zone_name, db_location, import_static, import_patrols, use_fast_db_query, db_working_copy_location,
+            spawn_cache_folder)
+
+    print("Filtering spawns...")
+    with run_report.phase("spawn_filter"):
+        filtered_chr_db_rows = filter_spawns(chr_db_rows, seed)
+
+    spawns = []
+    missing_spawn2_ids = []
+    npc_model_path_dict = {}
+    backup_model_count = 0
+    print("Resolving character model files...")
+    with run_report.phase("model_resolution"):
+        model_file_index = index_model_files(zone_chr_export_folder, model_extension)
+        for row in filtered_chr_db_rows:
+            race = int(row[6])
+            if is_player_character_race(race):
+                model_path = get_player_character_model_path(row, model_extension, zone_chr_export_folder, model_file_index)
+            else:
+                model_path = get_npc_model_path(row, model_extension, zone_chr_export_folder, db_race_translation_dict, model_file_index, npc_model_path_dict)
+                race_identifier, texture = get_npc_race_identifier_and_texture(row, db_race_translation_dict)
+                if model_path and os.path.basename(model_path) != "{0}.{1}".format(get_unique_npc_string(race_identifier, texture, row), model_extension):
+                    backup_model_count += 1
+
+            if not model_path:
+                missing_spawn2_ids.append(int(row[2]))
+                continue
+
+            spawns.append(create_spawn_plan_entry(row, model_path, get_skeleton_key(model_path), zone_scalar))
+
+    return {
+        "version": Constants.Spawn_Plan_Version,
+        "zone": zone_name,
+        "seed": seed,
+        "spawns": spawns,
+        "missing_spawn2_ids": missing_spawn2_ids,
+        "stats": {
+            "rows_queried": len(chr_db_rows),
+            "spawns_picked": len(filtered_chr_db_rows),
+            "backup_model_fallbacks": backup_model_count,
+            "missing_models": len(missing_spawn2_ids),
+        },
+    }
+
+def get_spawn_plan_key(zone_name, lantern_export_folder, race_data_csv_location, db_location, import_static, import_patrols,
+    model_extension, zone_scalar, use_fast_db_query, spawn_cache_folder, seed):
+
+    # Everything that changes the content of a seeded plan. The Characters folder mtime
+    # changes whenever model files are added or removed by an extractor run, and the RaceData.csv
+    # mtime whenever races are mapped to models
+    return {
+        "version": Constants.Spawn_Plan_Version,
+        "zone": zone_name,
+        "db_location": os.path.abspath(db_location),
+        "db_mtime": os.path.getmtime(db_location),
+        "db_size": os.path.getsize(db_location),
+        "race_data_csv_location": os.path.abspath(race_data_csv_location),
+        "race_data_csv_mtime": os.path.getmtime(race_data_csv_location),
+        "seed": seed,
+        "import_static": import_static,
+        "import_patrols": import_patrols,
+        "model_extension": model_extension,
+        "zone_scalar": zone_scalar,
+        "use_fast_db_query": use_fast_db_query,
+        "spawn_cache_folder": os.path.abspath(spawn_cache_folder) if spawn_cache_folder else "",
+        "characters_folder_mtime": os.path.getmtime(os.path.join(lantern_export_folder, zone_name, "Characters")),
+    }
+
+def get_spawn_plan_cache_path(zone_name, lantern_export_folder, seed):
+
+    return os.path.join(lantern_export_folder, zone_name, "{0}_spawn_plan_{1}.json".format(zone_name, seed))
+
+def get_spawn_plan(zone_name, lantern_export_folder, race_data_csv_location, db_location, import_static, import_patrols,
+    model_extension, zone_scalar, use_fast_db_query, db_working_copy_location, seed, spawn_cache_folder="", run_report=None):
+
+    # Without a seed every run picks a new set of spawns, like the script always did. The seed
+    # that was used is still recorded in the plan so the result can be reproduced. It's kept below 2^31
+    # so Blender can store it in an int custom property
+    if seed is None:
+        return build_spawn_plan(zone_name, lantern_export_folder, race_data_csv_location, db_location, import_static, import_patrols,
+            model_extension, zone_scalar, use_fast_db_query, db_working_copy_location, random.randrange(2 ** 31), spawn_cache_folder, run_report)
+
+    plan_key = get_spawn_plan_key(zone_name, lantern_export_folder, race_data_csv_location, db_location, import_static, import_patrols,
+        model_extension, zone_scalar, use_fast_db_query, spawn_cache_folder, seed)
+    plan_cache_path = get_spawn_plan_cache_path(zone_name, lantern_export_folder, seed)
+    if os.path.exists(plan_cache_path):
+        cached_plan = load_spawn_plan(plan_cache_path)
+        if cached_plan.get("key") == plan_key:
+            print("Using cached spawn plan at " + plan_cache_path)
+            return cached_plan
+
+    plan = build_spawn_plan(zone_name, lantern_export_folder, race_data_csv_location, db_location, import_static, import_patrols,
+        model_extension, zone_scalar, use_fast_db_query, db_working_copy_location, seed, spawn_cache_folder, run_report)
+    plan["key"] = plan_key
+    save_spawn_plan(plan, plan_cache_path)
+
+    return plan
+
+def load_spawn_plan(plan_path):
+
+    with open(plan_path) as f_stream:
+        return json.load(f_stream)
+
+def save_spawn_plan(plan, plan_path):
+
+    # One spawn per line so plans diff cleanly
+    with open(plan_path, "w") as f_stream:
+        f_stream.write("{\n")
+        for key in sorted(k for k in plan if k != "spawns"):
+            f_stream.write("{0}: {1},\n".format(json.dumps(key), json.dumps(plan[key], sort_keys=True)))
+        f_stream.write("\"spawns\": [\n")
+        f_stream.write(",\n".join(json.dumps(s, sort_keys=True) for s in plan["spawns"]))
+        f_stream.write("\n]\n}\n")
+
+def diff_spawn_plans(old_plan, new_plan):
+
+    old_spawn_dict = {s["spawn2_id"]: s for s in old_plan["spawns"]}
+    new_spawn_dict = {s["spawn2_id"]: s for s in new_plan["spawns"]}
+
+    added = [s for id, s in new_spawn_dict.items() if id not in old_spawn_dict]
+    removed = [s for id, s in old_spawn_dict.items() if id not in new_spawn_dict]
+    changed = [(old_spawn_dict[id], s) for id, s in new_spawn_dict.items() if id in old_spawn_dict and old_spawn_dict[id] != s]
+
+    return added, removed, changed
+
+def get_spawn_tags(zone_name, spawn, instance, model_mtime_dict, baked_grid_ids):
+
+    # Custom properties eq_import_chrs.py sets on a spawn's objects, so a re-import can match them to the plan.
+    # The model file's mtime is part of it so re-exported models are imported again, and the baked path
+    # grid so patrols are re-imported when path baking is switched on or off
+    model_path = spawn["model_path"]
+    if model_path not in model_mtime_dict:
+        model_mtime_dict[model_path] = os.path.getmtime(model_path)
+
+    return {
+        "eq_zone": zone_name,
+        "eq_spawn2_id": spawn["spawn2_id"],
+        "eq_spawn_instance": instance,
+        "eq_npc_id": spawn["npc_id"],
+        "eq_model_path": model_path,
+        "eq_model_mtime": model_mtime_dict[model_path],
+        "eq_path_grid": spawn["pathgrid"] if spawn["pathgrid"] in baked_grid_ids else 0,
+    }
+
+def diff_spawn_plan_against_tags(plan, existing_tags_dict, baked_grid_ids=()):
+
+    # existing_tags_dict maps (spawn2 ID, instance) to the tags on the spawns already in the scene. A spawn
+    # point can be picked more than once, so repeats of the same spawn2 ID are numbered in plan order.
+    # Spawns with matching tags only need their transforms updated, the rest are imported, and any
+    # tagged spawn not kept is removed, including the old version of a re-imported one
+    model_mtime_dict = {}
+    instance_count_dict = {}
+    to_import = []
+    to_update = []
+    for spawn in plan["spawns"]:
+        instance = instance_count_dict.get(spawn["spawn2_id"], 0)
+        instance_count_dict[spawn["spawn2_id"]] = instance + 1
+        tags = get_spawn_tags(plan["zone"], spawn, instance, model_mtime_dict, baked_grid_ids)
+        if existing_tags_dict.get((spawn["spawn2_id"], instance)) == tags:
+            to_update.append((spawn, tags))
+        else:
+            to_import.append((spawn, tags))
+
+    kept_keys = set((tags["eq_spawn2_id"], tags["eq_spawn_instance"]) for spawn, tags in to_update)
+    to_remove = [key for key in existing_tags_dict if key not in kept_keys]
+
+    return to_import, to_update, to_remove
+
+def parse_arguments():
+
+    parser = argparse.ArgumentParser(description="Generate the spawn plan eq_import_chrs.py imports, without Blender")
+    parser.add_argument("--zone-name", required=True)
+    parser.add_argument("--lantern-export-folder", required=True)
+    parser.add_argument("--race-data-csv-location", required=True)
+    parser.add_argument("--db-location", required=True)
+    parser.add_argument("--import-static", default=True, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--import-patrols", default=False, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--model-extension", default="gltf", choices=["gltf", "glb"])
+    parser.add_argument("--zone-scalar", default=0.2, type=float)
+    parser.add_argument("--use-fast-db-query", default=True, action=argparse.BooleanOptionalAction)
+    parser.add_argument("--db-working-copy-location", default=None)
+    parser.add_argument("--seed", default=None, type=int)
+    parser.add_argument("--spawn-cache-folder", default="", help="Read the rows from the all zone spawn cache here, building it if stale")
+    parser.add_argument("--output", help="Write the plan to this file")
+    parser.add_argument("--diff", help="Compare the plan against an earlier plan file")
+
+    args = parser.parse_args()
+    if args.db_working_copy_location is None:
+        args.db_working_copy_location = os.path.splitext(args.db_location)[0] + "_indexed.db"
+
+    return args
+
+###### SCRIPT START ######
+
+if __name__ == "__main__":
+
+    args = parse_arguments()
+    plan = get_spawn_plan(args.zone_name, args.lantern_export_folder, args.race_data_csv_location, args.db_location,
+        args.import_static, args.import_patrols, args.model_extension, args.zone_scalar, args.use_fast_db_query,
+        args.db_working_copy_location, args.seed, args.spawn_cache_folder)
+    print("Planned {0} spawns with seed {1}, {2} without a model file".format(len(plan["spawns"]), plan["seed"], len(plan["missing_spawn2_ids"])))
+
+    if args.output:
+        save_spawn_plan(plan, args.output)
+        print("Spawn plan written to " + args.output)
+
+    if args.diff:
+        added, removed, changed = diff_spawn_plans(load_spawn_plan(args.diff), plan)
+        for spawn in added:
+            print("+ {0} {1} {2}".format(spawn["spawn2_id"], spawn["name"], spawn["model_path"]))
+        for spawn in removed:
+            print("- {0} {1} {2}".format(spawn["spawn2_id"], spawn["name"], spawn["model_path"]))
+        for old_spawn, new_spawn in changed:
+            changed_fields = [k for k in new_spawn if old_spawn.get(k) != new_spawn[k]]
+            print("~ {0} {1} {2}".format(new_spawn["spawn2_id"], new_spawn["name"], ", ".join(changed_fields)))
+        print("{0} added, {1} removed, {2} changed".format(len(added), len(removed), len(changed)))
+        sys.exit(1 if added or removed or changed else 0)
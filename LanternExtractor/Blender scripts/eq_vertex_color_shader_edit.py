@@ -1,46 +1,142 @@
 import bpy
+import os
+import sys
 
-# Strength of the emission applied to vertex colors
+# Strength of the emission applied to vertex colors. Lives in a single node group shared by every
+# material, so re-running the script with a new value only updates that group
 emission_strength = 0.1
 
-for mat in bpy.data.materials:
-    
-    if not mat.node_tree:
-        continue
-    
-    nodes = mat.node_tree.nodes
-    links = mat.node_tree.links
-
-    vertex_color_node = nodes.get("Color Attribute")
-    base_color_node = nodes.get("Image Texture")
-    mix_node = nodes.get("Mix")
-    
-    if not vertex_color_node or not base_color_node or not mix_node:
-        continue
-    
-    pbsdf_node = nodes.get("Principled BSDF")
-    light_path_node = nodes.get("Light Path")
-    existing_alpha_link = next((l for l in links if l.from_socket == base_color_node.outputs[1]), None)
-    
-    if pbsdf_node:
-        pbsdf_node.inputs[20].default_value = emission_strength
-        already_ran = next((l for l in links if l.to_socket == pbsdf_node.inputs[19]), None)
-        if already_ran:
-            continue
-        links.new(mix_node.outputs[2], pbsdf_node.inputs[19])
-        links.new(base_color_node.outputs[0], pbsdf_node.inputs[0])
-        if existing_alpha_link:
-            links.new(base_color_node.outputs[1], pbsdf_node.inputs[21])        
-    elif light_path_node:
-        # These are "unlit" materials like fire. Just discard
-        # vertex color influence entirely.
-        emission_node = nodes.get("Emission")
-        already_ran = next((l for l in links if l.from_socket == base_color_node.outputs[0] and l.to_socket == emission_node.inputs[0]), None)
-        if already_ran:
-            continue
-        links.new(base_color_node.outputs[0], emission_node.inputs[0])
-        output_node = nodes.get("Material Output")
-        if existing_alpha_link:
-            mix_to_out_link = next((l for l in links if l.to_socket == output_node.inputs[0]), None)
-            last_mix_shader = next((n for n in nodes if n.outputs and n.outputs[0] == mix_to_out_link.from_socket), None)
-            links.new(base_color_node.outputs[1], last_mix_shader.inputs[0])
\ No newline at end of file
+blender_scripts_folder = "C:\\LanternExtractor\\Blender scripts"
+
+# Folder for the JSON run report. Leave empty to write it next to the .blend file
+run_report_folder = ""
+
+for scripts_folder in [os.path.dirname(os.path.abspath(__file__)), blender_scripts_folder]:
+    if os.path.exists(os.path.join(scripts_folder, "eq_instrumentation.py")) and scripts_folder not in sys.path:
+        sys.path.append(scripts_folder)
+        break
+import eq_instrumentation
+
+Vertex_Color_Emission_Group = "EQ Vertex Color Emission"
+Emission_Strength_Node = "Emission Strength"
+Emission_Color_Input = "Emission Color"
+
+def get_vertex_color_emission_group(emission_strength):
+
+    # The emission color is each material's own vertex color Mix result, passed through. Groups from an
+    # earlier version that redid the multiply themselves are rebuilt
+    group = bpy.data.node_groups.get(Vertex_Color_Emission_Group)
+    if group and Emission_Color_Input not in group.inputs:
+        group.nodes.clear()
+        group.inputs.clear()
+        group.outputs.clear()
+    elif not group:
+        group = bpy.data.node_groups.new(Vertex_Color_Emission_Group, 'ShaderNodeTree')
+
+    if not group.nodes:
+        group.inputs.new('NodeSocketColor', Emission_Color_Input)
+        group.outputs.new('NodeSocketColor', "Emission")
+        group.outputs.new('NodeSocketFloat', "Emission Strength")
+
+        group_input_node = group.nodes.new('NodeGroupInput')
+        group_output_node = group.nodes.new('NodeGroupOutput')
+
+        strength_node = group.nodes.new('ShaderNodeValue')
+        strength_node.name = Emission_Strength_Node
+
+        group.links.new(group_input_node.outputs[0], group_output_node.inputs[0])
+        group.links.new(strength_node.outputs[0], group_output_node.inputs[1])
+
+    group.nodes[Emission_Strength_Node].outputs[0].default_value = emission_strength
+    return group
+
+def index_links(links):
+
+    # One pass over the links instead of a scan for every socket lookup
+    links_from_socket = {}
+    links_to_socket = {}
+    for link in links:
+        links_from_socket.setdefault(link.from_socket.as_pointer(), []).append(link)
+        links_to_socket[link.to_socket.as_pointer()] = link
+
+    return links_from_socket, links_to_socket
+
+def edit_vertex_color_materials(emission_strength, run_report_folder):
+
+    run_report = eq_instrumentation.RunReport("eq_vertex_color_shader_edit")
+
+    with run_report.phase("rewire_materials"):
+        vertex_color_emission_group = get_vertex_color_emission_group(emission_strength)
+
+        for mat in bpy.data.materials:
+
+            if not mat.node_tree:
+                continue
+
+            nodes = mat.node_tree.nodes
+            links = mat.node_tree.links
+
+            vertex_color_node = nodes.get("Color Attribute")
+            base_color_node = nodes.get("Image Texture")
+            mix_node = nodes.get("Mix")
+
+            if not vertex_color_node or not base_color_node or not mix_node:
+                continue
+
+            pbsdf_node = nodes.get("Principled BSDF")
+            light_path_node = nodes.get("Light Path")
+            links_from_socket, links_to_socket = index_links(links)
+            existing_alpha_link = base_color_node.outputs[1].as_pointer() in links_from_socket
+
+            if pbsdf_node:
+                # Materials edited before the shared group existed have the Mix node wired straight into
+                # the emission input with a fixed strength. Those get rewired through the group too
+                existing_emission_link = links_to_socket.get(pbsdf_node.inputs[19].as_pointer())
+                if existing_emission_link and existing_emission_link.from_node.type == 'GROUP':
+                    # Group nodes linked by an earlier version of the group get the Mix result relinked
+                    group_node = existing_emission_link.from_node
+                    group_input_link = links_to_socket.get(group_node.inputs[0].as_pointer())
+                    if group_input_link and group_input_link.from_socket == mix_node.outputs[2]:
+                        run_report.count("materials_already_done")
+                        continue
+                    links.new(mix_node.outputs[2], group_node.inputs[0])
+                    run_report.count("materials_relinked")
+                    continue
+                group_node = nodes.new('ShaderNodeGroup')
+                group_node.node_tree = vertex_color_emission_group
+                group_node.location = (mix_node.location.x, mix_node.location.y - 200)
+                links.new(mix_node.outputs[2], group_node.inputs[0])
+                links.new(group_node.outputs[0], pbsdf_node.inputs[19])
+                links.new(group_node.outputs[1], pbsdf_node.inputs[20])
+                links.new(base_color_node.outputs[0], pbsdf_node.inputs[0])
+                if existing_alpha_link:
+                    links.new(base_color_node.outputs[1], pbsdf_node.inputs[21])
+                run_report.count("materials_rewired")
+            elif light_path_node:
+                # These are "unlit" materials like fire. Just discard
+                # vertex color influence entirely.
+                emission_node = nodes.get("Emission")
+                existing_emission_link = links_to_socket.get(emission_node.inputs[0].as_pointer())
+                already_ran = existing_emission_link and existing_emission_link.from_socket == base_color_node.outputs[0]
+                if already_ran:
+                    run_report.count("materials_already_done")
+                    continue
+                links.new(base_color_node.outputs[0], emission_node.inputs[0])
+                output_node = nodes.get("Material Output")
+                if existing_alpha_link:
+                    mix_to_out_link = links_to_socket.get(output_node.inputs[0].as_pointer())
+                    last_mix_shader = next((n for n in nodes if n.outputs and n.outputs[0] == mix_to_out_link.from_socket), None)
+                    links.new(base_color_node.outputs[1], last_mix_shader.inputs[0])
+                run_report.count("unlit_materials")
+
+    run_report.print_summary()
+
+    report_path = eq_instrumentation.get_report_path(run_report_folder, bpy.data.filepath,
+        os.path.splitext(os.path.basename(bpy.data.filepath) or "untitled")[0] + "_vertex_color_report.json")
+    if report_path:
+        run_report.write(report_path)
+
+###### SCRIPT START ######
+
+if __name__ == "__main__":
+    edit_vertex_color_materials(emission_strength, run_report_folder)